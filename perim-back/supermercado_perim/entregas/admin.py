@@ -25,8 +25,11 @@ class ClienteAdmin(admin.ModelAdmin):
         })
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).com_enderecos()
+
     def get_endereco_principal_display(self, obj):
-        principal = obj.enderecos.filter(principal=True).first()
+        principal = obj.endereco_principal
         return str(principal) if principal else "Nenhum endereço principal"
     get_endereco_principal_display.short_description = "Endereço Principal"
 
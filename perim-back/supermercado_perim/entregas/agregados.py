@@ -0,0 +1,203 @@
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+from django.utils import timezone
+
+from .models import Cliente, Endereco, Entrega, EntregaDiaria, Entregador, TotalEntregasCliente
+
+
+def dia_local(data_hora):
+    return timezone.localdate(data_hora, timezone=timezone.get_default_timezone())
+
+
+def inicio_do_dia(dia):
+    return timezone.make_aware(datetime.combine(dia, time.min), timezone.get_default_timezone())
+
+
+def _contribuicao(valores):
+    # Uma entrega conta 1 no seu (dia, entregador, status) e 1 no seu cliente.
+    chave_dia = (dia_local(valores['data_hora_entrega']), valores['entregador_id'], valores['status'])
+    return chave_dia, valores['cliente_id']
+
+
+def acumular_deltas(deltas_dia, deltas_cliente, anteriores=None, atuais=None):
+    if anteriores:
+        chave_dia, cliente_id = _contribuicao(anteriores)
+        deltas_dia[chave_dia] -= 1
+        deltas_cliente[cliente_id] -= 1
+    if atuais:
+        chave_dia, cliente_id = _contribuicao(atuais)
+        deltas_dia[chave_dia] += 1
+        deltas_cliente[cliente_id] += 1
+
+
+def registrar_alteracao(anteriores=None, atuais=None):
+    deltas_dia, deltas_cliente = Counter(), Counter()
+    acumular_deltas(deltas_dia, deltas_cliente, anteriores, atuais)
+    aplicar_deltas(deltas_dia, deltas_cliente)
+
+
+def _somar(queryset, delta, **criacao):
+    if queryset.update(total=F('total') + delta):
+        return
+    if delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            queryset.model.objects.create(total=delta, **criacao)
+    except IntegrityError:
+        # Outra requisição criou a linha entre o UPDATE e o INSERT.
+        queryset.update(total=F('total') + delta)
+
+
+def aplicar_deltas(deltas_dia, deltas_cliente):
+    with transaction.atomic():
+        for (dia, entregador_id, status), delta in deltas_dia.items():
+            if delta:
+                _somar(
+                    EntregaDiaria.objects.filter(dia=dia, entregador_id=entregador_id, status=status),
+                    delta, dia=dia, entregador_id=entregador_id, status=status
+                )
+        for cliente_id, delta in deltas_cliente.items():
+            if delta:
+                _somar(TotalEntregasCliente.objects.filter(cliente_id=cliente_id), delta, cliente_id=cliente_id)
+
+
+def transferir_para_sem_entregador(entregador_id):
+    # O SET_NULL de Entrega.entregador é feito com UPDATE direto, sem sinais;
+    # as contagens do entregador removido passam para "sem entregador".
+    deltas = Counter()
+    for linha in EntregaDiaria.objects.filter(entregador_id=entregador_id, total__gt=0).values('dia', 'status', 'total'):
+        deltas[(linha['dia'], None, linha['status'])] += linha['total']
+    aplicar_deltas(deltas, {})
+    EntregaDiaria.objects.filter(entregador_id=entregador_id).delete()
+
+
+def _por_dia(queryset):
+    return (
+        queryset
+        .annotate(dia=TruncDate('data_hora_entrega', tzinfo=timezone.get_default_timezone()))
+        .values('dia', 'entregador_id', 'status')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+
+
+def reconstruir(desde=None):
+    # Com `desde`, só os dias a partir dessa data são recalculados (o filtro
+    # por intervalo em data_hora_entrega usa o índice); os totais por cliente
+    # só são refeitos na reconstrução completa.
+    with transaction.atomic():
+        if desde is None:
+            EntregaDiaria.objects.all().delete()
+            TotalEntregasCliente.objects.all().delete()
+            entregas = Entrega.objects.all()
+        else:
+            EntregaDiaria.objects.filter(dia__gte=desde).delete()
+            entregas = Entrega.objects.filter(data_hora_entrega__gte=inicio_do_dia(desde))
+
+        diarias = EntregaDiaria.objects.bulk_create(
+            (EntregaDiaria(**linha) for linha in _por_dia(entregas).iterator()), batch_size=1000
+        )
+        clientes = []
+        if desde is None:
+            por_cliente = Entrega.objects.values('cliente_id').annotate(total=Count('id')).order_by()
+            clientes = TotalEntregasCliente.objects.bulk_create(
+                (TotalEntregasCliente(**linha) for linha in por_cliente.iterator()), batch_size=1000
+            )
+    return len(diarias), len(clientes)
+
+
+def total_entregas():
+    return EntregaDiaria.objects.aggregate(total=Sum('total'))['total'] or 0
+
+
+def entregas_por_mes_queryset(desde):
+    return (
+        EntregaDiaria.objects
+        .filter(dia__gte=desde)
+        .annotate(mes=TruncMonth('dia'))
+        .values('mes')
+        .annotate(total=Sum('total'))
+        .filter(total__gt=0)
+        .order_by('mes')
+    )
+
+
+def entregas_por_mes(desde):
+    return [
+        {'mes': linha['mes'].strftime('%Y-%m'), 'total': linha['total']}
+        for linha in entregas_por_mes_queryset(desde)
+    ]
+
+
+def top_clientes(limite=5):
+    return [
+        {'id': linha.cliente_id, 'nome': linha.cliente.nome, 'total_entregas': linha.total}
+        for linha in (
+            TotalEntregasCliente.objects
+            .filter(total__gt=0)
+            .select_related('cliente')
+            .order_by('-total', 'cliente_id')[:limite]
+        )
+    ]
+
+
+def entregador_do_dia_queryset(dia):
+    return (
+        EntregaDiaria.objects
+        .filter(dia=dia, entregador__isnull=False)
+        .values('entregador_id', 'entregador__nome')
+        .annotate(total=Sum('total'))
+        .filter(total__gt=0)
+        .order_by('-total', 'entregador_id')
+    )
+
+
+def entregador_do_dia(dia):
+    return entregador_do_dia_queryset(dia).first()
+
+
+def distribuicao_status():
+    return list(
+        EntregaDiaria.objects
+        .values('status')
+        .annotate(total=Sum('total'))
+        .filter(total__gt=0)
+        .order_by('status')
+    )
+
+
+def entregador_do_dia_info(dia):
+    entregador = entregador_do_dia(dia)
+    if not entregador:
+        return {
+            'id': None,
+            'nome': "Nenhum entregador com entregas hoje",
+            'total_entregas_hoje': 0
+        }
+    return {
+        'id': entregador['entregador_id'],
+        'nome': entregador['entregador__nome'],
+        'total_entregas_hoje': entregador['total']
+    }
+
+
+def consultas_estatisticas(janela_dias):
+    # Consultas independentes entre si, na ordem da resposta de
+    # /api/estatisticas/; a versão assíncrona as executa em paralelo.
+    inicio_janela = dia_local(timezone.now() - timedelta(days=janela_dias))
+    hoje = timezone.localdate()
+    return {
+        'total_clientes': Cliente.objects.count,
+        'total_entregas': total_entregas,
+        'total_enderecos': Endereco.objects.count,
+        'total_entregadores': Entregador.objects.count,
+        'entregas_por_mes': lambda: entregas_por_mes(inicio_janela),
+        'top_clientes_com_mais_entregas': lambda: top_clientes(5),
+        'entregador_do_dia': lambda: entregador_do_dia_info(hoje),
+        'distribuicao_status_entregas': distribuicao_status,
+    }
@@ -1,6 +1,11 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class EntregasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'entregas'
+
+    def ready(self):
+        from . import checks, signals
+        post_migrate.connect(signals.garantir_indice_busca, sender=self)
@@ -0,0 +1,38 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_trava_executor = threading.Lock()
+
+
+def _executor_consultas():
+    global _executor
+    with _trava_executor:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'CONSULTAS_PARALELAS', 4), thread_name_prefix='consultas'
+            )
+    return _executor
+
+
+def _consultar(consulta):
+    # As threads do pool são fixas e cada uma reaproveita a sua conexão entre
+    # requisições; close_old_connections só fecha as que passaram de
+    # CONN_MAX_AGE ou ficaram inutilizáveis, como no início de uma requisição.
+    close_old_connections()
+    return consulta()
+
+
+async def executar_em_paralelo(consultas):
+    """Executa as consultas síncronas de `consultas` ({chave: callable}) ao mesmo tempo."""
+    executor = _executor_consultas()
+    resultados = await asyncio.gather(*(
+        sync_to_async(_consultar, thread_sensitive=False, executor=executor)(consulta)
+        for consulta in consultas.values()
+    ))
+    return dict(zip(consultas, resultados))
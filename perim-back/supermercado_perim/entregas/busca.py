@@ -0,0 +1,106 @@
+import unicodedata
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# Cada entrega guarda em `documento_busca` os textos pesquisáveis já
+# normalizados (minúsculas, sem acentos), um campo por linha. O documento é
+# indexado com FTS5 (tokenizer trigram) no SQLite e com um índice GIN de
+# trigramas no PostgreSQL; os dois atendem buscas por substring.
+
+TABELA_FTS = 'entregas_entrega_busca'
+TAMANHO_MINIMO_TRIGRAMA = 3
+
+SQL_SQLITE = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_FTS} USING fts5(
+        documento_busca, content='entregas_entrega', content_rowid='id', tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_ai AFTER INSERT ON entregas_entrega BEGIN
+        INSERT INTO {TABELA_FTS}(rowid, documento_busca) VALUES (new.id, new.documento_busca);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_ad AFTER DELETE ON entregas_entrega BEGIN
+        INSERT INTO {TABELA_FTS}({TABELA_FTS}, rowid, documento_busca) VALUES ('delete', old.id, old.documento_busca);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_au AFTER UPDATE OF documento_busca ON entregas_entrega BEGIN
+        INSERT INTO {TABELA_FTS}({TABELA_FTS}, rowid, documento_busca) VALUES ('delete', old.id, old.documento_busca);
+        INSERT INTO {TABELA_FTS}(rowid, documento_busca) VALUES (new.id, new.documento_busca);
+    END""",
+]
+
+SQL_POSTGRESQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX IF NOT EXISTS entrega_documento_busca_trgm ON entregas_entrega USING gin (documento_busca gin_trgm_ops)',
+]
+
+
+def normalizar(texto):
+    if not texto:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', str(texto))
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.lower().split())
+
+
+def montar_documento(entrega):
+    endereco = entrega.endereco
+    partes = [
+        entrega.cliente.nome,
+        entrega.entregador.nome if entrega.entregador_id else '',
+        entrega.numero_nfce,
+        entrega.nome_embalador,
+        endereco.logradouro,
+        endereco.bairro,
+        endereco.cep,
+    ]
+    return '\n'.join(normalizar(parte) for parte in partes)
+
+
+def reindexar(queryset, batch_size=500):
+    entregas = queryset.select_related('cliente', 'endereco', 'entregador').order_by()
+    pendentes = []
+    for entrega in entregas.iterator(chunk_size=batch_size):
+        entrega.documento_busca = montar_documento(entrega)
+        pendentes.append(entrega)
+        if len(pendentes) >= batch_size:
+            queryset.model.objects.bulk_update(pendentes, ['documento_busca'])
+            pendentes = []
+    if pendentes:
+        queryset.model.objects.bulk_update(pendentes, ['documento_busca'])
+
+
+def garantir_indice(connection):
+    # Idempotente. No SQLite as triggers somem quando uma migração recria a
+    # tabela entregas_entrega; nesse caso o índice FTS é reconstruído.
+    # Num migrate até uma migração anterior à 0007 a coluna ainda não existe.
+    with connection.cursor() as cursor:
+        if 'entregas_entrega' not in connection.introspection.table_names(cursor) or 'documento_busca' not in {
+            coluna.name for coluna in connection.introspection.get_table_description(cursor, 'entregas_entrega')
+        }:
+            return
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+                [f'{TABELA_FTS}_%']
+            )
+            reconstruir = cursor.fetchone()[0] < 3
+            for sql in SQL_SQLITE:
+                cursor.execute(sql)
+            if reconstruir:
+                cursor.execute(f"INSERT INTO {TABELA_FTS}({TABELA_FTS}) VALUES ('rebuild')")
+    elif connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            for sql in SQL_POSTGRESQL:
+                cursor.execute(sql)
+
+
+def condicao_busca(termo, using='default'):
+    termo = normalizar(termo)
+    if not termo:
+        return Q()
+    if connections[using].vendor == 'sqlite' and len(termo) >= TAMANHO_MINIMO_TRIGRAMA:
+        frase = '"' + termo.replace('"', '""') + '"'
+        return Q(id__in=RawSQL(f'SELECT rowid FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH %s', [frase]))
+    # No PostgreSQL o LIKE '%termo%' é atendido pelo índice GIN de trigramas.
+    return Q(documento_busca__contains=termo)
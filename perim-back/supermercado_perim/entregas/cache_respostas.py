@@ -0,0 +1,96 @@
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .coalescencia import chave_da_requisicao, conteudo, executar
+
+# Cada recurso ('clientes', 'entregadores', 'cliente:<id>') tem um contador de
+# geração no cache. As chaves das respostas incluem as gerações dos recursos
+# de que dependem; os sinais em signals.py incrementam o contador e as
+# entradas antigas simplesmente deixam de ser lidas até expirarem.
+
+
+def _cache():
+    return caches[getattr(settings, 'RESPOSTAS_CACHE_ALIAS', 'default')]
+
+
+def _chave_geracao(recurso):
+    return f'entregas:geracao:{recurso}'
+
+
+def geracoes(recursos):
+    cache = _cache()
+    chaves = [_chave_geracao(recurso) for recurso in recursos]
+    valores = cache.get_many(chaves)
+    for chave in chaves:
+        if chave not in valores:
+            # time_ns() evita reaproveitar uma geração antiga se o cache for limpo.
+            cache.add(chave, time.time_ns(), None)
+            valores[chave] = cache.get(chave)
+    return [valores[chave] for chave in chaves]
+
+
+def invalidar(*recursos):
+    cache = _cache()
+    for recurso in recursos:
+        chave = _chave_geracao(recurso)
+        try:
+            cache.incr(chave)
+        except ValueError:
+            cache.set(chave, time.time_ns(), None)
+
+
+def _identificador(request, recursos):
+    return chave_da_requisicao(
+        request, *(f'{recurso}@{geracao}' for recurso, geracao in zip(recursos, geracoes(recursos)))
+    )
+
+
+def responder_com_cache(request, recursos, calcular):
+    identificador = _identificador(request, recursos)
+    etag = f'W/"{identificador[:32]}"'
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and (etag in parse_etags(if_none_match) or if_none_match.strip() == '*'):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    cache = _cache()
+    chave = f'entregas:resposta:{identificador}'
+    data = cache.get(chave)
+    if data is None:
+        # Requisições simultâneas com a mesma chave calculam a resposta uma vez.
+        codigo, data = executar(identificador, lambda: conteudo(calcular()))
+        if codigo != status.HTTP_200_OK:
+            return Response(data, status=codigo)
+        cache.set(chave, data, getattr(settings, 'RESPOSTAS_CACHE_TIMEOUT', 300))
+    return Response(data, headers=headers)
+
+
+def cache_resposta(recursos):
+    # Para function based views: `recursos` recebe os mesmos argumentos da view.
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            return responder_com_cache(
+                request, recursos(request, *args, **kwargs), lambda: view(request, *args, **kwargs)
+            )
+        return wrapper
+    return decorator
+
+
+class CacheRespostaMixin:
+    cache_recursos = ()
+
+    def get_cache_recursos(self):
+        return list(self.cache_recursos)
+
+    def list(self, request, *args, **kwargs):
+        return responder_com_cache(
+            request, self.get_cache_recursos(), lambda: super(CacheRespostaMixin, self).list(request, *args, **kwargs)
+        )
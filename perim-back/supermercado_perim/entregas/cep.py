@@ -0,0 +1,264 @@
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from .models import Cep
+
+try:
+    import httpx
+except ImportError:  # resolver_async usa a Session síncrona numa thread
+    httpx = None
+
+# Ordem de resolução de um CEP:
+#   1. cache LRU em memória do processo;
+#   2. tabela Cep (base offline carregada com `carregar_ceps`, sem validade,
+#      ou respostas do serviço remoto ainda dentro de CEP_CACHE_TTL);
+#   3. serviço remoto (ViaCEP) por uma Session com pool e timeouts.
+# resolver_async segue a mesma ordem, mas consulta o serviço com um
+# httpx.AsyncClient e agrupa consultas simultâneas do mesmo CEP numa só.
+
+NAO_ENCONTRADO = object()
+
+
+class CepNaoEncontrado(Exception):
+    pass
+
+
+class ServicoCepIndisponivel(Exception):
+    def __init__(self, mensagem, timeout=False):
+        super().__init__(mensagem)
+        self.timeout = timeout
+
+
+class CacheLRU:
+    def __init__(self, tamanho):
+        self.tamanho = tamanho
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            valor, expira_em = item
+            if expira_em < time.monotonic():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return valor
+
+    def set(self, chave, valor, ttl):
+        with self._lock:
+            self._itens[chave] = (valor, time.monotonic() + ttl)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho:
+                self._itens.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._itens.clear()
+
+
+cache_memoria = CacheLRU(getattr(settings, 'CEP_CACHE_MEMORIA_TAMANHO', 10000))
+_sessao = None
+_sessao_lock = threading.Lock()
+# Por event loop: um AsyncClient não pode ser usado fora do loop que o criou.
+# Cada item é (cliente, gerador que o fecha junto com o loop).
+_clientes_async = {}
+_em_andamento = {}
+
+
+def sessao():
+    global _sessao
+    if _sessao is None:
+        with _sessao_lock:
+            if _sessao is None:
+                nova = requests.Session()
+                pool = getattr(settings, 'CEP_POOL_CONEXOES', 10)
+                adaptador = HTTPAdapter(pool_connections=pool, pool_maxsize=pool, max_retries=0)
+                nova.mount('http://', adaptador)
+                nova.mount('https://', adaptador)
+                _sessao = nova
+    return _sessao
+
+
+def normalizar_cep(valor):
+    cep = re.sub(r'[-.\s]', '', str(valor or ''))
+    if len(cep) != 8 or not cep.isdigit():
+        return None
+    return cep
+
+
+def formatar_cep(cep):
+    return f'{cep[:5]}-{cep[5:]}'
+
+
+def _ttl():
+    return getattr(settings, 'CEP_CACHE_TTL', 60 * 60 * 24 * 30)
+
+
+def _do_banco(cep):
+    registro = Cep.objects.filter(cep=cep).first()
+    if registro is None:
+        return None
+    if registro.origem != Cep.ORIGEM_OFFLINE and registro.atualizado_em < timezone.now() - timedelta(seconds=_ttl()):
+        return None
+    return registro.como_endereco()
+
+
+def dados_do_servico(cep, dados):
+    # Converte a resposta do ViaCEP para o formato devolvido pela API.
+    return {
+        'cep': dados.get('cep') or formatar_cep(cep),
+        'logradouro': dados.get('logradouro', ''),
+        'complemento': dados.get('complemento', ''),
+        'bairro': dados.get('bairro', ''),
+        'cidade': dados.get('localidade', ''),
+        'estado': dados.get('uf', ''),
+    }
+
+
+def url_servico(cep):
+    return f"{getattr(settings, 'CEP_SERVICO_URL', 'https://viacep.com.br/ws').rstrip('/')}/{cep}/json/"
+
+
+def _do_servico(cep):
+    try:
+        response = sessao().get(url_servico(cep), timeout=getattr(settings, 'CEP_TIMEOUT', (3.05, 5)))
+        response.raise_for_status()
+        dados = response.json()
+    except requests.Timeout:
+        raise ServicoCepIndisponivel('Timeout ao consultar o serviço de CEP.', timeout=True)
+    except (requests.RequestException, ValueError):
+        raise ServicoCepIndisponivel('Erro ao consultar o serviço de CEP.')
+    if dados.get('erro'):
+        return None
+    return dados_do_servico(cep, dados)
+
+
+def guardar(cep, endereco):
+    if endereco is None:
+        cache_memoria.set(cep, NAO_ENCONTRADO, getattr(settings, 'CEP_CACHE_NEGATIVO_TTL', 60 * 60))
+        return
+    Cep.objects.update_or_create(cep=cep, defaults={**Cep.campos_de_endereco(endereco), 'origem': Cep.ORIGEM_SERVICO})
+    cache_memoria.set(cep, endereco, _ttl())
+
+
+def _da_memoria(cep):
+    endereco = cache_memoria.get(cep)
+    if endereco is NAO_ENCONTRADO:
+        raise CepNaoEncontrado(cep)
+    return endereco
+
+
+def _do_banco_para_memoria(cep):
+    endereco = _do_banco(cep)
+    if endereco is not None:
+        cache_memoria.set(cep, endereco, _ttl())
+    return endereco
+
+
+def consultar_local(cep):
+    # Só memória e banco; None quando é preciso ir ao serviço remoto.
+    endereco = _da_memoria(cep)
+    if endereco is not None:
+        return endereco
+    return _do_banco_para_memoria(cep)
+
+
+def resolver(cep):
+    endereco = consultar_local(cep)
+    if endereco is not None:
+        return endereco
+    endereco = _do_servico(cep)
+    guardar(cep, endereco)
+    if endereco is None:
+        raise CepNaoEncontrado(cep)
+    return endereco
+
+
+async def _fechar_com_o_loop(cliente):
+    # Gerador assíncrono mantido vivo ao lado do cliente: o loop.shutdown_asyncgens()
+    # que asyncio.run e async_to_sync chamam antes de fechar o loop o encerra, e
+    # o finally fecha as conexões ainda dentro do loop.
+    try:
+        yield
+    finally:
+        await cliente.aclose()
+
+
+async def cliente_async():
+    loop = asyncio.get_running_loop()
+    item = _clientes_async.get(loop)
+    if item is None:
+        for outro in [outro for outro in _clientes_async if outro.is_closed()]:
+            del _clientes_async[outro]
+        pool = getattr(settings, 'CEP_POOL_CONEXOES', 10)
+        cliente = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool, max_keepalive_connections=pool)
+        )
+        dono = _fechar_com_o_loop(cliente)
+        await dono.__anext__()
+        item = _clientes_async[loop] = (cliente, dono)
+    return item[0]
+
+
+def _timeout_async():
+    timeout = getattr(settings, 'CEP_TIMEOUT', (3.05, 5))
+    if isinstance(timeout, (tuple, list)):
+        conexao, leitura = timeout
+        return httpx.Timeout(leitura, connect=conexao)
+    return httpx.Timeout(timeout)
+
+
+async def _do_servico_async(cep):
+    if httpx is None:
+        return await sync_to_async(_do_servico, thread_sensitive=False)(cep)
+    try:
+        cliente = await cliente_async()
+        response = await cliente.get(url_servico(cep), timeout=_timeout_async())
+        response.raise_for_status()
+        dados = response.json()
+    except httpx.TimeoutException:
+        raise ServicoCepIndisponivel('Timeout ao consultar o serviço de CEP.', timeout=True)
+    except (httpx.HTTPError, ValueError):
+        raise ServicoCepIndisponivel('Erro ao consultar o serviço de CEP.')
+    if dados.get('erro'):
+        return None
+    return dados_do_servico(cep, dados)
+
+
+async def _buscar_e_guardar(cep):
+    endereco = await _do_servico_async(cep)
+    await sync_to_async(guardar)(cep, endereco)
+    return endereco
+
+
+async def resolver_async(cep):
+    endereco = _da_memoria(cep)
+    if endereco is None:
+        endereco = await sync_to_async(_do_banco_para_memoria)(cep)
+    if endereco is not None:
+        return endereco
+
+    chave = (asyncio.get_running_loop(), cep)
+    tarefa = _em_andamento.get(chave)
+    if tarefa is None:
+        tarefa = asyncio.ensure_future(_buscar_e_guardar(cep))
+        _em_andamento[chave] = tarefa
+        tarefa.add_done_callback(lambda _: _em_andamento.pop(chave, None))
+    # shield: se quem iniciou a consulta desistir, as demais continuam esperando.
+    endereco = await asyncio.shield(tarefa)
+    if endereco is None:
+        raise CepNaoEncontrado(cep)
+    return endereco
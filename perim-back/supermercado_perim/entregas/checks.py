@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+LOCMEM = 'django.core.cache.backends.locmem.LocMemCache'
+# Backends em que cache.add é atômico e compartilhado entre processos.
+ADD_ATOMICO = (
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def caches_compartilhados(app_configs, **kwargs):
+    # Com mais de um processo, cada um teria o seu LocMemCache: as gerações
+    # incrementadas pelos sinais não chegariam aos outros, que continuariam
+    # servindo respostas (e 304) antigas.
+    if settings.DEBUG:
+        return []
+    erros = []
+    for alias in sorted({'default', getattr(settings, 'RESPOSTAS_CACHE_ALIAS', 'default')}):
+        if settings.CACHES.get(alias, {}).get('BACKEND') == LOCMEM:
+            erros.append(Error(
+                f"O cache '{alias}' usa LocMemCache, que não é compartilhado entre processos.",
+                hint='Use um backend compartilhado (DatabaseCache, RedisCache) em CACHES.',
+                id='entregas.E001',
+            ))
+    return erros
+
+
+@register(Tags.caches)
+def cache_da_coalescencia(app_configs, **kwargs):
+    # A eleição do líder entre processos (coalescencia.py) é um cache.add.
+    if not getattr(settings, 'COALESCENCIA_ENTRE_PROCESSOS', False):
+        return []
+    alias = getattr(settings, 'COALESCENCIA_CACHE_ALIAS', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend in ADD_ATOMICO:
+        return []
+    return [Error(
+        f"COALESCENCIA_ENTRE_PROCESSOS exige Redis ou Memcached no cache '{alias}' (configurado: {backend}).",
+        hint='Sem um cache.add atômico e compartilhado, mais de um processo pode virar líder.',
+        id='entregas.E002',
+    )]
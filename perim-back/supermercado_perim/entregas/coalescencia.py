@@ -0,0 +1,132 @@
+import hashlib
+import threading
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+# Requisições idênticas e simultâneas compartilham um único cálculo.
+#   - No processo: a primeira thread (líder) calcula; as demais esperam num
+#     Event e recebem o mesmo resultado. Sem disputa não há nenhuma E/S.
+#   - Entre processos (COALESCENCIA_ENTRE_PROCESSOS = True): o líder de cada
+#     processo disputa a chave de líder com cache.add; quem a obtém calcula e
+#     grava o resultado no cache; os outros consultam o cache até aparecer o
+#     resultado daquele líder. A eleição depende de um add atômico e visto por
+#     todos os processos, ou seja, Redis ou Memcached em
+#     COALESCENCIA_CACHE_ALIAS: o LocMemCache é de cada processo e o add dos
+#     caches em arquivo e em banco não é atômico. O check entregas.E002 recusa
+#     os outros backends.
+# Quem espera mais que COALESCENCIA_TIMEOUT (ou vê o líder falhar) calcula
+# por conta própria.
+
+INTERVALO_ESPERA = 0.01
+INTERVALO_ESPERA_MAXIMO = 0.1
+
+
+class _Voo:
+    def __init__(self):
+        self.pronto = threading.Event()
+        self.resultado = None
+        self.falhou = False
+
+
+_voos = {}
+_voos_lock = threading.Lock()
+
+
+def chave_da_requisicao(request, *extras):
+    partes = [request.path]
+    partes.extend(f'{nome}={valor}' for nome, valores in sorted(request.query_params.lists()) for valor in valores)
+    partes.extend(str(extra) for extra in extras)
+    return hashlib.sha256('\n'.join(partes).encode('utf-8')).hexdigest()
+
+
+def _timeout():
+    return getattr(settings, 'COALESCENCIA_TIMEOUT', 10)
+
+
+def _cache():
+    return caches[getattr(settings, 'COALESCENCIA_CACHE_ALIAS', 'default')]
+
+
+def _esperar_lider(cache, chave_lider, chave_resultado, lider, calcular, timeout):
+    limite = time.monotonic() + timeout
+    intervalo = INTERVALO_ESPERA
+    while time.monotonic() < limite:
+        time.sleep(intervalo)
+        intervalo = min(intervalo * 2, INTERVALO_ESPERA_MAXIMO)
+        lido = cache.get(chave_resultado)
+        # Só serve o resultado do líder que estava calculando quando chegamos.
+        if lido is not None and lido[0] == lider:
+            return lido[1]
+        if cache.get(chave_lider) != lider:
+            break
+    return calcular()
+
+
+def _entre_processos(chave, calcular, timeout):
+    if not getattr(settings, 'COALESCENCIA_ENTRE_PROCESSOS', False):
+        return calcular()
+    cache = _cache()
+    chave_lider = f'entregas:coalescencia:{chave}:lider'
+    chave_resultado = f'entregas:coalescencia:{chave}:resultado'
+    marca = uuid.uuid4().hex
+    if not cache.add(chave_lider, marca, timeout):
+        lider = cache.get(chave_lider)
+        if lider is None:
+            return calcular()
+        return _esperar_lider(cache, chave_lider, chave_resultado, lider, calcular, timeout)
+    try:
+        resultado = calcular()
+        cache.set(chave_resultado, (marca, resultado), timeout)
+        return resultado
+    finally:
+        if cache.get(chave_lider) == marca:
+            cache.delete(chave_lider)
+
+
+def executar(chave, calcular, timeout=None):
+    """
+    Executa `calcular()` uma única vez para chamadas simultâneas com a mesma
+    chave e devolve o resultado a todas. Entre processos, o resultado passa
+    pelo cache e precisa ser serializável por ele.
+    """
+    timeout = _timeout() if timeout is None else timeout
+    with _voos_lock:
+        voo = _voos.get(chave)
+        lider = voo is None
+        if lider:
+            voo = _voos[chave] = _Voo()
+
+    if not lider:
+        if voo.pronto.wait(timeout) and not voo.falhou:
+            return voo.resultado
+        return calcular()
+
+    try:
+        voo.resultado = _entre_processos(chave, calcular, timeout)
+        return voo.resultado
+    except BaseException:
+        voo.falhou = True
+        raise
+    finally:
+        with _voos_lock:
+            del _voos[chave]
+        voo.pronto.set()
+
+
+def conteudo(response):
+    return response.status_code, response.data
+
+
+def coalescer(view):
+    # Para function based views do DRF que devolvem Response sem headers próprios.
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        chave = chave_da_requisicao(request, *args, *sorted(kwargs.items()))
+        codigo, data = executar(chave, lambda: conteudo(view(request, *args, **kwargs)))
+        return Response(data, status=codigo)
+    return wrapper
@@ -0,0 +1,152 @@
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from . import agregados, geo
+from .busca import montar_documento
+from .cache_respostas import invalidar
+from .cep import formatar_cep
+from .importacao import PESOS_DIGITO1, PESOS_DIGITO2, formatar_cpf
+from .models import Cep, Cliente, Endereco, Entrega, Entregador
+
+# Dados sintéticos para desenvolvimento e benchmarks: clientes com CPFs
+# válidos e únicos, endereços na Grande São Paulo (com coordenadas) e
+# entregas espalhadas pelos últimos meses, com status coerente com a data
+# (passadas quase todas entregues, as de hoje em andamento, as futuras
+# pendentes). Tudo com bulk_create; agregados e caches são refeitos no fim.
+
+NOMES = (
+    'Ana', 'Bruno', 'Carla', 'Daniel', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique', 'Isabela', 'João',
+    'Juliana', 'Lucas', 'Mariana', 'Nicolas', 'Olívia', 'Pedro', 'Rafaela', 'Samuel', 'Tatiane', 'Vinícius',
+)
+SOBRENOMES = (
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima', 'Gomes',
+    'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes', 'Soares', 'Fernandes', 'Vieira', 'Barbosa',
+)
+LOGRADOUROS = (
+    'Rua das Flores', 'Avenida Paulista', 'Rua Augusta', 'Rua Vergueiro', 'Avenida Brigadeiro Faria Lima',
+    'Rua da Consolação', 'Rua Domingos de Morais', 'Avenida Rebouças', 'Rua Teodoro Sampaio', 'Rua Oscar Freire',
+)
+BAIRROS = ('Centro', 'Bela Vista', 'Pinheiros', 'Vila Mariana', 'Moema', 'Perdizes', 'Tatuapé', 'Santana', 'Mooca', 'Butantã')
+EMBALADORES = ('Roberto', 'Sônia', 'Marcos', 'Patrícia', 'Carlos')
+
+# Grande São Paulo: ~60 km x 60 km.
+CENTRO = (-23.55, -46.63)
+RAIO_GRAUS = (0.27, 0.3)
+
+
+def gerar_cpfs(quantidade, gerador):
+    """`quantidade` CPFs válidos (só dígitos) e distintos."""
+    bases = gerador.choice(10 ** 9, size=quantidade + 10, replace=False)
+    digitos = (bases[:, None] // 10 ** np.arange(8, -1, -1)) % 10
+    # Bases com todos os dígitos iguais geram CPFs inválidos.
+    digitos = digitos[~(digitos == digitos[:, :1]).all(axis=1)][:quantidade]
+    resto1 = digitos @ PESOS_DIGITO1[:9] % 11
+    completo = np.column_stack((digitos, np.where(resto1 < 2, 0, 11 - resto1)))
+    resto2 = completo @ PESOS_DIGITO2 % 11
+    completo = np.column_stack((completo, np.where(resto2 < 2, 0, 11 - resto2)))
+    return [''.join(map(str, linha)) for linha in completo]
+
+
+def _clientes(quantidade, gerador):
+    nomes = gerador.integers(0, len(NOMES), quantidade)
+    sobrenomes = gerador.integers(0, len(SOBRENOMES), (quantidade, 2))
+    telefones = gerador.integers(0, 10 ** 8, quantidade)
+    # A mesma semente repete os CPFs: os já cadastrados ficam de fora.
+    existentes = set(Cliente.objects.values_list('cpf_digitos', flat=True))
+    cpfs = [cpf for cpf in gerar_cpfs(quantidade + len(existentes), gerador) if cpf not in existentes]
+    for i, cpf in enumerate(cpfs[:quantidade]):
+        cliente = Cliente(
+            nome=f'{NOMES[nomes[i]]} {SOBRENOMES[sobrenomes[i, 0]]} {SOBRENOMES[sobrenomes[i, 1]]}',
+            cpf=formatar_cpf(cpf), telefone=f'(11) 9{telefones[i] // 10000:04d}-{telefones[i] % 10000:04d}',
+        )
+        cliente.preencher_digitos()
+        yield cliente
+
+
+def _enderecos(clientes, por_cliente, ceps, gerador):
+    quantidade = len(clientes) * por_cliente
+    latitudes = CENTRO[0] + gerador.uniform(-RAIO_GRAUS[0], RAIO_GRAUS[0], quantidade)
+    longitudes = CENTRO[1] + gerador.uniform(-RAIO_GRAUS[1], RAIO_GRAUS[1], quantidade)
+    escolhas = gerador.integers(0, 1 << 30, (quantidade, 4))
+    for i in range(quantidade):
+        latitude, longitude = float(latitudes[i]), float(longitudes[i])
+        endereco = Endereco(
+            cliente=clientes[i // por_cliente], cep=ceps[escolhas[i, 0] % len(ceps)],
+            logradouro=LOGRADOUROS[escolhas[i, 1] % len(LOGRADOUROS)], numero=str(escolhas[i, 2] % 3000 + 1),
+            complemento='Apto 12' if escolhas[i, 3] % 4 == 0 else None,
+            bairro=BAIRROS[escolhas[i, 3] % len(BAIRROS)], cidade='São Paulo', estado='SP',
+            principal=i % por_cliente == 0,
+            latitude=latitude, longitude=longitude, geocelula=geo.celula(latitude, longitude),
+        )
+        endereco.preencher_digitos()
+        yield endereco
+
+
+def _entregas(quantidade, enderecos, entregadores, meses, gerador):
+    agora = timezone.now()
+    # Dos últimos `meses` até dois dias à frente, com o horário comercial mais denso.
+    inicio = agora - timedelta(days=30 * meses)
+    segundos = gerador.uniform(0, (agora + timedelta(days=2) - inicio).total_seconds(), quantidade)
+    escolhas = gerador.integers(0, 1 << 30, (quantidade, 6))
+    for i in range(quantidade):
+        quando = inicio + timedelta(seconds=float(segundos[i]))
+        endereco = enderecos[escolhas[i, 0] % len(enderecos)]
+        if quando > agora:
+            status = Entrega.STATUS_PENDENTE
+        elif quando > agora - timedelta(hours=4):
+            status = (Entrega.STATUS_PENDENTE, Entrega.STATUS_EM_TRANSITO)[escolhas[i, 1] % 2]
+        else:
+            status = Entrega.STATUS_ENTREGUE if escolhas[i, 1] % 50 else Entrega.STATUS_PENDENTE
+        entregador = None
+        if status != Entrega.STATUS_PENDENTE or escolhas[i, 2] % 3:
+            entregador = entregadores[escolhas[i, 2] % len(entregadores)] if entregadores else None
+        entrega = Entrega(
+            cliente=endereco.cliente, endereco=endereco, entregador=entregador, status=status,
+            numero_caixas=int(escolhas[i, 3] % 8 + 1), bebidas=bool(escolhas[i, 4] & 1),
+            frios_congelados=bool(escolhas[i, 4] & 2), vassoura_rodo=not escolhas[i, 4] % 13, outros=bool(escolhas[i, 4] & 4),
+            nome_embalador=EMBALADORES[escolhas[i, 5] % len(EMBALADORES)], numero_nfce=str(100000 + i), serie_nfce='1',
+            data_compra=agregados.dia_local(quando - timedelta(days=int(escolhas[i, 5] % 3))), data_hora_entrega=quando,
+        )
+        entrega.documento_busca = montar_documento(entrega)
+        yield entrega
+
+
+def _em_lotes(objetos, modelo, tamanho):
+    criados, lote = [], []
+    for objeto in objetos:
+        lote.append(objeto)
+        if len(lote) >= tamanho:
+            criados.extend(modelo.objects.bulk_create(lote))
+            lote = []
+    if lote:
+        criados.extend(modelo.objects.bulk_create(lote))
+    return criados
+
+
+def gerar(clientes=1000, enderecos_por_cliente=2, entregas=10000, entregadores=10, meses=6, semente=1, lote=2000):
+    """Cria os dados no banco atual e devolve a quantidade criada de cada modelo."""
+    gerador = np.random.default_rng(semente)
+    ceps = [formatar_cep(f'{cep:08d}') for cep in gerador.choice(np.arange(1000000, 9999999, 1000), 200, replace=False)]
+    with transaction.atomic():
+        Cep.objects.bulk_create(
+            (Cep(cep=cep.replace('-', ''), logradouro='Rua Sintética', bairro='Centro', cidade='São Paulo', estado='SP',
+                 origem=Cep.ORIGEM_OFFLINE) for cep in ceps),
+            ignore_conflicts=True,
+        )
+        novos_entregadores = Entregador.objects.bulk_create(
+            Entregador(nome=f'{NOMES[i % len(NOMES)]} {SOBRENOMES[-1 - i % len(SOBRENOMES)]}') for i in range(entregadores)
+        )
+        novos_clientes = _em_lotes(_clientes(clientes, gerador), Cliente, lote)
+        novos_enderecos = _em_lotes(_enderecos(novos_clientes, enderecos_por_cliente, ceps, gerador), Endereco, lote)
+        novas_entregas = _em_lotes(
+            _entregas(entregas, novos_enderecos, novos_entregadores, meses, gerador), Entrega, lote
+        ) if novos_enderecos else []
+        agregados.reconstruir()
+    invalidar('clientes', 'entregadores')
+    return {
+        'entregadores': len(novos_entregadores), 'clientes': len(novos_clientes),
+        'enderecos': len(novos_enderecos), 'entregas': len(novas_entregas),
+    }
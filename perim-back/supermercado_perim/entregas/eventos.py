@@ -0,0 +1,293 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+import select
+import socket
+import tempfile
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# Eventos de Entrega (criação, alteração, remoção) para o stream SSE em
+# /api/eventos/entregas/.
+#   - Hub: fan-out dentro do processo. Cada conexão SSE é uma assinatura com
+#     uma fila limitada (EVENTOS_FILA_MAXIMA) no event loop dela; o evento é
+#     serializado uma única vez e a mesma string vai para todas as filas cujo
+#     filtro (entregador, status) aceita o evento. Quem não consome a tempo
+#     perde a fila e recebe um `reset` (o cliente recarrega a lista).
+#   - Backend (EVENTOS_BACKEND): 'local' entrega só no próprio processo;
+#     'socket' manda um datagrama Unix para cada processo com assinantes
+#     (sockets em EVENTOS_SOCKET_DIRETORIO); 'postgres' usa NOTIFY/LISTEN no
+#     canal EVENTOS_CANAL. Nos dois últimos o próprio processo também recebe
+#     pelo backend, para não duplicar.
+# Os eventos saem depois do commit da transação que os gerou.
+
+CRIADA, ALTERADA, REMOVIDA = 'criada', 'alterada', 'removida'
+REINICIAR = object()
+
+
+class Evento:
+    def __init__(self, tipo, id, status, entregador_id, updated_at, status_anterior=None, entregador_anterior=None):
+        self.dados = {
+            'tipo': tipo, 'id': id, 'status': status, 'entregador_id': entregador_id, 'updated_at': updated_at,
+        }
+        # Quem filtra pelo entregador ou status antigo também precisa saber que a entrega saiu da sua lista.
+        self.status_anterior = status if status_anterior is None else status_anterior
+        self.entregador_anterior = entregador_id if tipo != ALTERADA else entregador_anterior
+        self.status = {status, self.status_anterior}
+        self.entregadores = {entregador_id, self.entregador_anterior}
+        self._mensagem = None
+
+    @classmethod
+    def de_dicionario(cls, dados):
+        return cls(**dados)
+
+    def como_dicionario(self):
+        return {**self.dados, 'status_anterior': self.status_anterior, 'entregador_anterior': self.entregador_anterior}
+
+    def mensagem(self):
+        if self._mensagem is None:
+            dados = json.dumps(self.dados, cls=DjangoJSONEncoder, separators=(',', ':'))
+            self._mensagem = f'event: entrega\ndata: {dados}\n\n'.encode('utf-8')
+        return self._mensagem
+
+
+class Assinatura:
+    def __init__(self, entregadores=None, status=None):
+        self.entregadores = set(entregadores) if entregadores else None
+        self.status = set(status) if status else None
+        self.loop = asyncio.get_running_loop()
+        self.fila = asyncio.Queue(getattr(settings, 'EVENTOS_FILA_MAXIMA', 100))
+
+    def aceita(self, evento):
+        return (
+            (self.entregadores is None or not self.entregadores.isdisjoint(evento.entregadores))
+            and (self.status is None or not self.status.isdisjoint(evento.status))
+        )
+
+    def receber(self, mensagem):
+        # Roda no event loop da assinatura.
+        try:
+            self.fila.put_nowait(mensagem)
+        except asyncio.QueueFull:
+            while not self.fila.empty():
+                self.fila.get_nowait()
+            self.fila.put_nowait(REINICIAR)
+
+
+class Hub:
+    def __init__(self):
+        self._assinaturas = set()
+        self._lock = threading.Lock()
+
+    def assinar(self, entregadores=None, status=None):
+        backend().iniciar(self)
+        assinatura = Assinatura(entregadores, status)
+        with self._lock:
+            self._assinaturas.add(assinatura)
+        return assinatura
+
+    def cancelar(self, assinatura):
+        with self._lock:
+            self._assinaturas.discard(assinatura)
+
+    def __len__(self):
+        return len(self._assinaturas)
+
+    def entregar(self, evento):
+        # Pode ser chamado de qualquer thread. Uma chamada por event loop, não por assinatura.
+        por_loop = {}
+        with self._lock:
+            for assinatura in self._assinaturas:
+                if assinatura.aceita(evento):
+                    por_loop.setdefault(assinatura.loop, []).append(assinatura)
+        if not por_loop:
+            return
+        mensagem = evento.mensagem()
+        for loop, assinaturas in por_loop.items():
+            try:
+                loop.call_soon_threadsafe(_receber, assinaturas, mensagem)
+            except RuntimeError:  # loop já encerrado
+                for assinatura in assinaturas:
+                    self.cancelar(assinatura)
+
+
+def _receber(assinaturas, mensagem):
+    for assinatura in assinaturas:
+        assinatura.receber(mensagem)
+
+
+hub = Hub()
+
+
+class BackendLocal:
+    def iniciar(self, hub):
+        pass
+
+    def publicar(self, eventos):
+        for evento in eventos:
+            hub.entregar(evento)
+
+
+class _Ouvinte:
+    # Thread daemon que recebe eventos de outros processos e os entrega ao hub.
+    def __init__(self):
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def iniciar(self, hub):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._preparar()
+                self._thread = threading.Thread(target=self._ouvir, args=(hub,), daemon=True, name=type(self).__name__)
+                self._thread.start()
+
+    def _preparar(self):
+        pass
+
+    def _entregar(self, hub, bruto):
+        try:
+            itens = json.loads(bruto)
+        except ValueError:
+            logger.warning('Evento de entrega inválido recebido: %r', bruto[:200])
+            return
+        for dados in itens:
+            hub.entregar(Evento.de_dicionario(dados))
+
+
+def _serializar(eventos):
+    return json.dumps([evento.como_dicionario() for evento in eventos], cls=DjangoJSONEncoder, separators=(',', ':'))
+
+
+class BackendSocket(_Ouvinte):
+    TAMANHO_MAXIMO = 60000
+
+    def __init__(self, diretorio=None):
+        super().__init__()
+        self.diretorio = diretorio or getattr(settings, 'EVENTOS_SOCKET_DIRETORIO', None) or os.path.join(
+            tempfile.gettempdir(), 'supermercado_perim_eventos'
+        )
+        self._socket = None
+
+    def _preparar(self):
+        os.makedirs(self.diretorio, mode=0o700, exist_ok=True)
+        caminho = os.path.join(self.diretorio, f'{os.getpid()}.sock')
+        if os.path.exists(caminho):
+            os.unlink(caminho)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._socket.bind(caminho)
+
+    def _ouvir(self, hub):
+        while True:
+            self._entregar(hub, self._socket.recv(self.TAMANHO_MAXIMO * 2))
+
+    def _datagramas(self, eventos):
+        # Um lote grande (alteração em massa) é dividido para caber num datagrama.
+        lote = []
+        for evento in eventos:
+            lote.append(evento)
+            if len(lote) >= 200:
+                yield _serializar(lote).encode('utf-8')
+                lote = []
+        if lote:
+            yield _serializar(lote).encode('utf-8')
+
+    def publicar(self, eventos):
+        destinos = glob.glob(os.path.join(self.diretorio, '*.sock'))
+        if not destinos:
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as emissor:
+            emissor.setblocking(False)
+            for datagrama in self._datagramas(eventos):
+                for destino in destinos:
+                    try:
+                        emissor.sendto(datagrama, destino)
+                    except (ConnectionRefusedError, FileNotFoundError):
+                        # Processo que terminou sem remover o socket.
+                        try:
+                            os.unlink(destino)
+                        except OSError:
+                            pass
+                    except BlockingIOError:
+                        logger.warning('Fila do socket %s cheia; evento descartado.', destino)
+
+
+class BackendPostgres(_Ouvinte):
+    INTERVALO = 5.0
+
+    def __init__(self, canal=None, alias='default'):
+        super().__init__()
+        self.canal = canal or getattr(settings, 'EVENTOS_CANAL', 'entregas_eventos')
+        self.alias = alias
+
+    def _conectar(self):
+        wrapper = connections[self.alias]
+        conexao = wrapper.get_new_connection(wrapper.get_connection_params())
+        conexao.autocommit = True
+        with conexao.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.canal}"')
+        return conexao
+
+    def _ouvir(self, hub):
+        while True:
+            try:
+                conexao = self._conectar()
+                if hasattr(conexao, 'poll'):  # psycopg2
+                    while True:
+                        if select.select([conexao], [], [], self.INTERVALO)[0]:
+                            conexao.poll()
+                            while conexao.notifies:
+                                self._entregar(hub, conexao.notifies.pop(0).payload)
+                else:  # psycopg 3
+                    while True:
+                        for notificacao in conexao.notifies(timeout=self.INTERVALO):
+                            self._entregar(hub, notificacao.payload)
+            except Exception:
+                logger.exception('Conexão LISTEN perdida; reconectando.')
+                threading.Event().wait(self.INTERVALO)
+
+    def publicar(self, eventos):
+        eventos = list(eventos)
+        # O payload do NOTIFY tem limite de 8000 bytes.
+        with connections[self.alias].cursor() as cursor:
+            for inicio in range(0, len(eventos), 40):
+                cursor.execute('SELECT pg_notify(%s, %s)', [self.canal, _serializar(eventos[inicio:inicio + 40])])
+
+
+BACKENDS = {'local': BackendLocal, 'socket': BackendSocket, 'postgres': BackendPostgres}
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def backend():
+    global _backend
+    with _backend_lock:
+        nome = getattr(settings, 'EVENTOS_BACKEND', 'local')
+        if _backend is None or not isinstance(_backend, BACKENDS[nome]):
+            _backend = BACKENDS[nome]()
+        return _backend
+
+
+def publicar(eventos):
+    """Publica `eventos` quando a transação atual for confirmada."""
+    eventos = list(eventos)
+    if eventos:
+        transaction.on_commit(lambda: backend().publicar(eventos))
+
+
+def evento(anteriores, atuais, id, updated_at=None):
+    """Evento a partir de um par (anteriores, atuais) no formato de Entrega.valores_atuais()."""
+    if atuais is None:
+        return Evento(REMOVIDA, id, anteriores['status'], anteriores['entregador_id'], updated_at)
+    if anteriores is None:
+        return Evento(CRIADA, id, atuais['status'], atuais['entregador_id'], updated_at)
+    return Evento(
+        ALTERADA, id, atuais['status'], atuais['entregador_id'], updated_at,
+        anteriores['status'], anteriores['entregador_id']
+    )
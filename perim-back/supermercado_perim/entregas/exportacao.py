@@ -0,0 +1,90 @@
+import csv
+import json
+
+from django.utils import timezone
+
+CHUNK_SIZE = 2000
+LINHAS_POR_BLOCO = 500
+
+# (nome da coluna na exportação, lookup usado no values_list)
+COLUNAS = [
+    ('id', 'id'),
+    ('cliente_id', 'cliente_id'),
+    ('cliente_nome', 'cliente__nome'),
+    ('cliente_cpf', 'cliente__cpf'),
+    ('entregador_id', 'entregador_id'),
+    ('entregador_nome', 'entregador__nome'),
+    ('status', 'status'),
+    ('numero_caixas', 'numero_caixas'),
+    ('bebidas', 'bebidas'),
+    ('frios_congelados', 'frios_congelados'),
+    ('vassoura_rodo', 'vassoura_rodo'),
+    ('outros', 'outros'),
+    ('nome_embalador', 'nome_embalador'),
+    ('numero_nfce', 'numero_nfce'),
+    ('serie_nfce', 'serie_nfce'),
+    ('data_compra', 'data_compra'),
+    ('data_hora_entrega', 'data_hora_entrega'),
+    ('endereco_cep', 'endereco__cep'),
+    ('endereco_logradouro', 'endereco__logradouro'),
+    ('endereco_numero', 'endereco__numero'),
+    ('endereco_complemento', 'endereco__complemento'),
+    ('endereco_bairro', 'endereco__bairro'),
+    ('endereco_cidade', 'endereco__cidade'),
+    ('endereco_estado', 'endereco__estado'),
+]
+NOMES = [nome for nome, _ in COLUNAS]
+LOOKUPS = [lookup for _, lookup in COLUNAS]
+INDICE_DATA_COMPRA = NOMES.index('data_compra')
+INDICE_DATA_HORA = NOMES.index('data_hora_entrega')
+
+
+class _Eco:
+    def write(self, value):
+        return value
+
+
+def linhas(queryset):
+    # values_list + iterator: sem instâncias de modelo nem serializers do DRF,
+    # e o banco entrega os registros em blocos de CHUNK_SIZE.
+    registros = (
+        queryset
+        .order_by('-data_hora_entrega', '-id')
+        .values_list(*LOOKUPS)
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    for registro in registros:
+        linha = list(registro)
+        linha[INDICE_DATA_COMPRA] = linha[INDICE_DATA_COMPRA].isoformat()
+        linha[INDICE_DATA_HORA] = timezone.localtime(linha[INDICE_DATA_HORA]).isoformat()
+        yield linha
+
+
+def _em_blocos(partes):
+    bloco = []
+    for parte in partes:
+        bloco.append(parte)
+        if len(bloco) >= LINHAS_POR_BLOCO:
+            yield ''.join(bloco)
+            bloco = []
+    if bloco:
+        yield ''.join(bloco)
+
+
+def gerar_csv(queryset):
+    writer = csv.writer(_Eco())
+    yield writer.writerow(NOMES)
+    yield from _em_blocos(writer.writerow(linha) for linha in linhas(queryset))
+
+
+def gerar_ndjson(queryset):
+    yield from _em_blocos(
+        json.dumps(dict(zip(NOMES, linha)), ensure_ascii=False) + '\n'
+        for linha in linhas(queryset)
+    )
+
+
+FORMATOS = {
+    'csv': (gerar_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (gerar_ndjson, 'application/x-ndjson; charset=utf-8'),
+}
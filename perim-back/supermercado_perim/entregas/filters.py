@@ -0,0 +1,132 @@
+import math
+import re
+from datetime import date, timedelta
+
+from django.db.models import Q
+from django.utils.dateparse import parse_date
+
+from . import geo
+from .agregados import inicio_do_dia
+from .busca import condicao_busca, normalizar
+from .models import Endereco, Entrega, somente_digitos
+
+TERMO_NUMERICO = re.compile(r'[\d\s.()/-]*\d[\d\s.()/-]*')
+
+
+def _numeros(texto, quantidade):
+    try:
+        valores = [float(parte) for parte in texto.split(',')]
+    except (AttributeError, ValueError):
+        return None
+    return valores if len(valores) == quantidade and all(map(math.isfinite, valores)) else None
+
+
+def digitos_da_busca(texto):
+    """Os dígitos de `texto` se ele for só número e máscara (CPF, telefone, CEP); senão None."""
+    if texto and TERMO_NUMERICO.fullmatch(texto):
+        return somente_digitos(texto)
+    return None
+
+
+def condicao_prefixo(campo, digitos):
+    # Faixa [digitos, próximo prefixo) em vez de LIKE 'digitos%', que no
+    # SQLite (e no PostgreSQL fora do locale C) não usa o índice B-tree.
+    condicao = Q(**{f'{campo}__gte': digitos})
+    sem_noves = digitos.rstrip('9')
+    if sem_noves:
+        condicao &= Q(**{f'{campo}__lt': sem_noves[:-1] + str(int(sem_noves[-1]) + 1)})
+    return condicao
+
+
+def filtrar_clientes(queryset, params):
+    # cpf: igualdade, com ou sem máscara. nome: trecho do nome.
+    # search: se for numérico, prefixo do CPF, do telefone ou do CEP de um
+    # dos endereços (colunas só com dígitos, indexadas); senão, trecho do nome.
+    cpf = somente_digitos(params.get('cpf'))
+    nome_param = params.get('nome', None)
+    search_term = params.get('search', None)
+
+    if cpf:
+        queryset = queryset.filter(cpf_digitos=cpf)
+    if nome_param:
+        queryset = queryset.filter(nome__icontains=nome_param)
+    elif search_term:
+        digitos = digitos_da_busca(search_term)
+        if digitos:
+            queryset = queryset.filter(
+                condicao_prefixo('cpf_digitos', digitos)
+                | condicao_prefixo('telefone_digitos', digitos)
+                | Q(pk__in=Endereco.objects.filter(condicao_prefixo('cep_digitos', digitos)).values('cliente_id'))
+            )
+        else:
+            queryset = queryset.filter(nome__icontains=search_term)
+    return queryset
+
+
+def filtrar_enderecos(queryset, params):
+    # cep: prefixo, com ou sem máscara; mais lat/lon/raio_km e bbox.
+    cep = somente_digitos(params.get('cep'))
+    if cep:
+        queryset = queryset.filter(condicao_prefixo('cep_digitos', cep))
+    return filtrar_por_regiao(queryset, params)
+
+
+def condicao_regiao(params, prefixo=''):
+    # lat, lon e raio_km: endereços a até raio_km do ponto.
+    # bbox=lat_min,lon_min,lat_max,lon_max: endereços dentro do retângulo.
+    condicao = Q()
+    ponto = _numeros(f"{params.get('lat')},{params.get('lon')},{params.get('raio_km')}", 3)
+    if ponto and -90 <= ponto[0] <= 90 and ponto[2] > 0:
+        condicao &= geo.condicao_raio(*ponto, prefixo=prefixo)
+    retangulo = _numeros(params.get('bbox'), 4)
+    if retangulo and retangulo[0] <= retangulo[2] and retangulo[1] <= retangulo[3]:
+        condicao &= geo.condicao_retangulo(*retangulo, prefixo=prefixo)
+    return condicao
+
+
+def filtrar_por_regiao(queryset, params, prefixo=''):
+    condicao = condicao_regiao(params, prefixo)
+    return queryset.filter(condicao) if condicao else queryset
+
+
+def filtrar_entregas(queryset, params):
+    cliente_id_param = params.get('cliente', None)
+    entregador_id_param = params.get('entregador', None)
+    data_inicio = params.get('data_inicio', None)
+    data_fim = params.get('data_fim', None)
+    search = params.get('search', None)
+    status_param = params.get('status', None)
+
+    if cliente_id_param:
+        queryset = queryset.filter(cliente_id=cliente_id_param)
+    if entregador_id_param:
+        queryset = queryset.filter(entregador_id=entregador_id_param)
+    # Dias no TIME_ZONE como faixas [início do dia, início do dia seguinte):
+    # comparar a coluna direto (e não data_hora_entrega__date) usa os índices.
+    if data_inicio:
+        data_inicio_parsed = parse_date(data_inicio)
+        if data_inicio_parsed:
+            queryset = queryset.filter(data_hora_entrega__gte=inicio_do_dia(data_inicio_parsed))
+    if data_fim:
+        data_fim_parsed = parse_date(data_fim)
+        # Em date.max não há dia seguinte: o fim fica em aberto.
+        if data_fim_parsed and data_fim_parsed < date.max:
+            queryset = queryset.filter(data_hora_entrega__lt=inicio_do_dia(data_fim_parsed + timedelta(days=1)))
+    if status_param:
+        queryset = queryset.filter(status=status_param)
+    regiao = condicao_regiao(params)
+    if regiao:
+        # Subconsulta pelo índice de geocelula dos endereços; com o JOIN, o
+        # banco percorreria as entregas na ordem de data testando cada endereço.
+        queryset = queryset.filter(endereco_id__in=Endereco.objects.filter(regiao).values('id'))
+
+    if search:
+        # O status fica fora do documento de busca (muda por UPDATE em lote);
+        # como são poucos valores, a comparação é feita aqui mesmo.
+        termo = normalizar(search)
+        status_compativeis = [valor for valor, _ in Entrega.STATUS_CHOICES if termo and termo in valor]
+        condicao = condicao_busca(search, queryset.db)
+        if status_compativeis:
+            condicao |= Q(status__in=status_compativeis)
+        queryset = queryset.filter(condicao)
+    return queryset
@@ -0,0 +1,104 @@
+import math
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.db.models.lookups import LessThanOrEqual
+
+from .cep import CacheLRU
+from .models import CentroideCep, somente_digitos
+
+# Coordenadas dos endereços e índice espacial em grade.
+#   - latitude/longitude vêm do centroide do CEP (CentroideCep, prefixo mais
+#     longo entre 8, 5 e 3 dígitos), com um cache LRU no processo.
+#   - geocelula numera a célula de GEO_CELULA_GRAUS x GEO_CELULA_GRAUS graus
+#     que contém o ponto, linha a linha. As células de uma mesma linha têm
+#     números consecutivos, então um retângulo vira uma faixa de geocelula
+#     por linha, atendida pelo índice B-tree.
+# Mudar GEO_CELULA_GRAUS exige recalcular as células (`geocodificar_enderecos --todos`).
+
+TAMANHOS_PREFIXO = (8, 5, 3)
+KM_POR_GRAU = 111.32
+SEM_CENTROIDE = (None, None)
+
+cache_centroides = CacheLRU(getattr(settings, 'GEO_CACHE_TAMANHO', 10000))
+
+
+def _tamanho_celula():
+    return getattr(settings, 'GEO_CELULA_GRAUS', 0.01)
+
+
+def _colunas():
+    return math.ceil(360 / _tamanho_celula()) + 1
+
+
+def _linha_coluna(latitude, longitude):
+    tamanho = _tamanho_celula()
+    return math.floor((latitude + 90) / tamanho), math.floor((longitude + 180) / tamanho)
+
+
+def celula(latitude, longitude):
+    if latitude is None or longitude is None:
+        return None
+    linha, coluna = _linha_coluna(latitude, longitude)
+    return linha * _colunas() + coluna
+
+
+def coordenadas(ceps):
+    """{cep: (latitude, longitude)} para os CEPs com centroide conhecido."""
+    por_cep = {cep: somente_digitos(cep) for cep in set(ceps)}
+    ttl = getattr(settings, 'GEO_CACHE_TTL', 60 * 60)
+    conhecidos = {}
+    for d in set(por_cep.values()):
+        valor = cache_centroides.get(d)
+        if valor is not None:
+            conhecidos[d] = valor
+    faltando = {d for d in por_cep.values() if d not in conhecidos}
+    if faltando:
+        prefixos = {d[:tamanho] for d in faltando for tamanho in TAMANHOS_PREFIXO if len(d) >= tamanho}
+        centroides = {
+            c['prefixo']: (c['latitude'], c['longitude'])
+            for c in CentroideCep.objects.filter(prefixo__in=prefixos).values('prefixo', 'latitude', 'longitude')
+        }
+        for d in faltando:
+            conhecidos[d] = next(
+                (centroides[d[:tamanho]] for tamanho in TAMANHOS_PREFIXO if d[:tamanho] in centroides), SEM_CENTROIDE
+            )
+            cache_centroides.set(d, conhecidos[d], ttl)
+    return {cep: conhecidos[d] for cep, d in por_cep.items() if conhecidos[d] != SEM_CENTROIDE}
+
+
+def preencher(enderecos):
+    """Atualiza latitude, longitude e geocelula de `enderecos` (sem gravar)."""
+    posicoes = coordenadas(endereco.cep for endereco in enderecos)
+    for endereco in enderecos:
+        endereco.latitude, endereco.longitude = posicoes.get(endereco.cep, SEM_CENTROIDE)
+        endereco.geocelula = celula(endereco.latitude, endereco.longitude)
+
+
+def condicao_retangulo(lat_min, lon_min, lat_max, lon_max, prefixo=''):
+    linha_min, coluna_min = _linha_coluna(lat_min, lon_min)
+    linha_max, coluna_max = _linha_coluna(lat_max, lon_max)
+    colunas = _colunas()
+    if linha_max - linha_min + 1 > getattr(settings, 'GEO_MAXIMO_FAIXAS', 64):
+        # Retângulo muito alto: uma faixa só, do primeiro ao último número, e o resto fica com lat/lon.
+        celulas = Q(**{f'{prefixo}geocelula__range': (linha_min * colunas + coluna_min, linha_max * colunas + coluna_max)})
+    else:
+        celulas = Q()
+        for linha in range(linha_min, linha_max + 1):
+            celulas |= Q(**{f'{prefixo}geocelula__range': (linha * colunas + coluna_min, linha * colunas + coluna_max)})
+    return celulas & Q(**{
+        f'{prefixo}latitude__range': (lat_min, lat_max),
+        f'{prefixo}longitude__range': (lon_min, lon_max),
+    })
+
+
+def condicao_raio(latitude, longitude, raio_km, prefixo=''):
+    dlat = raio_km / KM_POR_GRAU
+    cosseno = max(math.cos(math.radians(latitude)), 1e-6)
+    dlon = dlat / cosseno
+    # Distância pela projeção equirretangular, em graus de latitude.
+    norte_sul = F(f'{prefixo}latitude') - latitude
+    leste_oeste = (F(f'{prefixo}longitude') - longitude) * cosseno
+    return condicao_retangulo(
+        latitude - dlat, longitude - dlon, latitude + dlat, longitude + dlon, prefixo
+    ) & Q(LessThanOrEqual(norte_sul * norte_sul + leste_oeste * leste_oeste, dlat * dlat))
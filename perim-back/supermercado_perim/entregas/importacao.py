@@ -0,0 +1,213 @@
+import re
+
+import numpy as np
+from django.db import IntegrityError, transaction
+
+from .cache_respostas import invalidar
+from .cep import formatar_cep, normalizar_cep
+from .lote import criar_enderecos
+from .models import Cliente, Endereco
+
+# Importação de clientes (com um endereço opcional por linha) a partir de um
+# CSV com as colunas nome,cpf,telefone,cep,logradouro,numero,complemento,
+# bairro,cidade,estado. As linhas são lidas em streaming e processadas em
+# lotes de `tamanho_lote`:
+#   - os dígitos verificadores dos CPFs do lote são conferidos de uma vez
+#     (numpy), sem o laço de Cliente.is_valid_cpf por linha;
+#   - CPFs já cadastrados vêm de uma única consulta no início, e os repetidos
+#     no próprio arquivo entram no mesmo conjunto;
+#   - clientes entram com bulk_create(ignore_conflicts=True) e os endereços
+#     com lote.criar_enderecos, um lote por transação.
+# Cada linha recusada vira um erro (linha, cpf, mensagem); o restante do lote
+# é importado normalmente.
+
+CAMPOS_CLIENTE = ('nome', 'cpf', 'telefone')
+CAMPOS_ENDERECO = ('cep', 'logradouro', 'numero', 'complemento', 'bairro', 'cidade', 'estado')
+COLUNAS = CAMPOS_CLIENTE + CAMPOS_ENDERECO
+OBRIGATORIOS_ENDERECO = ('cep', 'logradouro', 'numero', 'bairro', 'cidade', 'estado')
+
+MENSAGEM_CPF_INVALIDO = 'CPF inválido.'
+MENSAGEM_CPF_CADASTRADO = 'Este CPF já está cadastrado.'
+MENSAGEM_CPF_REPETIDO = 'CPF repetido no arquivo (linha {linha}).'
+MENSAGEM_TELEFONE = 'Telefone deve estar no formato (XX) XXXXX-XXXX'
+MENSAGEM_CEP = 'CEP deve estar no formato XXXXX-XXX'
+
+PESOS_DIGITO1 = np.arange(10, 1, -1)
+PESOS_DIGITO2 = np.arange(11, 1, -1)
+NAO_DIGITO = re.compile(r'\D')
+
+
+def digitos_verificadores_validos(cpfs):
+    """
+    Array booleano dizendo, para cada CPF de `cpfs` (strings com exatamente
+    11 dígitos ASCII), se os dígitos verificadores conferem. Mesma regra de
+    Cliente.is_valid_cpf.
+    """
+    if not cpfs:
+        return np.zeros(0, dtype=bool)
+    matriz = (np.frombuffer(''.join(cpfs).encode('ascii'), dtype=np.uint8) - ord('0')).reshape(-1, 11).astype(np.int64)
+    resto1 = matriz[:, :9] @ PESOS_DIGITO1 % 11
+    resto2 = matriz[:, :10] @ PESOS_DIGITO2 % 11
+    digito1 = np.where(resto1 < 2, 0, 11 - resto1)
+    digito2 = np.where(resto2 < 2, 0, 11 - resto2)
+    repetidos = (matriz == matriz[:, :1]).all(axis=1)
+    return (matriz[:, 9] == digito1) & (matriz[:, 10] == digito2) & ~repetidos
+
+
+def formatar_cpf(digitos):
+    return f'{digitos[:3]}.{digitos[3:6]}.{digitos[6:9]}-{digitos[9:]}'
+
+
+def formatar_telefone(valor):
+    digitos = NAO_DIGITO.sub('', valor)
+    if len(digitos) not in (10, 11):
+        return None
+    return f'({digitos[:2]}) {digitos[2:-4]}-{digitos[-4:]}'
+
+
+def _tamanhos(modelo, campos):
+    return {campo: modelo._meta.get_field(campo).max_length for campo in campos}
+
+
+TAMANHOS = {**_tamanhos(Cliente, CAMPOS_CLIENTE), **_tamanhos(Endereco, CAMPOS_ENDERECO)}
+
+
+def _limpar(linha):
+    valores = {campo: (linha.get(campo) or '').strip() for campo in COLUNAS}
+    erros = []
+    if not valores['nome']:
+        erros.append('Nome é obrigatório.')
+    telefone = formatar_telefone(valores['telefone'])
+    if telefone is None:
+        erros.append(MENSAGEM_TELEFONE)
+    valores['telefone'] = telefone
+
+    if any(valores[campo] for campo in CAMPOS_ENDERECO):
+        faltando = [campo for campo in OBRIGATORIOS_ENDERECO if not valores[campo]]
+        if faltando:
+            erros.append(f'Endereço incompleto: falta {", ".join(faltando)}.')
+        elif normalizar_cep(valores['cep']) is None:
+            erros.append(MENSAGEM_CEP)
+        else:
+            valores['cep'] = formatar_cep(normalizar_cep(valores['cep']))
+        valores['estado'] = valores['estado'].upper()
+        valores['endereco'] = True
+    else:
+        valores['endereco'] = False
+
+    for campo, tamanho in TAMANHOS.items():
+        if valores[campo] and len(valores[campo]) > tamanho:
+            erros.append(f'{campo}: no máximo {tamanho} caracteres.')
+    return valores, erros
+
+
+class Importacao:
+    def __init__(self, erros=None, tamanho_lote=5000):
+        # `erros` recebe tuplas (linha, cpf, mensagem); pode ser uma lista ou
+        # qualquer objeto com append (por exemplo, o relatório em arquivo).
+        self.erros = [] if erros is None else erros
+        self.tamanho_lote = tamanho_lote
+        self.linhas = self.clientes = self.enderecos = self.recusadas = 0
+        # CPF (só dígitos) -> linha do arquivo em que apareceu; 0 para os já cadastrados.
+        self.vistos = dict.fromkeys(Cliente.objects.values_list('cpf_digitos', flat=True).iterator(chunk_size=20000), 0)
+
+    def processar(self, linhas, primeira_linha=2):
+        """Importa `linhas` (dicts, como os do csv.DictReader), numeradas a partir de `primeira_linha`."""
+        lote = []
+        for numero, linha in enumerate(linhas, start=primeira_linha):
+            lote.append((numero, linha))
+            if len(lote) >= self.tamanho_lote:
+                self._processar_lote(lote)
+                lote = []
+        if lote:
+            self._processar_lote(lote)
+        return self.resumo()
+
+    def resumo(self):
+        return {
+            'linhas': self.linhas, 'clientes_criados': self.clientes,
+            'enderecos_criados': self.enderecos, 'linhas_recusadas': self.recusadas,
+        }
+
+    def _processar_lote(self, lote):
+        self.linhas += len(lote)
+        recusas, candidatos = [], []
+        for numero, linha in lote:
+            valores, erros = _limpar(linha)
+            cpf = NAO_DIGITO.sub('', valores['cpf'])
+            if len(cpf) != 11 or not cpf.isascii():
+                erros.insert(0, MENSAGEM_CPF_INVALIDO)
+            if erros:
+                recusas.append((numero, valores['cpf'], ' '.join(erros)))
+            else:
+                candidatos.append((numero, cpf, valores))
+
+        validos = digitos_verificadores_validos([cpf for _, cpf, _ in candidatos])
+        clientes, enderecos = [], []
+        for (numero, cpf, valores), valido in zip(candidatos, validos):
+            if not valido:
+                recusas.append((numero, valores['cpf'], MENSAGEM_CPF_INVALIDO))
+                continue
+            anterior = self.vistos.get(cpf)
+            if anterior is not None:
+                mensagem = MENSAGEM_CPF_CADASTRADO if anterior == 0 else MENSAGEM_CPF_REPETIDO.format(linha=anterior)
+                recusas.append((numero, valores['cpf'], mensagem))
+                continue
+            self.vistos[cpf] = numero
+            cliente = Cliente(nome=valores['nome'], cpf=formatar_cpf(cpf), telefone=valores['telefone'])
+            cliente.preencher_digitos()
+            clientes.append((numero, valores['cpf'], cliente))
+            if valores['endereco']:
+                enderecos.append((cliente, Endereco(
+                    principal=True, complemento=valores['complemento'] or None,
+                    **{campo: valores[campo] for campo in OBRIGATORIOS_ENDERECO}
+                )))
+        if clientes:
+            recusas.extend(self._gravar(clientes, enderecos))
+        # Relatório na ordem do arquivo.
+        for recusa in sorted(recusas):
+            self.erros.append(recusa)
+        self.recusadas += len(recusas)
+
+    def _gravar(self, clientes, enderecos):
+        # Sem ignore_conflicts, para o bulk_create devolver os ids: endereços
+        # só vão para clientes criados por este lote. Se outra gravação criou
+        # um dos CPFs nesse meio tempo, as linhas desses CPFs são recusadas e
+        # o restante do lote é gravado de novo.
+        recusas = []
+        while True:
+            try:
+                with transaction.atomic():
+                    Cliente.objects.bulk_create([cliente for _, _, cliente in clientes], batch_size=1000)
+                    criados = {id(cliente) for _, _, cliente in clientes}
+                    pendentes = []
+                    for cliente, endereco in enderecos:
+                        if id(cliente) in criados:
+                            endereco.cliente = cliente
+                            pendentes.append(endereco)
+                    criar_enderecos(pendentes)
+                break
+            except IntegrityError:
+                existentes = set(Cliente.objects.filter(
+                    cpf__in=[cliente.cpf for _, _, cliente in clientes]
+                ).values_list('cpf', flat=True))
+                if not existentes:
+                    raise
+                for numero, cpf_original, cliente in clientes:
+                    cliente.pk = None
+                    cliente._state.adding = True
+                    if cliente.cpf in existentes:
+                        self.vistos[cliente.cpf_digitos] = 0
+                        recusas.append((numero, cpf_original, MENSAGEM_CPF_CADASTRADO))
+                clientes = [item for item in clientes if item[2].cpf not in existentes]
+                if not clientes:
+                    return recusas
+        self.clientes += len(clientes)
+        self.enderecos += len(pendentes)
+        invalidar('clientes')
+        return recusas
+
+
+def importar_clientes(linhas, erros=None, tamanho_lote=5000):
+    """Importa clientes de `linhas` (ver Importacao) e devolve o resumo."""
+    return Importacao(erros, tamanho_lote).processar(linhas)
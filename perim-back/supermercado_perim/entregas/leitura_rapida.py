@@ -0,0 +1,215 @@
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601
+from rest_framework.settings import api_settings
+
+from .models import Endereco, Entrega
+
+# Leitura das listas de Entrega, Cliente e Endereco sem passar pelos campos
+# do DRF: as linhas vêm de .values() e cada uma vira um dicionário por uma
+# função gerada uma vez por conjunto de campos. A saída é a mesma dos
+# serializers (mesmas chaves, mesma ordem, mesmos formatos), o que é
+# verificado pelos testes de compatibilidade em tests.py; qualquer campo
+# novo num serializer precisa ser espelhado aqui.
+
+
+def habilitada():
+    return (
+        getattr(settings, 'LEITURA_RAPIDA', False)
+        and str(api_settings.DATETIME_FORMAT).lower() == ISO_8601
+        and str(api_settings.DATE_FORMAT).lower() == ISO_8601
+    )
+
+
+def _fuso():
+    return timezone.get_current_timezone() if settings.USE_TZ else None
+
+
+def data_hora(valor, fuso):
+    # Mesmo resultado de serializers.DateTimeField().to_representation().
+    if not valor:
+        return None
+    if fuso is not None:
+        valor = valor.astimezone(fuso) if timezone.is_aware(valor) else timezone.make_aware(valor, fuso)
+    elif timezone.is_aware(valor):
+        valor = timezone.make_naive(valor, dt_timezone.utc)
+    texto = valor.isoformat()
+    return texto[:-6] + 'Z' if texto.endswith('+00:00') else texto
+
+
+def data(valor):
+    return valor.isoformat() if valor else None
+
+
+ROTULOS_STATUS = dict(Entrega.STATUS_CHOICES)
+VOLUMES_EXTRAS = (
+    ('bebidas', 'Bebidas'),
+    ('frios_congelados', 'Frios/Congelados'),
+    ('vassoura_rodo', 'Vassoura/Rodo'),
+    ('outros', 'Outros'),
+)
+
+
+def volumes_extras(linha):
+    return [rotulo for campo, rotulo in VOLUMES_EXTRAS if linha[campo]]
+
+
+def principal(enderecos):
+    return next((endereco for endereco in enderecos if endereco['principal']), None)
+
+
+AUXILIARES = {
+    'data_hora': data_hora,
+    'data': data,
+    'ROTULOS_STATUS': ROTULOS_STATUS,
+    'volumes_extras': volumes_extras,
+    'principal': principal,
+}
+
+
+def valor(lookup, conversor=None):
+    expressao = f'r[{lookup!r}]'
+    if conversor == 'data_hora':
+        expressao = f'data_hora({expressao}, fuso)'
+    elif conversor:
+        expressao = f'{conversor}({expressao})'
+    return [lookup], expressao
+
+
+def objeto(campos, nulo_se=None):
+    lookups = [lookup for lookups_campo, _ in campos.values() for lookup in lookups_campo]
+    expressao = '{' + ', '.join(f'{nome!r}: {expr}' for nome, (_, expr) in campos.items()) + '}'
+    if nulo_se:
+        lookups.append(nulo_se)
+        expressao = f'(None if r[{nulo_se!r}] is None else {expressao})'
+    return lookups, expressao
+
+
+def campos_endereco(prefixo=''):
+    # EnderecoSerializer
+    return {
+        'id': valor(f'{prefixo}id'),
+        'cep': valor(f'{prefixo}cep'),
+        'logradouro': valor(f'{prefixo}logradouro'),
+        'numero': valor(f'{prefixo}numero'),
+        'complemento': valor(f'{prefixo}complemento'),
+        'bairro': valor(f'{prefixo}bairro'),
+        'cidade': valor(f'{prefixo}cidade'),
+        'estado': valor(f'{prefixo}estado'),
+        'principal': valor(f'{prefixo}principal'),
+        'cliente': valor(f'{prefixo}cliente_id'),
+        'latitude': valor(f'{prefixo}latitude'),
+        'longitude': valor(f'{prefixo}longitude'),
+    }
+
+
+def campos_entregador(prefixo=''):
+    # EntregadorSerializer
+    return {
+        'id': valor(f'{prefixo}id'),
+        'nome': valor(f'{prefixo}nome'),
+        'created_at': valor(f'{prefixo}created_at', 'data_hora'),
+        'updated_at': valor(f'{prefixo}updated_at', 'data_hora'),
+    }
+
+
+def campos_entrega():
+    # EntregaSerializer
+    return {
+        'id': valor('id'),
+        'cliente': valor('cliente_id'),
+        'cliente_nome': valor('cliente__nome'),
+        'endereco': valor('endereco_id'),
+        'endereco_detalhes': objeto(campos_endereco('endereco__')),
+        'entregador': objeto(campos_entregador('entregador__'), nulo_se='entregador_id'),
+        'ordem_rota': valor('ordem_rota'),
+        'status': valor('status'),
+        'status_display': (['status'], "ROTULOS_STATUS.get(r['status'], r['status'])"),
+        'numero_caixas': valor('numero_caixas'),
+        'bebidas': valor('bebidas'),
+        'frios_congelados': valor('frios_congelados'),
+        'vassoura_rodo': valor('vassoura_rodo'),
+        'outros': valor('outros'),
+        'volumes_extras_list': ([campo for campo, _ in VOLUMES_EXTRAS], 'volumes_extras(r)'),
+        'nome_embalador': valor('nome_embalador'),
+        'numero_nfce': valor('numero_nfce'),
+        'serie_nfce': valor('serie_nfce'),
+        'data_compra': valor('data_compra', 'data'),
+        'data_hora_entrega': valor('data_hora_entrega', 'data_hora'),
+        'created_at': valor('created_at', 'data_hora'),
+        'updated_at': valor('updated_at', 'data_hora'),
+    }
+
+
+def campos_cliente():
+    # ClienteSerializer; `enderecos` é preenchido por LeitorClientes.serializar.
+    return {
+        'id': valor('id'),
+        'nome': valor('nome'),
+        'cpf': valor('cpf'),
+        'telefone': valor('telefone'),
+        'enderecos': ([], "r['enderecos']"),
+        'endereco_principal': ([], "principal(r['enderecos'])"),
+        'created_at': valor('created_at', 'data_hora'),
+        'updated_at': valor('updated_at', 'data_hora'),
+    }
+
+
+class Leitor:
+    """
+    `campos` segue a ordem do serializer: {nome: (lookups, expressão)}.
+    `sempre` são lookups incluídos em valores() mesmo fora da projeção (o
+    `id` e os campos usados pela paginação por cursor).
+    """
+
+    def __init__(self, campos, sempre=('id',)):
+        self.campos = campos
+        self.sempre = list(sempre)
+        self._compilados = {}
+
+    def compilar(self, campos=None):
+        # Mesma regra do CamposDinamicosMixin: ordem do serializer, campos
+        # desconhecidos ignorados. A chave são os campos que sobram, então o
+        # cache tem no máximo um item por subconjunto dos campos do leitor,
+        # por mais variações de ?fields= que cheguem.
+        selecionados = [
+            (nome, especificacao) for nome, especificacao in self.campos.items()
+            if campos is None or nome in campos
+        ]
+        chave = tuple(nome for nome, _ in selecionados)
+        if chave not in self._compilados:
+            lookups = list(dict.fromkeys([*self.sempre, *(l for _, (ls, _) in selecionados for l in ls)]))
+            corpo = ', '.join(f'{nome!r}: {expressao}' for nome, (_, expressao) in selecionados)
+            namespace = dict(AUXILIARES)
+            exec(f'def linha(r, fuso):\n    return {{{corpo}}}\n', namespace)
+            self._compilados[chave] = (namespace['linha'], lookups)
+        return self._compilados[chave]
+
+    def valores(self, queryset, campos=None):
+        _, lookups = self.compilar(campos)
+        return queryset.prefetch_related(None).values(*lookups)
+
+    def serializar(self, linhas, campos=None):
+        linha, _ = self.compilar(campos)
+        fuso = _fuso()
+        return [linha(r, fuso) for r in linhas]
+
+
+class LeitorClientes(Leitor):
+    def serializar(self, linhas, campos=None):
+        linhas = list(linhas)
+        if campos is None or {'enderecos', 'endereco_principal'} & set(campos):
+            por_cliente = {linha['id']: [] for linha in linhas}
+            enderecos = Endereco.objects.filter(cliente_id__in=list(por_cliente))
+            for endereco in leitor_enderecos.serializar(leitor_enderecos.valores(enderecos)):
+                por_cliente[endereco['cliente']].append(endereco)
+            for linha in linhas:
+                linha['enderecos'] = por_cliente[linha['id']]
+        return super().serializar(linhas, campos)
+
+
+leitor_entregas = Leitor(campos_entrega(), sempre=('id', 'data_hora_entrega'))
+leitor_enderecos = Leitor(campos_endereco())
+leitor_clientes = LeitorClientes(campos_cliente())
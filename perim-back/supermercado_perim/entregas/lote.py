@@ -0,0 +1,172 @@
+from datetime import timedelta
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from . import geo
+from .agregados import inicio_do_dia
+from .busca import montar_documento
+from .cache_respostas import invalidar
+from .models import Cliente, Endereco, Entrega, Entregador
+from .serializers import EntregaLoteItemSerializer
+from .signals import notificar_entregas_em_massa
+
+MENSAGEM_PK_INEXISTENTE = serializers.PrimaryKeyRelatedField.default_error_messages['does_not_exist']
+MENSAGEM_ENDERECO_DE_OUTRO_CLIENTE = 'Este endereço não pertence ao cliente selecionado.'
+
+
+def _validar_campos(itens):
+    # Mesmo laço do ListSerializer, mas guardando os itens válidos mesmo
+    # quando algum outro falha.
+    child = EntregaLoteItemSerializer()
+    validados, erros = [], []
+    for item in itens:
+        try:
+            validados.append(child.run_validation(item))
+            erros.append({})
+        except serializers.ValidationError as exc:
+            validados.append(None)
+            erros.append(exc.detail)
+    return validados, erros
+
+
+def criar_entregas(itens):
+    """
+    Valida e cria as entregas de `itens` numa única transação.
+
+    Retorna (entregas, erros), com `erros` na mesma ordem de `itens` ({} para
+    os itens válidos). Se algum item tiver erro nada é gravado.
+    """
+    validados, erros = _validar_campos(itens)
+    presentes = [dados for dados in validados if dados]
+
+    clientes = Cliente.objects.in_bulk({dados['cliente'] for dados in presentes})
+    enderecos = Endereco.objects.in_bulk({dados['endereco'] for dados in presentes})
+    entregadores = Entregador.objects.in_bulk({dados['entregador'] for dados in presentes if dados.get('entregador')})
+
+    entregas = []
+    for indice, dados in enumerate(validados):
+        if dados is None:
+            continue
+        erros_item = {}
+        cliente = clientes.get(dados['cliente'])
+        endereco = enderecos.get(dados['endereco'])
+        entregador = entregadores.get(dados['entregador']) if dados.get('entregador') else None
+        for campo, objeto in (('cliente', cliente), ('endereco', endereco), ('entregador', entregador)):
+            if dados.get(campo) and objeto is None:
+                erros_item[campo] = [str(MENSAGEM_PK_INEXISTENTE).format(pk_value=dados[campo])]
+        if cliente and endereco and endereco.cliente_id != cliente.id:
+            erros_item['endereco'] = [MENSAGEM_ENDERECO_DE_OUTRO_CLIENTE]
+        if erros_item:
+            erros[indice] = erros_item
+            continue
+        entrega = Entrega(**{**dados, 'cliente': cliente, 'endereco': endereco, 'entregador': entregador})
+        entrega.documento_busca = montar_documento(entrega)
+        entregas.append(entrega)
+
+    if any(erros):
+        return [], erros
+
+    with transaction.atomic():
+        Entrega.objects.bulk_create(entregas, batch_size=500)
+        for entrega in entregas:
+            entrega._originais = entrega.valores_atuais()
+        notificar_entregas_em_massa(
+            (None, {**entrega.valores_atuais(), 'id': entrega.id, 'updated_at': entrega.updated_at}) for entrega in entregas
+        )
+    return entregas, erros
+
+
+def alterar_status(novo_status, ids=None, entregador_id=None, dia=None):
+    """
+    Move para `novo_status` as entregas selecionadas cujo status atual permite
+    a transição (ver Entrega.TRANSICOES_STATUS), com um único UPDATE.
+
+    Retorna a lista de ids alterados.
+    """
+    queryset = Entrega.objects.filter(status__in=Entrega.status_de_origem(novo_status))
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+    if entregador_id is not None:
+        queryset = queryset.filter(entregador_id=entregador_id)
+    if dia is not None:
+        inicio = inicio_do_dia(dia)
+        queryset = queryset.filter(data_hora_entrega__gte=inicio, data_hora_entrega__lt=inicio_do_dia(dia + timedelta(days=1)))
+
+    campos = ('id',) + Entrega.campos_rastreados
+    with transaction.atomic():
+        anteriores = list(queryset.select_for_update().values(*campos))
+        if not anteriores:
+            return []
+        alterados = [valores['id'] for valores in anteriores]
+        agora = timezone.now()
+        Entrega.objects.filter(id__in=alterados).update(status=novo_status, updated_at=agora)
+        notificar_entregas_em_massa(
+            (valores, {**valores, 'status': novo_status, 'updated_at': agora}) for valores in anteriores
+        )
+    return alterados
+
+
+def criar_enderecos(enderecos, batch_size=1000):
+    """
+    Cria `enderecos` (instâncias ainda não salvas) com bulk_create, com o
+    mesmo resultado de salvá-los um a um com Endereco.save(): em cada
+    cliente vale o último marcado como principal e, se nenhum estiver
+    marcado e o cliente ainda não tiver principal, o primeiro da lista.
+    Faz um número fixo de consultas, qualquer que seja o tamanho da lista.
+    """
+    enderecos = list(enderecos)
+    if not enderecos:
+        return []
+    clientes = {endereco.cliente_id for endereco in enderecos}
+    with transaction.atomic():
+        com_principal = set(
+            Endereco.objects.filter(cliente_id__in=clientes, principal=True).values_list('cliente_id', flat=True)
+        )
+        principal_de = {}
+        for endereco in enderecos:
+            if endereco.principal or (endereco.cliente_id not in com_principal and endereco.cliente_id not in principal_de):
+                principal_de[endereco.cliente_id] = endereco
+        for endereco in enderecos:
+            endereco.principal = principal_de.get(endereco.cliente_id) is endereco
+
+        substituidos = {cliente_id for cliente_id in principal_de if cliente_id in com_principal}
+        if substituidos:
+            Endereco.objects.filter(cliente_id__in=substituidos, principal=True).update(principal=False)
+        for endereco in enderecos:
+            endereco.preencher_digitos()
+        geo.preencher(enderecos)
+        Endereco.objects.bulk_create(enderecos, batch_size=batch_size)
+        for endereco in enderecos:
+            endereco._originais = endereco.valores_atuais()
+    invalidar('clientes', *(f'cliente:{cliente_id}' for cliente_id in clientes))
+    return enderecos
+
+
+def gravar_campos(objetos, nomes):
+    """
+    Grava os campos `nomes` de `objetos` (todos do mesmo model) com um UPDATE
+    parametrizado por objeto num único executemany. Para milhares de linhas
+    sai bem mais barato que o bulk_update, que monta um CASE WHEN por campo.
+
+    Não dispara sinais: quem chama responde pelo que os sinais de Entrega
+    fariam. Em entregas, isso é recalcular documento_busca (e incluí-lo em
+    `nomes`), chamar notificar_entregas_em_massa com os valores anteriores
+    e atuais (agregados e eventos) e atualizar `_originais`. Veja
+    rotas.planejar_rotas.
+    """
+    if not objetos:
+        return
+    model = type(objetos[0])
+    connection = connections[router.db_for_write(model)]
+    campos = [model._meta.get_field(nome) for nome in nomes]
+    tabela = connection.ops.quote_name(model._meta.db_table)
+    atribuicoes = ', '.join(f'{connection.ops.quote_name(campo.column)} = %s' for campo in campos)
+    chave = connection.ops.quote_name(model._meta.pk.column)
+    parametros = [
+        [campo.get_db_prep_save(getattr(objeto, campo.attname), connection) for campo in campos] + [objeto.pk]
+        for objeto in objetos
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(f'UPDATE {tabela} SET {atribuicoes} WHERE {chave} = %s', parametros)
@@ -0,0 +1,30 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+@contextmanager
+def banco_temporario():
+    """
+    Cria um banco SQLite de teste num arquivo temporário (com as migrações
+    aplicadas) para os benchmarks, sem tocar no banco configurado.
+    """
+    nome_original = connection.settings_dict['NAME']
+    teste_original = connection.settings_dict['TEST'].get('NAME')
+    opcoes_originais = connection.settings_dict['OPTIONS']
+    diretorio = tempfile.mkdtemp()
+    connection.settings_dict['TEST']['NAME'] = os.path.join(diretorio, 'benchmark.sqlite3')
+    # Com transações IMMEDIATE as escritas de threads concorrentes esperam
+    # pelo lock em vez de falhar com "database is locked".
+    connection.settings_dict['OPTIONS'] = {**opcoes_originais, 'transaction_mode': 'IMMEDIATE'}
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(nome_original, verbosity=0)
+        connection.settings_dict['TEST']['NAME'] = teste_original
+        connection.settings_dict['OPTIONS'] = opcoes_originais
+        shutil.rmtree(diretorio, ignore_errors=True)
@@ -0,0 +1,359 @@
+import asyncio
+import csv
+import io
+import json
+import logging
+import platform
+import sqlite3
+import time
+from datetime import timedelta
+
+import django
+import numpy as np
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from entregas import dados_sinteticos, importacao, urls
+from entregas.models import Cep, Cliente, Endereco, Entrega, Entregador
+
+from ._banco_temporario import banco_temporario
+
+
+def _consultas(capturadas):
+    return sum(1 for consulta in capturadas if not consulta['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT')))
+
+
+class Contexto:
+    """Objetos do banco sintético usados para montar as requisições."""
+
+    def __init__(self, semente):
+        self.cliente = Cliente.objects.order_by('id').first()
+        self.endereco = Endereco.objects.filter(cliente=self.cliente).order_by('id').first()
+        self.entregador = Entregador.objects.order_by('id').first()
+        self.entrega = Entrega.objects.order_by('-data_hora_entrega').first()
+        self.cep = Cep.objects.order_by('cep').values_list('cep', flat=True).first()
+        self.hoje = timezone.localdate()
+        self.ids_recentes = list(Entrega.objects.order_by('-data_hora_entrega').values_list('id', flat=True)[:50])
+        existentes = set(Cliente.objects.values_list('cpf_digitos', flat=True))
+        # CPFs válidos que ainda não estão no banco, para as criações e importações.
+        self._cpfs = iter([
+            cpf for cpf in dados_sinteticos.gerar_cpfs(20000, np.random.default_rng(semente + 1000)) if cpf not in existentes
+        ])
+        self._sequencia = 0
+
+    def cpf(self):
+        return importacao.formatar_cpf(next(self._cpfs))
+
+    def sequencia(self):
+        self._sequencia += 1
+        return self._sequencia
+
+    def entrega_nova(self):
+        return {
+            'cliente': self.cliente.id, 'endereco': self.endereco.id, 'entregador': self.entregador.id,
+            'status': Entrega.STATUS_PENDENTE, 'numero_caixas': 3, 'bebidas': True, 'frios_congelados': False,
+            'vassoura_rodo': False, 'outros': False, 'nome_embalador': 'Roberto',
+            'numero_nfce': str(900000 + self.sequencia()), 'serie_nfce': '1',
+            'data_compra': self.hoje.isoformat(), 'data_hora_entrega': (timezone.now() + timedelta(hours=2)).isoformat(),
+        }
+
+    def csv_clientes(self, linhas):
+        saida = io.StringIO()
+        escritor = csv.writer(saida)
+        escritor.writerow(importacao.COLUNAS)
+        for i in range(linhas):
+            escritor.writerow([
+                f'Importado {i}', self.cpf(), '(11) 98888-7777', '01310-100', 'Avenida Paulista', str(i + 1), '',
+                'Bela Vista', 'São Paulo', 'SP',
+            ])
+        arquivo = io.BytesIO(saida.getvalue().encode('utf-8'))
+        arquivo.name = 'clientes.csv'
+        return arquivo
+
+
+def _cliente_descartavel(ctx):
+    cliente = Cliente.objects.create(nome='Descartável', cpf=ctx.cpf(), telefone='(11) 97777-6666')
+    return reverse('entregas:cliente-detail', args=[cliente.id])
+
+
+def _entrega_descartavel(ctx):
+    entrega = Entrega.objects.create(**{
+        **ctx.entrega_nova(), 'cliente': ctx.cliente, 'endereco': ctx.endereco, 'entregador': ctx.entregador,
+        'data_compra': ctx.hoje, 'data_hora_entrega': timezone.now() + timedelta(hours=2),
+    })
+    return reverse('entregas:entrega-detail', args=[entrega.id])
+
+
+# Por nome de URL de entregas/urls.py: (rótulo, método, função (contexto) ->
+# (caminho, argumentos do cliente de teste)). `preparar`, quando presente,
+# roda fora da medição e devolve o caminho (ex.: objeto a ser apagado).
+CASOS = {
+    'index': [('GET', 'get', lambda ctx: ('/', {}))],
+    'cliente-list-create': [
+        ('GET', 'get', lambda ctx: (reverse('entregas:cliente-list-create'), {})),
+        ('GET ?search=nome', 'get', lambda ctx: (reverse('entregas:cliente-list-create'), {'data': {'search': 'silva'}})),
+        ('GET ?search=cpf', 'get', lambda ctx: (reverse('entregas:cliente-list-create'), {'data': {'search': ctx.cliente.cpf[:7]}})),
+        ('POST', 'post', lambda ctx: (reverse('entregas:cliente-list-create'), {
+            'data': {'nome': 'Cliente Novo', 'cpf': ctx.cpf(), 'telefone': '(11) 91234-5678'}, 'content_type': 'application/json',
+        })),
+    ],
+    'cliente-importar': [
+        ('POST 100 linhas', 'post', lambda ctx: (reverse('entregas:cliente-importar'), {'data': {'arquivo': ctx.csv_clientes(100)}})),
+    ],
+    'cliente-detail': [
+        ('GET', 'get', lambda ctx: (reverse('entregas:cliente-detail', args=[ctx.cliente.id]), {})),
+        ('PATCH', 'patch', lambda ctx: (reverse('entregas:cliente-detail', args=[ctx.cliente.id]), {
+            'data': {'telefone': '(11) 95555-4444'}, 'content_type': 'application/json',
+        })),
+        ('DELETE', 'delete', lambda ctx: (ctx.preparado, {}), _cliente_descartavel),
+    ],
+    'endereco-list': [
+        ('GET', 'get', lambda ctx: (reverse('entregas:endereco-list'), {})),
+        ('GET raio 2 km', 'get', lambda ctx: (reverse('entregas:endereco-list'), {
+            'data': {'lat': ctx.endereco.latitude, 'lon': ctx.endereco.longitude, 'raio_km': 2},
+        })),
+    ],
+    'endereco-list-create': [
+        ('GET', 'get', lambda ctx: (reverse('entregas:endereco-list-create', args=[ctx.cliente.id]), {})),
+        ('POST', 'post', lambda ctx: (reverse('entregas:endereco-list-create', args=[ctx.cliente.id]), {
+            'data': {
+                'cep': '01310-100', 'logradouro': 'Avenida Paulista', 'numero': str(ctx.sequencia()),
+                'bairro': 'Bela Vista', 'cidade': 'São Paulo', 'estado': 'SP', 'principal': False,
+            },
+            'content_type': 'application/json',
+        })),
+    ],
+    'endereco-detail': [
+        ('GET', 'get', lambda ctx: (reverse('entregas:endereco-detail', args=[ctx.cliente.id, ctx.endereco.id]), {})),
+        ('PATCH', 'patch', lambda ctx: (reverse('entregas:endereco-detail', args=[ctx.cliente.id, ctx.endereco.id]), {
+            'data': {'complemento': f'Sala {ctx.sequencia()}'}, 'content_type': 'application/json',
+        })),
+    ],
+    'entregador-list-create': [
+        ('GET', 'get', lambda ctx: (reverse('entregas:entregador-list-create'), {})),
+        ('POST', 'post', lambda ctx: (reverse('entregas:entregador-list-create'), {
+            'data': {'nome': f'Entregador {ctx.sequencia()}'}, 'content_type': 'application/json',
+        })),
+    ],
+    'entregador-detail': [
+        ('GET', 'get', lambda ctx: (reverse('entregas:entregador-detail', args=[ctx.entregador.id]), {})),
+        ('PATCH', 'patch', lambda ctx: (reverse('entregas:entregador-detail', args=[ctx.entregador.id]), {
+            'data': {'nome': f'Entregador {ctx.sequencia()}'}, 'content_type': 'application/json',
+        })),
+    ],
+    'entrega-list-create': [
+        ('GET', 'get', lambda ctx: (reverse('entregas:entrega-list-create'), {})),
+        ('GET status+datas', 'get', lambda ctx: (reverse('entregas:entrega-list-create'), {'data': {
+            'status': Entrega.STATUS_ENTREGUE, 'data_inicio': (ctx.hoje - timedelta(days=30)).isoformat(),
+            'data_fim': ctx.hoje.isoformat(),
+        }})),
+        ('GET entregador', 'get', lambda ctx: (reverse('entregas:entrega-list-create'), {'data': {'entregador': ctx.entregador.id}})),
+        ('GET ?search', 'get', lambda ctx: (reverse('entregas:entrega-list-create'), {'data': {'search': 'paulista'}})),
+        ('POST', 'post', lambda ctx: (reverse('entregas:entrega-list-create'), {
+            'data': ctx.entrega_nova(), 'content_type': 'application/json',
+        })),
+    ],
+    'entrega-lote': [
+        ('POST 100 entregas', 'post', lambda ctx: (reverse('entregas:entrega-lote'), {
+            'data': [ctx.entrega_nova() for _ in range(100)], 'content_type': 'application/json',
+        })),
+    ],
+    'entrega-status-lote': [
+        ('POST 50 ids', 'post', lambda ctx: (reverse('entregas:entrega-status-lote'), {
+            'data': {'status': Entrega.STATUS_EM_TRANSITO, 'ids': ctx.ids_recentes}, 'content_type': 'application/json',
+        })),
+    ],
+    'entrega-exportar': [
+        ('GET ndjson 30 dias', 'get', lambda ctx: (reverse('entregas:entrega-exportar'), {'data': {
+            'data_inicio': (ctx.hoje - timedelta(days=30)).isoformat(),
+        }})),
+    ],
+    'entrega-detail': [
+        ('GET', 'get', lambda ctx: (reverse('entregas:entrega-detail', args=[ctx.entrega.id]), {})),
+        ('PATCH', 'patch', lambda ctx: (reverse('entregas:entrega-detail', args=[ctx.entrega.id]), {
+            'data': {'numero_caixas': ctx.sequencia() % 9 + 1}, 'content_type': 'application/json',
+        })),
+        ('DELETE', 'delete', lambda ctx: (ctx.preparado, {}), _entrega_descartavel),
+    ],
+    'rotas-planejar': [
+        ('POST sem aplicar', 'post', lambda ctx: (reverse('entregas:rotas-planejar'), {
+            'data': {'data': ctx.hoje.isoformat(), 'aplicar': False}, 'content_type': 'application/json',
+        })),
+    ],
+    'cliente-entregas-custom-list': [
+        ('GET', 'get', lambda ctx: (reverse('entregas:cliente-entregas-custom-list', args=[ctx.cliente.id]), {})),
+    ],
+    'buscar-cep': [
+        ('POST base offline', 'post', lambda ctx: (reverse('entregas:buscar-cep'), {
+            'data': {'cep': ctx.cep}, 'content_type': 'application/json',
+        })),
+    ],
+    'estatisticas': [('GET', 'get', lambda ctx: (reverse('entregas:estatisticas'), {}))],
+    'buscar-cep-async': [
+        ('POST base offline', 'post', lambda ctx: (reverse('entregas:buscar-cep-async'), {
+            'data': {'cep': ctx.cep}, 'content_type': 'application/json',
+        })),
+    ],
+    'estatisticas-async': [('GET', 'get', lambda ctx: (reverse('entregas:estatisticas-async'), {}))],
+    # Fluxo infinito: mede o tempo até o primeiro evento (retry).
+    'eventos-entregas': [('GET primeiro evento', 'stream', lambda ctx: (reverse('entregas:eventos-entregas'), {}))],
+}
+
+# Views que consultam o banco em outras threads (consultas em paralelo):
+# as consultas não aparecem na conexão da requisição.
+CONSULTAS_EM_OUTRAS_THREADS = {'buscar-cep-async', 'estatisticas-async'}
+
+
+def nomes_sem_caso():
+    return sorted({padrao.name for padrao in urls.urlpatterns} - set(CASOS))
+
+
+async def _primeiro_evento(caminho):
+    response = await AsyncClient().get(caminho)
+    conteudo = aiter(response.streaming_content)
+    try:
+        await anext(conteudo)
+    finally:
+        await conteudo.aclose()
+    return response
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede latência (p50/p95/p99) e consultas por requisição de todos os endpoints de '
+        'entregas/urls.py em bancos SQLite temporários com dados sintéticos de vários tamanhos '
+        '(ver entregas/dados_sinteticos.py), e grava os resultados num JSON para comparar versões.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tamanhos', default='1000,10000',
+            help='Quantidades de entregas, separadas por vírgula; clientes = entregas / 10, com 2 endereços cada.'
+        )
+        parser.add_argument('--repeticoes', type=int, default=30)
+        parser.add_argument('--aquecimento', type=int, default=2, help='Requisições descartadas antes de medir.')
+        parser.add_argument('--com-cache', action='store_true', help='Não limpa o cache de respostas entre requisições.')
+        parser.add_argument('--semente', type=int, default=1)
+        parser.add_argument('--saida', default='benchmark_api.json')
+        parser.add_argument('--comparar', help='JSON de uma execução anterior; mostra a variação do p95.')
+
+    def _requisitar(self, cliente, metodo, caminho, argumentos):
+        if metodo == 'stream':
+            return asyncio.run(_primeiro_evento(caminho))
+        response = getattr(cliente, metodo)(caminho, **argumentos)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def _medir(self, cliente, ctx, nome, caso, opcoes):
+        rotulo, metodo, montar = caso[:3]
+        preparar = caso[3] if len(caso) > 3 else None
+        tempos, consultas, status = [], [], set()
+        for i in range(opcoes['aquecimento'] + opcoes['repeticoes']):
+            if preparar:
+                ctx.preparado = preparar(ctx)
+            caminho, argumentos = montar(ctx)
+            if not opcoes['com_cache']:
+                caches[getattr(settings, 'RESPOSTAS_CACHE_ALIAS', 'default')].clear()
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                response = self._requisitar(cliente, metodo, caminho, argumentos)
+                duracao = time.perf_counter() - inicio
+            if i < opcoes['aquecimento']:
+                continue
+            tempos.append(duracao * 1000)
+            consultas.append(_consultas(capturadas))
+            status.add(response.status_code)
+        p50, p95, p99 = np.percentile(tempos, [50, 95, 99])
+        return {
+            'p50_ms': round(float(p50), 3), 'p95_ms': round(float(p95), 3), 'p99_ms': round(float(p99), 3),
+            'media_ms': round(float(np.mean(tempos)), 3),
+            'consultas_media': None if nome in CONSULTAS_EM_OUTRAS_THREADS else round(float(np.mean(consultas)), 2),
+            'consultas_max': None if nome in CONSULTAS_EM_OUTRAS_THREADS else max(consultas),
+            'status': sorted(status),
+        }
+
+    def _rodar_tamanho(self, entregas, opcoes):
+        with banco_temporario():
+            inicio = time.perf_counter()
+            criados = dados_sinteticos.gerar(
+                clientes=max(1, entregas // 10), enderecos_por_cliente=2, entregas=entregas,
+                entregadores=max(1, min(50, entregas // 200)), semente=opcoes['semente'],
+            )
+            self.stdout.write(
+                f"\n{criados['entregas']} entregas, {criados['clientes']} clientes, "
+                f"{criados['enderecos']} endereços (gerados em {time.perf_counter() - inicio:.1f} s)"
+            )
+            ctx = Contexto(opcoes['semente'])
+            cliente = Client(raise_request_exception=False)
+            resultados = {}
+            for nome, casos in CASOS.items():
+                for caso in casos:
+                    chave = f'{nome} {caso[0]}'
+                    resultado = resultados[chave] = self._medir(cliente, ctx, nome, caso, opcoes)
+                    consultas = '-' if resultado['consultas_media'] is None else f"{resultado['consultas_media']:g}"
+                    self.stdout.write(
+                        f"  {chave:<48} p50 {resultado['p50_ms']:8.2f} | p95 {resultado['p95_ms']:8.2f} | "
+                        f"p99 {resultado['p99_ms']:8.2f} ms | {consultas:>5} consultas | "
+                        f"{','.join(map(str, resultado['status']))}"
+                    )
+            return {**criados, 'endpoints': resultados}
+
+    def _comparar(self, anterior, atual):
+        self.stdout.write(f"\nVariação do p95 em relação a {anterior['metadados']['data']}:")
+        for tamanho, dados in atual['tamanhos'].items():
+            antigos = anterior['tamanhos'].get(tamanho, {}).get('endpoints', {})
+            for chave, resultado in dados['endpoints'].items():
+                if chave in antigos and antigos[chave]['p95_ms']:
+                    variacao = resultado['p95_ms'] / antigos[chave]['p95_ms'] - 1
+                    self.stdout.write(f'  {tamanho:>8} {chave:<48} {variacao:+7.1%}')
+
+    def handle(self, *args, **options):
+        faltando = nomes_sem_caso()
+        if faltando:
+            raise CommandError(f"Endpoints sem caso no benchmark: {', '.join(faltando)}.")
+        try:
+            tamanhos = [int(parte) for parte in options['tamanhos'].split(',')]
+        except ValueError:
+            raise CommandError('--tamanhos deve ser uma lista de inteiros separados por vírgula.')
+        if options['repeticoes'] < 1 or any(tamanho < 1 for tamanho in tamanhos):
+            raise CommandError('Use --repeticoes e --tamanhos >= 1.')
+        anterior = None
+        if options['comparar']:
+            with open(options['comparar'], encoding='utf-8') as arquivo:
+                anterior = json.load(arquivo)
+
+        resultado = {
+            'metadados': {
+                'data': timezone.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(), 'django': django.get_version(),
+                'sqlite': sqlite3.sqlite_version, 'plataforma': platform.platform(),
+                'repeticoes': options['repeticoes'], 'aquecimento': options['aquecimento'],
+                'com_cache': options['com_cache'], 'semente': options['semente'],
+            },
+            'tamanhos': {},
+        }
+        # O cliente de teste usa o host "testserver"; respostas 5xx ficam no
+        # status do resultado em vez de encher a saída com tracebacks.
+        registro = logging.getLogger('django.request')
+        nivel = registro.level
+        registro.setLevel(logging.CRITICAL)
+        try:
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                for tamanho in tamanhos:
+                    resultado['tamanhos'][str(tamanho)] = self._rodar_tamanho(tamanho, options)
+        finally:
+            registro.setLevel(nivel)
+
+        with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, ensure_ascii=False, indent=2, sort_keys=True)
+            arquivo.write('\n')
+        self.stdout.write(self.style.SUCCESS(f"\nResultados gravados em {options['saida']}"))
+        if anterior:
+            self._comparar(anterior, resultado)
@@ -0,0 +1,82 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+
+from entregas import cep as cep_service
+from entregas.servidor_cep_local import ServidorCepLocal
+
+from ._banco_temporario import banco_temporario
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara a vazão de /api/buscar-cep/ (WSGI, número fixo de workers síncronos) '
+        'com /api/async/buscar-cep/ (ASGI, um event loop) contra um ViaCEP local com latência. '
+        'Usa um banco SQLite temporário, sem tocar no banco configurado.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requisicoes', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=4, help='Workers do servidor síncrono.')
+        parser.add_argument('--concorrencia', type=int, default=50, help='Requisições simultâneas dos clientes.')
+        parser.add_argument('--latencia', type=float, default=0.1, help='Atraso do serviço de CEP, em segundos.')
+        parser.add_argument('--repetidos', type=float, default=0.2, help='Fração de CEPs repetidos na carga.')
+
+    def _carga(self, requisicoes, repetidos):
+        # Cada rodada usa CEPs inéditos, para que o cache não esconda a latência.
+        inicio = self._proximo_cep
+        distintos = max(1, int(requisicoes * (1 - repetidos)))
+        self._proximo_cep += distintos
+        return [f'{inicio + i % distintos:08d}' for i in range(requisicoes)]
+
+    def _sincrono(self, ceps, workers):
+        cliente = Client()
+
+        def buscar(cep):
+            return cliente.post('/api/buscar-cep/', {'cep': cep}, content_type='application/json').status_code
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(buscar, ceps))
+
+    async def _assincrono(self, ceps, concorrencia):
+        cliente = AsyncClient()
+        limite = asyncio.Semaphore(concorrencia)
+
+        async def buscar(cep):
+            async with limite:
+                response = await cliente.post('/api/async/buscar-cep/', {'cep': cep}, content_type='application/json')
+                return response.status_code
+
+        return await asyncio.gather(*(buscar(cep) for cep in ceps))
+
+    def _relatorio(self, nome, inicio, codigos, servidor, antes):
+        duracao = time.perf_counter() - inicio
+        erros = sum(1 for codigo in codigos if codigo != 200)
+        self.stdout.write(
+            f'{nome:<28} {len(codigos) / duracao:8.1f} req/s | {duracao:6.2f} s | '
+            f'{servidor.requisicoes - antes} chamadas ao serviço | {erros} erros'
+        )
+
+    def handle(self, *args, **options):
+        requisicoes = options['requisicoes']
+        ceps = {f'{i:08d}': {'logradouro': f'Rua {i}', 'localidade': 'Cidade', 'uf': 'SP'} for i in range(10 ** 6, 2 * 10 ** 6)}
+        self._proximo_cep = 10 ** 6
+
+        with banco_temporario(), ServidorCepLocal(ceps, atraso=options['latencia']) as servidor, \
+                override_settings(CEP_SERVICO_URL=servidor.url, ALLOWED_HOSTS=['*']):
+            self.stdout.write(
+                f"{requisicoes} requisições, latência do serviço {options['latencia'] * 1000:.0f} ms, "
+                f"{options['workers']} workers síncronos, concorrência {options['concorrencia']}"
+            )
+            cep_service.cache_memoria.clear()
+            antes, inicio = servidor.requisicoes, time.perf_counter()
+            codigos = self._sincrono(self._carga(requisicoes, options['repetidos']), options['workers'])
+            self._relatorio('síncrono (WSGI)', inicio, codigos, servidor, antes)
+
+            cep_service.cache_memoria.clear()
+            antes, inicio = servidor.requisicoes, time.perf_counter()
+            codigos = asyncio.run(self._assincrono(self._carga(requisicoes, options['repetidos']), options['concorrencia']))
+            self._relatorio('assíncrono (ASGI)', inicio, codigos, servidor, antes)
@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from entregas.middleware import CompressaoMiddleware, codificacoes_disponiveis
+from entregas.renderers import OrjsonRenderer
+
+from .benchmark_json import Command as BenchmarkJson
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede bytes transferidos e CPU gasta por CompressaoMiddleware em respostas JSON de entregas '
+        'de vários tamanhos, para cada codificação (identity, gzip, br). Sem banco.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanhos', type=int, nargs='+', default=[512, 1024, 10240, 102400, 1048576],
+                            help='Tamanhos aproximados das respostas, em bytes.')
+        parser.add_argument('--repeticoes', type=int, default=20)
+
+    def _json(self, linhas, tamanho):
+        # Prefixo da lista de entregas com pelo menos `tamanho` bytes.
+        renderer = OrjsonRenderer()
+        quantidade = 1
+        while True:
+            conteudo = renderer.render(linhas[:quantidade])
+            if len(conteudo) >= tamanho or quantidade >= len(linhas):
+                return conteudo
+            quantidade += max(1, quantidade // 4)
+
+    def _medir(self, middleware, request, conteudo, repeticoes):
+        inicio = time.process_time()
+        for _ in range(repeticoes):
+            response = middleware.process_response(request, HttpResponse(conteudo, content_type='application/json'))
+        cpu = (time.process_time() - inicio) / repeticoes
+        return len(response.content), response.get('Content-Encoding', 'identity'), cpu
+
+    def handle(self, *args, **options):
+        maior = max(options['tamanhos'])
+        base = BenchmarkJson()._base()
+        linhas = [{**base[i % len(base)], 'id': i + 1} for i in range(maior // 400 + len(base))]
+        middleware = CompressaoMiddleware(lambda request: None)
+        fabrica = RequestFactory()
+
+        self.stdout.write(
+            f"{'tamanho':>9} | {'pedido':<8} | {'enviado':<8} | {'bytes':>9} | {'razão':>6} | {'CPU':>9}"
+        )
+        # Sem limite mínimo, para ver também o custo nas respostas pequenas.
+        with override_settings(COMPRESSAO_TAMANHO_MINIMO=0):
+            for tamanho in options['tamanhos']:
+                conteudo = self._json(linhas, tamanho)
+                for codificacao in ('identity', *codificacoes_disponiveis()):
+                    request = fabrica.get('/api/entregas/', HTTP_ACCEPT_ENCODING=codificacao)
+                    enviado, usada, cpu = self._medir(middleware, request, conteudo, options['repeticoes'])
+                    self.stdout.write(
+                        f'{len(conteudo):>9} | {codificacao:<8} | {usada:<8} | {enviado:>9} | '
+                        f'{enviado / len(conteudo):>6.2f} | {cpu * 1000:>6.3f} ms'
+                    )
@@ -0,0 +1,69 @@
+import re
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from entregas import agregados
+from entregas.models import EntregaDiaria
+
+
+def usa_indice(plano, tabela, coluna):
+    # Busca pelo índice a partir de `coluna` (faixa ou igualdade), não uma
+    # leitura completa de tabela ou de índice.
+    if connection.vendor == 'sqlite':
+        return re.search(rf'SEARCH {tabela} USING (COVERING )?INDEX \S+ \({coluna}[>=<]', plano) is not None
+    return (
+        re.search(rf'Index (Only )?Scan using \S+ on {tabela}', plano) is not None
+        and re.search(rf'Index Cond: \(+"?{coluna}"? ', plano) is not None
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Mostra o plano de execução e o tempo das consultas de /api/estatisticas/ (tabelas de '
+        'agregados) no banco configurado (SQLite ou PostgreSQL), depois de um ANALYZE. Falha se '
+        'as consultas por dia não buscarem pelo índice de EntregaDiaria.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=180, help='Janela da consulta, em dias.')
+        parser.add_argument('--repeticoes', type=int, default=20)
+
+    def _medir(self, consulta, repeticoes):
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            consulta()
+        return (time.perf_counter() - inicio) * 1000 / repeticoes
+
+    def handle(self, *args, **options):
+        dias, repeticoes = options['dias'], options['repeticoes']
+        # Sem estatísticas o planejador pode preferir ler a tabela inteira.
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        tabela = EntregaDiaria._meta.db_table
+        desde = agregados.dia_local(timezone.now() - timedelta(days=dias))
+        planos = {
+            'entregas_por_mes': agregados.entregas_por_mes_queryset(desde).explain(),
+            'entregador_do_dia': agregados.entregador_do_dia_queryset(timezone.localdate()).explain(),
+        }
+        sem_indice = []
+        for nome, plano in planos.items():
+            indice = usa_indice(plano, tabela, 'dia')
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{nome} ({connection.vendor})'))
+            self.stdout.write(plano)
+            self.stdout.write(f'índice em dia: {"sim" if indice else "NÃO"}\n')
+            if not indice:
+                sem_indice.append(nome)
+
+        for nome, consulta in agregados.consultas_estatisticas(dias).items():
+            self.stdout.write(f'{nome}: {self._medir(consulta, repeticoes):.2f} ms')
+        consultas = agregados.consultas_estatisticas(dias).values()
+        total = self._medir(lambda: [consulta() for consulta in consultas], repeticoes)
+        self.stdout.write(self.style.SUCCESS(f'/api/estatisticas/ (todas as consultas): {total:.2f} ms'))
+
+        if sem_indice:
+            raise CommandError(f'Sem busca pelo índice de {tabela}.dia: {", ".join(sem_indice)}.')
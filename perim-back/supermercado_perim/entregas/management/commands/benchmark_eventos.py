@@ -0,0 +1,72 @@
+import asyncio
+import threading
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from entregas import eventos
+from entregas.models import Entrega
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede o hub de eventos SSE (entregas/eventos.py): memória por conexão assinada e tempo até um '
+        'lote de eventos, publicado de outra thread, chegar às filas de todas as conexões.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conexoes', type=int, default=1000)
+        parser.add_argument('--eventos', type=int, default=50)
+        parser.add_argument('--entregadores', type=int, default=20)
+
+    async def _medir(self, conexoes, quantidade, entregadores):
+        tracemalloc.start()
+        antes, _ = tracemalloc.get_traced_memory()
+        # Um terço sem filtro, o resto filtrando por um entregador.
+        assinaturas = [
+            eventos.hub.assinar(entregadores={i % entregadores + 1} if i % 3 else None)
+            for i in range(conexoes)
+        ]
+        depois, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        esperado = sum(
+            1 for assinatura in assinaturas for i in range(quantidade)
+            if assinatura.entregadores is None or i % entregadores + 1 in assinatura.entregadores
+        )
+        recebidos = 0
+
+        async def consumir(assinatura):
+            nonlocal recebidos
+            while True:
+                await assinatura.fila.get()
+                recebidos += 1
+
+        consumidores = [asyncio.ensure_future(consumir(assinatura)) for assinatura in assinaturas]
+        evento = [
+            eventos.Evento(eventos.ALTERADA, i, Entrega.STATUS_EM_TRANSITO, i % entregadores + 1, None, Entrega.STATUS_PENDENTE)
+            for i in range(quantidade)
+        ]
+        inicio = time.perf_counter()
+        # Publicado de outra thread, como no commit de uma requisição síncrona.
+        publicador = threading.Thread(target=lambda: [eventos.hub.entregar(e) for e in evento])
+        publicador.start()
+        while recebidos < esperado:
+            await asyncio.sleep(0.001)
+        duracao = time.perf_counter() - inicio
+        publicador.join()
+        for consumidor in consumidores:
+            consumidor.cancel()
+        for assinatura in assinaturas:
+            eventos.hub.cancelar(assinatura)
+        return (depois - antes) / conexoes, duracao, esperado
+
+    def handle(self, *args, **options):
+        por_conexao, duracao, entregues = asyncio.run(
+            self._medir(options['conexoes'], options['eventos'], options['entregadores'])
+        )
+        self.stdout.write(
+            f"{options['conexoes']} conexões: {por_conexao / 1024:.1f} KiB por assinatura; "
+            f"{options['eventos']} eventos ({entregues} entregas às filas) em {duracao * 1000:.1f} ms"
+        )
@@ -0,0 +1,75 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+from django.db.models.lookups import LessThanOrEqual
+
+from entregas import geo
+from entregas.models import Cliente, Endereco
+
+from ._banco_temporario import banco_temporario
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede consultas por raio sobre os endereços (entregas/geo.py) com o índice de geocelula e, para '
+        'comparação, só com a distância calculada em todas as linhas. Usa um banco SQLite temporário.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--enderecos', type=int, default=500000)
+        parser.add_argument('--raios', type=float, nargs='+', default=[0.5, 1, 2, 5])
+        parser.add_argument('--repeticoes', type=int, default=5)
+        parser.add_argument('--semente', type=int, default=1)
+
+    def _popular(self, quantidade, gerador):
+        # Grande São Paulo: ~60 km x 60 km.
+        latitudes = -23.55 + gerador.uniform(-0.27, 0.27, quantidade)
+        longitudes = -46.63 + gerador.uniform(-0.3, 0.3, quantidade)
+        clientes = Cliente.objects.bulk_create(
+            (Cliente(nome=f'Cliente {i:06d}', cpf=f'{i:011d}', telefone='(11) 99999-9999')
+             for i in range(max(1, quantidade // 5))),
+            batch_size=5000
+        )
+        Endereco.objects.bulk_create((
+            Endereco(
+                cliente=clientes[i // 5], cep='01234-567', logradouro=f'Rua {i}', numero=str(i), bairro='Centro',
+                cidade='São Paulo', estado='SP', principal=not i % 5,
+                latitude=float(lat), longitude=float(lon), geocelula=geo.celula(float(lat), float(lon))
+            )
+            for i, (lat, lon) in enumerate(zip(latitudes, longitudes))
+        ), batch_size=5000)
+
+    def _sem_indice(self, latitude, longitude, raio_km):
+        dlat = raio_km / geo.KM_POR_GRAU
+        cosseno = np.cos(np.radians(latitude))
+        norte_sul = F('latitude') - latitude
+        leste_oeste = (F('longitude') - longitude) * cosseno
+        return Q(LessThanOrEqual(norte_sul * norte_sul + leste_oeste * leste_oeste, dlat * dlat))
+
+    def _medir(self, condicao, repeticoes):
+        melhor, ids = None, None
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            ids = list(Endereco.objects.filter(condicao).values_list('id', flat=True))
+            duracao = time.perf_counter() - inicio
+            melhor = duracao if melhor is None else min(melhor, duracao)
+        return melhor, set(ids)
+
+    def handle(self, *args, **options):
+        gerador = np.random.default_rng(options['semente'])
+        with banco_temporario():
+            inicio = time.perf_counter()
+            self._popular(options['enderecos'], gerador)
+            self.stdout.write(f"{options['enderecos']} endereços criados em {time.perf_counter() - inicio:.1f} s")
+            latitude, longitude = -23.55, -46.63
+            self.stdout.write(f"{'raio':>7} | {'encontrados':>11} | {'geocelula':>10} | {'sem índice':>10}")
+            for raio in options['raios']:
+                tempo, ids = self._medir(geo.condicao_raio(latitude, longitude, raio), options['repeticoes'])
+                tempo_base, ids_base = self._medir(self._sem_indice(latitude, longitude, raio), 1)
+                if ids != ids_base:
+                    self.stderr.write(f'{raio} km: resultados diferentes ({len(ids)} x {len(ids_base)}).')
+                self.stdout.write(
+                    f'{raio:>4} km | {len(ids):>11} | {tempo * 1000:>7.1f} ms | {tempo_base * 1000:>7.1f} ms'
+                )
@@ -0,0 +1,80 @@
+import csv
+import os
+import tempfile
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from entregas import importacao
+from entregas.dados_sinteticos import gerar_cpfs
+from entregas.models import Cliente, Endereco
+
+from ._banco_temporario import banco_temporario
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera um CSV de clientes com endereço (com uma fração de linhas inválidas ou repetidas) e mede '
+        'a importação (entregas/importacao.py) num banco SQLite temporário. Também compara a validação '
+        'de CPF em lote com Cliente.is_valid_cpf.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=100000)
+        parser.add_argument('--invalidos', type=float, default=0.02, help='Fração de CPFs com dígito errado.')
+        parser.add_argument('--lote', type=int, default=5000)
+        parser.add_argument('--semente', type=int, default=1)
+
+    def _escrever_csv(self, caminho, cpfs, gerador, invalidos):
+        estragar = gerador.random(len(cpfs)) < invalidos
+        with open(caminho, 'w', newline='', encoding='utf-8') as arquivo:
+            escritor = csv.writer(arquivo)
+            escritor.writerow(importacao.COLUNAS)
+            for i, cpf in enumerate(cpfs):
+                if estragar[i]:
+                    cpf = cpf[:10] + str((int(cpf[10]) + 1) % 10)
+                escritor.writerow([
+                    f'Cliente {i:06d}', importacao.formatar_cpf(cpf), f'119{i % 100000000:08d}',
+                    f'{1000 + i % 9000:05d}-000', f'Rua {i % 500}', str(i % 2000), '', 'Centro', 'São Paulo', 'SP',
+                ])
+            # Algumas linhas repetidas no fim do arquivo.
+            for i in range(min(100, len(cpfs))):
+                escritor.writerow([f'Repetido {i}', cpfs[i], '(11) 99999-9999', '', '', '', '', '', '', ''])
+
+    def handle(self, *args, **options):
+        gerador = np.random.default_rng(options['semente'])
+        cpfs = gerar_cpfs(options['clientes'], gerador)
+
+        inicio = time.perf_counter()
+        validos = importacao.digitos_verificadores_validos(cpfs)
+        tempo_lote = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        por_linha = [Cliente.is_valid_cpf(cpf) for cpf in cpfs]
+        tempo_linha = time.perf_counter() - inicio
+        if list(validos) != por_linha:
+            self.stderr.write('A validação em lote diverge de Cliente.is_valid_cpf.')
+        self.stdout.write(
+            f'Validação de {len(cpfs)} CPFs: numpy {tempo_lote * 1000:.1f} ms, '
+            f'is_valid_cpf {tempo_linha * 1000:.1f} ms'
+        )
+
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, 'clientes.csv')
+            self._escrever_csv(caminho, cpfs, gerador, options['invalidos'])
+
+            with banco_temporario():
+                erros = []
+                inicio = time.perf_counter()
+                with open(caminho, newline='', encoding='utf-8') as arquivo:
+                    resumo = importacao.importar_clientes(csv.DictReader(arquivo), erros, options['lote'])
+                duracao = time.perf_counter() - inicio
+                self.stdout.write(
+                    f"Importação: {resumo['linhas']} linhas, {resumo['clientes_criados']} clientes, "
+                    f"{resumo['enderecos_criados']} endereços, {resumo['linhas_recusadas']} recusadas "
+                    f"em {duracao:.1f} s ({resumo['linhas'] / duracao:.0f} linhas/s)"
+                )
+                self.stdout.write(
+                    f'No banco: {Cliente.objects.count()} clientes, '
+                    f'{Endereco.objects.filter(principal=True).count()} endereços principais'
+                )
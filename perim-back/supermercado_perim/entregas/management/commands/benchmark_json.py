@@ -0,0 +1,76 @@
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from entregas import renderers
+from entregas.models import Cliente, Endereco, Entrega, Entregador
+from entregas.serializers import EntregaSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara tempo e pico de memória de JSONRenderer e OrjsonRenderer sobre a saída de '
+        'EntregaSerializer(many=True). Monta as entregas em memória, sem banco.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanhos', type=int, nargs='+', default=[1000, 10000, 100000])
+        parser.add_argument('--repeticoes', type=int, default=3)
+
+    def _base(self, quantidade=1000):
+        agora = timezone.now()
+        entregadores = [Entregador(id=i + 1, nome=f'Entregador {i}', created_at=agora, updated_at=agora) for i in range(20)]
+        entregas = []
+        for i in range(quantidade):
+            cliente = Cliente(id=i // 10 + 1, nome=f'Cliente {i // 10:05d} São João')
+            endereco = Endereco(
+                id=i // 5 + 1, cliente=cliente, cep='01234-567', logradouro=f'Rua {i}', numero=str(i),
+                complemento=None if i % 3 else 'Apto 1', bairro='Centro', cidade='São Paulo', estado='SP', principal=not i % 2
+            )
+            entregas.append(Entrega(
+                id=i + 1, cliente=cliente, endereco=endereco,
+                entregador=entregadores[i % 21] if i % 21 < 20 else None,
+                status=Entrega.STATUS_CHOICES[i % 3][0], numero_caixas=i % 7 + 1, bebidas=bool(i % 2), outros=not i % 5,
+                nome_embalador='Roberto', numero_nfce=str(100000 + i), serie_nfce='1', data_compra=date.today(),
+                data_hora_entrega=agora - timedelta(minutes=i, microseconds=i), created_at=agora, updated_at=agora
+            ))
+        return EntregaSerializer(entregas, many=True).data
+
+    def _medir(self, renderer, dados, repeticoes):
+        melhor = None
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            conteudo = renderer.render(dados)
+            duracao = time.perf_counter() - inicio
+            melhor = duracao if melhor is None else min(melhor, duracao)
+        tracemalloc.start()
+        renderer.render(dados)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return melhor, pico, conteudo
+
+    def handle(self, *args, **options):
+        if renderers.orjson is None:
+            raise CommandError('orjson não está instalado; OrjsonRenderer usaria o json da biblioteca padrão.')
+        base = self._base()
+        self.stdout.write(f"{'linhas':>8} | {'renderer':<14} | {'tempo':>10} | {'pico de memória':>15} | tamanho")
+        for tamanho in options['tamanhos']:
+            # Cópias da base com ids distintos: o conteúdo é o de EntregaSerializer.
+            dados = [{**base[i % len(base)], 'id': i + 1} for i in range(tamanho)]
+            resultados = {}
+            for nome, renderer in (('JSONRenderer', JSONRenderer()), ('OrjsonRenderer', renderers.OrjsonRenderer())):
+                resultados[nome] = self._medir(renderer, dados, options['repeticoes'])
+                tempo, pico, conteudo = resultados[nome]
+                self.stdout.write(
+                    f'{tamanho:>8} | {nome:<14} | {tempo * 1000:>7.1f} ms | {pico / 2 ** 20:>11.1f} MiB | '
+                    f'{len(conteudo) / 2 ** 20:.1f} MiB'
+                )
+            if resultados['JSONRenderer'][2] != resultados['OrjsonRenderer'][2]:
+                raise CommandError(f'{tamanho} linhas: os renderers produziram JSON diferente.')
+            self.stdout.write(
+                f"{'':>8}   {'ganho':<14}   {resultados['JSONRenderer'][0] / resultados['OrjsonRenderer'][0]:>8.1f}x"
+            )
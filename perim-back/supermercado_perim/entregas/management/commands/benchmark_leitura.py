@@ -0,0 +1,89 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from entregas import leitura_rapida
+from entregas.models import Cliente, Endereco, Entrega, Entregador
+from entregas.serializers import ClienteSerializer, EntregaSerializer
+
+from ._banco_temporario import banco_temporario
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara o tempo de montar e renderizar as listas de entregas e clientes pelos '
+        'serializers do DRF e pela leitura rápida (entregas/leitura_rapida.py). '
+        'Usa um banco SQLite temporário.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--linhas', type=int, default=10000)
+        parser.add_argument('--repeticoes', type=int, default=3)
+
+    def _popular(self, linhas):
+        clientes = Cliente.objects.bulk_create(
+            Cliente(nome=f'Cliente {i:05d}', cpf=f'{i:011d}', telefone='(11) 99999-9999')
+            for i in range(max(1, linhas // 10))
+        )
+        enderecos = Endereco.objects.bulk_create(
+            Endereco(
+                cliente=cliente, cep='01234-567', logradouro=f'Rua {j}', numero=str(j), complemento=None if j else 'Casa',
+                bairro='Centro', cidade='São Paulo', estado='SP', principal=(j == 0)
+            )
+            for cliente in clientes for j in range(2)
+        )
+        entregadores = Entregador.objects.bulk_create(Entregador(nome=f'Entregador {i}') for i in range(20))
+        agora = timezone.now()
+        Entrega.objects.bulk_create((
+            Entrega(
+                cliente_id=enderecos[i % len(enderecos)].cliente_id, endereco=enderecos[i % len(enderecos)],
+                entregador=entregadores[i % 21] if i % 21 < 20 else None,
+                status=Entrega.STATUS_CHOICES[i % 3][0], numero_caixas=i % 7 + 1, bebidas=bool(i % 2),
+                nome_embalador='Roberto', numero_nfce=str(i), serie_nfce='1',
+                data_compra=date.today(), data_hora_entrega=agora - timedelta(minutes=i)
+            )
+            for i in range(linhas)
+        ), batch_size=1000)
+
+    def _medir(self, montar, repeticoes):
+        melhor, conteudo = None, None
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            conteudo = JSONRenderer().render(montar())
+            duracao = time.perf_counter() - inicio
+            melhor = duracao if melhor is None else min(melhor, duracao)
+        return melhor, conteudo
+
+    def _comparar(self, nome, drf, rapida, repeticoes):
+        tempo_drf, conteudo_drf = self._medir(drf, repeticoes)
+        tempo_rapida, conteudo_rapida = self._medir(rapida, repeticoes)
+        if conteudo_drf != conteudo_rapida:
+            raise CommandError(f'{nome}: a leitura rápida gerou um JSON diferente do serializer.')
+        self.stdout.write(
+            f'{nome:<10} DRF {tempo_drf * 1000:8.1f} ms | rápida {tempo_rapida * 1000:8.1f} ms | '
+            f'{tempo_drf / tempo_rapida:5.1f}x | {len(conteudo_drf) / 1024:,.0f} KiB'
+        )
+
+    def handle(self, *args, **options):
+        repeticoes = options['repeticoes']
+        with banco_temporario():
+            self._popular(options['linhas'])
+            self.stdout.write(f"{options['linhas']} entregas, melhor de {repeticoes} (consulta + montagem + JSON)")
+
+            entregas = Entrega.objects.order_by('-data_hora_entrega')
+            self._comparar(
+                'entregas',
+                lambda: EntregaSerializer(entregas.select_related('cliente', 'endereco', 'entregador'), many=True).data,
+                lambda: leitura_rapida.leitor_entregas.serializar(leitura_rapida.leitor_entregas.valores(entregas)),
+                repeticoes
+            )
+            clientes = Cliente.objects.com_enderecos().order_by('nome')
+            self._comparar(
+                'clientes',
+                lambda: ClienteSerializer(clientes, many=True).data,
+                lambda: leitura_rapida.leitor_clientes.serializar(leitura_rapida.leitor_clientes.valores(clientes)),
+                repeticoes
+            )
@@ -0,0 +1,93 @@
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from entregas import rotas
+from entregas.models import CentroideCep, Cliente, Endereco, Entrega, Entregador
+
+from ._banco_temporario import banco_temporario
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede o planejamento de rotas (entregas/rotas.py): só o cálculo, sobre pontos aleatórios, e o '
+        'planejar_rotas completo (consulta, cálculo e bulk_update) num banco SQLite temporário.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entregas', type=int, default=2000)
+        parser.add_argument('--entregadores', type=int, default=50)
+        parser.add_argument('--semente', type=int, default=1)
+
+    def _pontos(self, quantidade, gerador):
+        # Espalhados por ~30 km em torno do centro de São Paulo.
+        return np.column_stack((
+            -23.55 + gerador.normal(0, 0.09, quantidade),
+            -46.63 + gerador.normal(0, 0.09, quantidade),
+        ))
+
+    def _popular(self, quantidade, entregadores, gerador, dia):
+        latlon = self._pontos(quantidade, gerador)
+        CentroideCep.objects.bulk_create(
+            CentroideCep(prefixo=f'{i:08d}', latitude=lat, longitude=lon) for i, (lat, lon) in enumerate(latlon)
+        )
+        clientes = Cliente.objects.bulk_create(
+            Cliente(nome=f'Cliente {i:05d}', cpf=f'{i:011d}', telefone='(11) 99999-9999') for i in range(quantidade)
+        )
+        enderecos = Endereco.objects.bulk_create(
+            Endereco(
+                cliente=cliente, cep=f'{i:08d}'[:5] + '-' + f'{i:08d}'[5:],
+                logradouro=f'Rua {i}', numero=str(i), bairro='Centro', cidade='São Paulo', estado='SP', principal=True
+            )
+            for i, cliente in enumerate(clientes)
+        )
+        Entregador.objects.bulk_create(Entregador(nome=f'Entregador {i}') for i in range(entregadores))
+        horario = timezone.make_aware(datetime.combine(dia, datetime.min.time()) + timedelta(hours=10))
+        Entrega.objects.bulk_create((
+            Entrega(
+                cliente=endereco.cliente, endereco=endereco, numero_caixas=int(gerador.integers(1, 8)),
+                frios_congelados=bool(gerador.random() < 0.2), nome_embalador='Roberto', numero_nfce=str(i),
+                serie_nfce='1', data_compra=dia, data_hora_entrega=horario
+            )
+            for i, endereco in enumerate(enderecos)
+        ), batch_size=1000)
+
+    def _resumo(self, cargas):
+        cargas = np.asarray(cargas, dtype=float)
+        return f'carga por rota mín {cargas.min():.0f} / média {cargas.mean():.1f} / máx {cargas.max():.0f}'
+
+    def handle(self, *args, **options):
+        quantidade, entregadores = options['entregas'], options['entregadores']
+        gerador = np.random.default_rng(options['semente'])
+
+        latlon = self._pontos(quantidade, gerador)
+        urgentes = gerador.random(quantidade) < 0.2
+        pesos = gerador.integers(1, 8, quantidade) + urgentes * 2
+        inicio = time.perf_counter()
+        resultado = rotas.planejar(latlon, pesos, urgentes, entregadores)
+        duracao = time.perf_counter() - inicio
+        pontos = rotas.projetar(latlon, latlon.mean(axis=0))
+        sem_2opt = rotas.planejar(latlon, pesos, urgentes, entregadores, iteracoes=0)
+        self.stdout.write(
+            f'cálculo: {quantidade} entregas, {entregadores} entregadores em {duracao * 1000:.0f} ms; '
+            f'{self._resumo([pesos[rota].sum() for rota in resultado])}'
+        )
+        self.stdout.write(
+            f"distância total {sum(rotas.distancia_da_rota(pontos[rota]) for rota in resultado):,.0f} km "
+            f"(só vizinho mais próximo: {sum(rotas.distancia_da_rota(pontos[rota]) for rota in sem_2opt):,.0f} km)"
+        )
+
+        dia = date.today()
+        with banco_temporario():
+            self._popular(quantidade, entregadores, gerador, dia)
+            inicio = time.perf_counter()
+            planejado = rotas.planejar_rotas(dia)
+            duracao = time.perf_counter() - inicio
+            atribuidas = Entrega.objects.filter(entregador__isnull=False, ordem_rota__isnull=False).count()
+            self.stdout.write(
+                f'planejar_rotas com gravação: {duracao * 1000:.0f} ms, {atribuidas} entregas atribuídas; '
+                f"{self._resumo([rota['carga'] for rota in planejado['rotas']])}"
+            )
@@ -0,0 +1,57 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from entregas.geo import cache_centroides
+from entregas.models import CentroideCep
+
+
+class Command(BaseCommand):
+    help = (
+        'Carrega coordenadas de CEPs a partir de um CSV com as colunas prefixo,latitude,longitude. '
+        'O prefixo pode ter 8 (CEP completo), 5 ou 3 dígitos; vale o mais longo encontrado. '
+        'Depois, `geocodificar_enderecos` preenche as coordenadas dos endereços já cadastrados.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo')
+        parser.add_argument('--lote', type=int, default=5000)
+        parser.add_argument('--delimitador', default=',')
+
+    def _gravar(self, registros):
+        CentroideCep.objects.bulk_create(
+            registros,
+            update_conflicts=True,
+            unique_fields=['prefixo'],
+            update_fields=['latitude', 'longitude'],
+        )
+
+    def handle(self, *args, **options):
+        carregados = ignorados = 0
+        lote = []
+        try:
+            arquivo = open(options['arquivo'], newline='', encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(f'Não foi possível abrir {options["arquivo"]}: {exc}')
+
+        with arquivo:
+            for linha in csv.DictReader(arquivo, delimiter=options['delimitador']):
+                prefixo = ''.join(c for c in linha.get('prefixo') or '' if c.isdigit())
+                try:
+                    latitude, longitude = float(linha['latitude']), float(linha['longitude'])
+                except (KeyError, TypeError, ValueError):
+                    latitude = longitude = None
+                if len(prefixo) not in (3, 5, 8) or latitude is None or not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                    ignorados += 1
+                    continue
+                lote.append(CentroideCep(prefixo=prefixo, latitude=latitude, longitude=longitude))
+                if len(lote) >= options['lote']:
+                    self._gravar(lote)
+                    carregados += len(lote)
+                    lote = []
+            if lote:
+                self._gravar(lote)
+                carregados += len(lote)
+
+        cache_centroides.clear()
+        self.stdout.write(self.style.SUCCESS(f'{carregados} centroides carregados, {ignorados} linhas ignoradas.'))
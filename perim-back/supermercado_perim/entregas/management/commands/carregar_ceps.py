@@ -0,0 +1,57 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from entregas.cep import cache_memoria, normalizar_cep
+from entregas.models import Cep
+
+CAMPOS = ['logradouro', 'complemento', 'bairro', 'cidade', 'estado']
+
+
+class Command(BaseCommand):
+    help = (
+        'Carrega uma base offline de CEPs a partir de um CSV com as colunas '
+        'cep,logradouro,complemento,bairro,cidade,estado.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo')
+        parser.add_argument('--lote', type=int, default=5000)
+        parser.add_argument('--delimitador', default=',')
+
+    def _gravar(self, registros):
+        Cep.objects.bulk_create(
+            registros,
+            update_conflicts=True,
+            unique_fields=['cep'],
+            update_fields=CAMPOS + ['origem', 'atualizado_em'],
+        )
+
+    def handle(self, *args, **options):
+        carregados = ignorados = 0
+        lote = []
+        try:
+            arquivo = open(options['arquivo'], newline='', encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(f'Não foi possível abrir {options["arquivo"]}: {exc}')
+
+        with arquivo:
+            for linha in csv.DictReader(arquivo, delimiter=options['delimitador']):
+                cep = normalizar_cep(linha.get('cep'))
+                if cep is None:
+                    ignorados += 1
+                    continue
+                lote.append(Cep(
+                    cep=cep, origem=Cep.ORIGEM_OFFLINE,
+                    **{campo: (linha.get(campo) or '').strip() for campo in CAMPOS}
+                ))
+                if len(lote) >= options['lote']:
+                    self._gravar(lote)
+                    carregados += len(lote)
+                    lote = []
+            if lote:
+                self._gravar(lote)
+                carregados += len(lote)
+
+        cache_memoria.clear()
+        self.stdout.write(self.style.SUCCESS(f'{carregados} CEPs carregados, {ignorados} linhas ignoradas.'))
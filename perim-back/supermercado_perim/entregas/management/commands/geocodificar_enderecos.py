@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from entregas import geo
+from entregas.lote import gravar_campos
+from entregas.models import Endereco
+
+
+class Command(BaseCommand):
+    help = (
+        'Preenche latitude, longitude e geocelula dos endereços a partir dos centroides de CEP '
+        '(ver carregar_centroides). Por padrão só os endereços ainda sem coordenadas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', action='store_true', help='Recalcula também os que já têm coordenadas.')
+        parser.add_argument('--lote', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        queryset = Endereco.objects.order_by('id')
+        if not options['todos']:
+            queryset = queryset.filter(latitude__isnull=True)
+        processados = localizados = 0
+        ultimo = 0
+        while True:
+            enderecos = list(queryset.filter(id__gt=ultimo).only('id', 'cep')[:options['lote']])
+            if not enderecos:
+                break
+            ultimo = enderecos[-1].id
+            geo.preencher(enderecos)
+            with transaction.atomic():
+                gravar_campos(enderecos, ['latitude', 'longitude', 'geocelula'])
+            processados += len(enderecos)
+            localizados += sum(endereco.latitude is not None for endereco in enderecos)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{processados} endereços processados, {localizados} com coordenadas.'
+        ))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from entregas import dados_sinteticos
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera dados sintéticos no banco configurado: clientes com CPFs válidos, endereços com '
+        'coordenadas na Grande São Paulo, entregadores e entregas espalhadas pelos últimos meses '
+        '(ver entregas/dados_sinteticos.py). Os agregados são reconstruídos no fim.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=1000)
+        parser.add_argument('--enderecos', type=int, default=2, help='Endereços por cliente.')
+        parser.add_argument('--entregas', type=int, default=10000)
+        parser.add_argument('--entregadores', type=int, default=10)
+        parser.add_argument('--meses', type=int, default=6, help='Quantos meses para trás as entregas cobrem.')
+        parser.add_argument('--semente', type=int, default=1)
+        parser.add_argument('--lote', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options['clientes'] < 0 or options['enderecos'] < 1 or options['meses'] < 1 or options['lote'] < 1:
+            raise CommandError('Use --clientes >= 0 e --enderecos, --meses e --lote >= 1.')
+        inicio = time.perf_counter()
+        criados = dados_sinteticos.gerar(
+            clientes=options['clientes'], enderecos_por_cliente=options['enderecos'],
+            entregas=options['entregas'], entregadores=options['entregadores'], meses=options['meses'],
+            semente=options['semente'], lote=options['lote'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Criados {criados['clientes']} clientes, {criados['enderecos']} endereços, "
+            f"{criados['entregadores']} entregadores e {criados['entregas']} entregas "
+            f"em {time.perf_counter() - inicio:.1f} s."
+        ))
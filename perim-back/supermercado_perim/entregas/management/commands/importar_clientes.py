@@ -0,0 +1,54 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from entregas.importacao import COLUNAS, Importacao
+
+
+class RelatorioErros:
+    # Escreve cada linha recusada no CSV assim que ela aparece.
+    def __init__(self, arquivo):
+        self.escritor = csv.writer(arquivo)
+        self.escritor.writerow(['linha', 'cpf', 'erro'])
+
+    def append(self, erro):
+        self.escritor.writerow(erro)
+
+
+class Command(BaseCommand):
+    help = (
+        f'Importa clientes de um CSV com as colunas {",".join(COLUNAS)} (as de endereço são opcionais). '
+        'As linhas recusadas vão para o relatório de erros (linha, cpf, erro).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo')
+        parser.add_argument('--relatorio', help='CSV de erros (padrão: <arquivo>.erros.csv)')
+        parser.add_argument('--lote', type=int, default=5000)
+        parser.add_argument('--delimitador', default=',')
+
+    def handle(self, *args, **options):
+        caminho_relatorio = options['relatorio'] or f'{options["arquivo"]}.erros.csv'
+        try:
+            arquivo = open(options['arquivo'], newline='', encoding='utf-8-sig')
+            relatorio = open(caminho_relatorio, 'w', newline='', encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(f'Não foi possível abrir {exc.filename}: {exc}')
+
+        inicio = time.perf_counter()
+        with arquivo, relatorio:
+            leitor = csv.DictReader(arquivo, delimiter=options['delimitador'])
+            faltando = [coluna for coluna in ('nome', 'cpf', 'telefone') if coluna not in (leitor.fieldnames or [])]
+            if faltando:
+                raise CommandError(f'Colunas obrigatórias ausentes: {", ".join(faltando)}.')
+            resumo = Importacao(RelatorioErros(relatorio), options['lote']).processar(leitor)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resumo['clientes_criados']} clientes e {resumo['enderecos_criados']} endereços importados de "
+            f"{resumo['linhas']} linhas em {time.perf_counter() - inicio:.1f} s."
+        ))
+        if resumo['linhas_recusadas']:
+            self.stdout.write(self.style.WARNING(
+                f"{resumo['linhas_recusadas']} linhas recusadas; veja {caminho_relatorio}."
+            ))
@@ -0,0 +1,54 @@
+import mimetypes
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+
+from entregas.middleware import EXTENSOES, codificacoes_disponiveis, comprimir, tipo_comprimivel
+
+
+class Command(BaseCommand):
+    help = (
+        'Grava versões .gz e .br (nível máximo) do index.html do frontend e dos arquivos '
+        'comprimíveis do build (FRONTEND_BUILD_DIR, o dist do Vite), servidas por views.index sem '
+        'comprimir a cada requisição. Rode depois de cada `npm run build`; arquivos mais antigos '
+        'que o original são ignorados.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--template', default='index.html')
+        parser.add_argument('--diretorio', help='Diretório do build; o padrão é FRONTEND_BUILD_DIR.')
+
+    def _gravar(self, caminho, conteudo):
+        for codificacao in codificacoes_disponiveis():
+            nivel = 11 if codificacao == 'br' else 9
+            comprimido = comprimir(conteudo, codificacao, nivel)
+            destino = caminho + EXTENSOES[codificacao]
+            with open(destino, 'wb') as arquivo:
+                arquivo.write(comprimido)
+            self.stdout.write(f'{destino}: {len(conteudo)} -> {len(comprimido)} bytes')
+
+    def handle(self, *args, **options):
+        try:
+            template = get_template(options['template'])
+        except TemplateDoesNotExist:
+            raise CommandError(f"Template {options['template']} não encontrado; gere o build do frontend antes.")
+        # O index do frontend não depende da requisição; o resultado é o mesmo do render da view.
+        self._gravar(template.origin.name, template.render().encode('utf-8'))
+
+        diretorio = options['diretorio'] or getattr(settings, 'FRONTEND_BUILD_DIR', None)
+        if not diretorio or not os.path.isdir(diretorio):
+            return
+        minimo = getattr(settings, 'COMPRESSAO_TAMANHO_MINIMO', 1024)
+        for raiz, _, arquivos in os.walk(diretorio):
+            for nome in arquivos:
+                caminho = os.path.join(raiz, nome)
+                tipo, _ = mimetypes.guess_type(nome)
+                if caminho == template.origin.name or nome.endswith(tuple(EXTENSOES.values())):
+                    continue
+                if not tipo or not tipo_comprimivel(tipo) or os.path.getsize(caminho) < minimo:
+                    continue
+                with open(caminho, 'rb') as arquivo:
+                    self._gravar(caminho, arquivo.read())
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from entregas import agregados
+
+
+class Command(BaseCommand):
+    help = 'Recalcula do zero as tabelas de agregados de entregas usadas por /api/estatisticas/.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=None,
+            help='Recalcula apenas os últimos N dias de EntregaDiaria (os totais por cliente são mantidos).'
+        )
+
+    def handle(self, *args, **options):
+        desde = None
+        if options['dias'] is not None:
+            desde = timezone.localdate() - timedelta(days=options['dias'])
+        diarias, clientes = agregados.reconstruir(desde)
+        self.stdout.write(self.style.SUCCESS(
+            f'Agregados reconstruídos: {diarias} linhas diárias, {clientes} clientes.'
+        ))
@@ -0,0 +1,181 @@
+import gzip
+import os
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # só gzip
+    brotli = None
+
+# Compressão das respostas (gzip ou brotli, conforme o Accept-Encoding).
+# Só entram os tipos de COMPRESSAO_TIPOS; respostas comuns menores que
+# COMPRESSAO_TAMANHO_MINIMO saem como estão. Respostas em streaming (a
+# exportação de entregas) são comprimidas bloco a bloco, com flush a cada
+# bloco, para o cliente continuar recebendo os dados aos poucos.
+
+TIPOS_PADRAO = (
+    'application/json', 'application/x-ndjson', 'text/csv', 'text/html', 'text/plain',
+    'text/css', 'text/javascript', 'application/javascript', 'image/svg+xml',
+)
+
+
+def _tipos():
+    return getattr(settings, 'COMPRESSAO_TIPOS', TIPOS_PADRAO)
+
+
+def _nivel_gzip():
+    return getattr(settings, 'COMPRESSAO_GZIP_NIVEL', 6)
+
+
+def _qualidade_brotli():
+    return getattr(settings, 'COMPRESSAO_BROTLI_QUALIDADE', 5)
+
+
+def codificacoes_disponiveis():
+    return ('br', 'gzip') if brotli else ('gzip',)
+
+
+def _pesos(accept_encoding):
+    pesos = {}
+    for parte in accept_encoding.split(','):
+        nome, _, parametros = parte.partition(';')
+        nome = nome.strip().lower()
+        if not nome:
+            continue
+        peso = 1.0
+        encontrado = re.search(r'q\s*=\s*([0-9.]+)', parametros)
+        if encontrado:
+            try:
+                peso = float(encontrado.group(1))
+            except ValueError:
+                peso = 0.0
+        pesos[nome] = peso
+    return pesos
+
+
+def _peso(pesos, codificacao):
+    return pesos.get(codificacao, pesos.get('*', 0.0))
+
+
+def escolher_codificacao(accept_encoding):
+    # A de maior q entre as disponíveis; no empate, a primeira (br).
+    pesos = _pesos(accept_encoding)
+    escolhida, maior = None, 0.0
+    for codificacao in codificacoes_disponiveis():
+        if _peso(pesos, codificacao) > maior:
+            escolhida, maior = codificacao, _peso(pesos, codificacao)
+    return escolhida
+
+
+def tipo_comprimivel(content_type):
+    tipo = content_type.split(';', 1)[0].strip().lower()
+    return tipo in _tipos()
+
+
+def comprimir(conteudo, codificacao, nivel=None):
+    if codificacao == 'br':
+        return brotli.compress(conteudo, quality=_qualidade_brotli() if nivel is None else nivel)
+    # mtime=0: o mesmo conteúdo gera sempre os mesmos bytes.
+    return gzip.compress(conteudo, compresslevel=_nivel_gzip() if nivel is None else nivel, mtime=0)
+
+
+class _Compressor:
+    def __init__(self, codificacao):
+        if codificacao == 'br':
+            self._brotli = brotli.Compressor(quality=_qualidade_brotli())
+            self._zlib = None
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(_nivel_gzip(), zlib.DEFLATED, 31)
+
+    def bloco(self, dados):
+        if self._brotli:
+            return self._brotli.process(dados) + self._brotli.flush()
+        return self._zlib.compress(dados) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def fim(self):
+        if self._brotli:
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+def comprimir_fluxo(blocos, codificacao):
+    compressor = _Compressor(codificacao)
+    for dados in blocos:
+        saida = compressor.bloco(dados)
+        if saida:
+            yield saida
+    yield compressor.fim()
+
+
+async def comprimir_fluxo_async(blocos, codificacao):
+    compressor = _Compressor(codificacao)
+    async for dados in blocos:
+        saida = compressor.bloco(dados)
+        if saida:
+            yield saida
+    yield compressor.fim()
+
+
+class CompressaoMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or not tipo_comprimivel(response.get('Content-Type', '')):
+            return response
+        if not response.streaming and len(response.content) < getattr(settings, 'COMPRESSAO_TAMANHO_MINIMO', 1024):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codificacao = escolher_codificacao(request.headers.get('Accept-Encoding', ''))
+        if codificacao is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = comprimir_fluxo_async(response.streaming_content, codificacao)
+            else:
+                response.streaming_content = comprimir_fluxo(response.streaming_content, codificacao)
+            del response.headers['Content-Length']
+        else:
+            comprimido = comprimir(response.content, codificacao)
+            if len(comprimido) >= len(response.content):
+                return response
+            response.content = comprimido
+            response.headers['Content-Length'] = str(len(comprimido))
+
+        # O corpo mudou; um ETag forte deixaria de valer byte a byte.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = codificacao
+        return response
+
+
+EXTENSOES = {'br': '.br', 'gzip': '.gz'}
+
+
+def precomprimido(caminho, accept_encoding):
+    """
+    Versão comprimida de `caminho` gerada por `manage.py precomprimir_frontend`
+    que o cliente aceite: (codificacao, caminho_comprimido) ou None. Arquivos
+    mais antigos que o original são ignorados.
+    """
+    try:
+        modificado = os.path.getmtime(caminho)
+    except OSError:
+        return None
+    pesos = _pesos(accept_encoding)
+    for codificacao in sorted(codificacoes_disponiveis(), key=lambda c: -_peso(pesos, c)):
+        if _peso(pesos, codificacao) <= 0:
+            break
+        comprimido = caminho + EXTENSOES[codificacao]
+        try:
+            if os.path.getmtime(comprimido) >= modificado:
+                return codificacao, comprimido
+        except OSError:
+            continue
+    return None
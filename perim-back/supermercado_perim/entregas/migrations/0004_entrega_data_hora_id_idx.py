@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entregas', '0003_entrega_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='entrega',
+            index=models.Index(fields=['-data_hora_entrega', '-id'], name='entrega_data_hora_id_idx'),
+        ),
+    ]
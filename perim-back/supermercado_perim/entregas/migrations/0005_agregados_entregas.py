@@ -0,0 +1,65 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def popular_agregados(apps, schema_editor):
+    Entrega = apps.get_model('entregas', 'Entrega')
+    EntregaDiaria = apps.get_model('entregas', 'EntregaDiaria')
+    TotalEntregasCliente = apps.get_model('entregas', 'TotalEntregasCliente')
+
+    por_dia = (
+        Entrega.objects
+        .annotate(dia=TruncDate('data_hora_entrega', tzinfo=timezone.get_default_timezone()))
+        .values('dia', 'entregador_id', 'status')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    EntregaDiaria.objects.bulk_create((EntregaDiaria(**linha) for linha in por_dia.iterator()), batch_size=1000)
+
+    por_cliente = Entrega.objects.values('cliente_id').annotate(total=Count('id')).order_by()
+    TotalEntregasCliente.objects.bulk_create(
+        (TotalEntregasCliente(**linha) for linha in por_cliente.iterator()), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entregas', '0004_entrega_data_hora_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TotalEntregasCliente',
+            fields=[
+                ('cliente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='entregas.cliente', verbose_name='Cliente')),
+                ('total', models.IntegerField(db_index=True, default=0, verbose_name='Total de Entregas')),
+            ],
+            options={
+                'verbose_name': 'Total de Entregas do Cliente',
+                'verbose_name_plural': 'Totais de Entregas dos Clientes',
+            },
+        ),
+        migrations.CreateModel(
+            name='EntregaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField(verbose_name='Dia')),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('em_transito', 'Em Trânsito'), ('entregue', 'Entregue')], max_length=20, verbose_name='Status da Entrega')),
+                ('total', models.IntegerField(default=0, verbose_name='Total de Entregas')),
+                ('entregador', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='entregas.entregador', verbose_name='Entregador')),
+            ],
+            options={
+                'verbose_name': 'Entregas por Dia',
+                'verbose_name_plural': 'Entregas por Dia',
+                'ordering': ['-dia'],
+                'constraints': [models.UniqueConstraint(fields=('dia', 'entregador', 'status'), name='unique_entrega_diaria')],
+            },
+        ),
+        migrations.RunPython(popular_agregados, migrations.RunPython.noop),
+    ]
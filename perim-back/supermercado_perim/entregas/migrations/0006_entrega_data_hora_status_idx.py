@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entregas', '0005_agregados_entregas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='entrega',
+            index=models.Index(fields=['data_hora_entrega', 'status'], name='entrega_data_hora_status_idx'),
+        ),
+    ]
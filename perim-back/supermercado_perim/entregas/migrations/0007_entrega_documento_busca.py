@@ -0,0 +1,70 @@
+# Generated by Django 5.2.1 on 2026-10-18 08:59
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+# Cópias congeladas de entregas.busca.normalizar/montar_documento como eram
+# nesta migração: mudanças posteriores em busca.py não a afetam.
+def normalizar(texto):
+    if not texto:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', str(texto))
+    sem_acentos = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.lower().split())
+
+
+def montar_documento(entrega):
+    endereco = entrega.endereco
+    partes = [
+        entrega.cliente.nome,
+        entrega.entregador.nome if entrega.entregador_id else '',
+        entrega.numero_nfce,
+        entrega.nome_embalador,
+        endereco.logradouro,
+        endereco.bairro,
+        endereco.cep,
+    ]
+    return '\n'.join(normalizar(parte) for parte in partes)
+
+
+def preencher_documentos(apps, schema_editor):
+    Entrega = apps.get_model('entregas', 'Entrega')
+    pendentes = []
+    for entrega in Entrega.objects.select_related('cliente', 'endereco', 'entregador').iterator(chunk_size=500):
+        entrega.documento_busca = montar_documento(entrega)
+        pendentes.append(entrega)
+        if len(pendentes) >= 500:
+            Entrega.objects.bulk_update(pendentes, ['documento_busca'])
+            pendentes = []
+    if pendentes:
+        Entrega.objects.bulk_update(pendentes, ['documento_busca'])
+
+
+def remover_indice(apps, schema_editor):
+    # O índice de busca é criado fora das migrações (post_migrate); ao
+    # desfazer, as triggers precisam sair antes da coluna.
+    with schema_editor.connection.cursor() as cursor:
+        if schema_editor.connection.vendor == 'sqlite':
+            for sufixo in ('ai', 'ad', 'au'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS entregas_entrega_busca_{sufixo}')
+            cursor.execute('DROP TABLE IF EXISTS entregas_entrega_busca')
+        elif schema_editor.connection.vendor == 'postgresql':
+            cursor.execute('DROP INDEX IF EXISTS entrega_documento_busca_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entregas', '0006_entrega_data_hora_status_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entrega',
+            name='documento_busca',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Documento de Busca'),
+        ),
+        migrations.RunPython(preencher_documentos, remover_indice),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entregas', '0008_cep'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='entrega',
+            index=models.Index(fields=['cliente', '-data_hora_entrega', '-id'], name='entrega_cliente_data_hora_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entregas', '0009_entrega_cliente_data_hora_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CentroideCep',
+            fields=[
+                ('prefixo', models.CharField(max_length=8, primary_key=True, serialize=False, verbose_name='Prefixo do CEP')),
+                ('latitude', models.FloatField(verbose_name='Latitude')),
+                ('longitude', models.FloatField(verbose_name='Longitude')),
+            ],
+            options={
+                'verbose_name': 'Centroide de CEP',
+                'verbose_name_plural': 'Centroides de CEP',
+            },
+        ),
+        migrations.AddField(
+            model_name='entrega',
+            name='ordem_rota',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Ordem na Rota'),
+        ),
+    ]
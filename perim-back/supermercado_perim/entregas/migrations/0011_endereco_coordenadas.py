@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entregas', '0010_centroidecep_entrega_ordem_rota'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='endereco',
+            name='geocelula',
+            field=models.BigIntegerField(blank=True, db_index=True, editable=False, null=True, verbose_name='Célula da Grade'),
+        ),
+        migrations.AddField(
+            model_name='endereco',
+            name='latitude',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Latitude'),
+        ),
+        migrations.AddField(
+            model_name='endereco',
+            name='longitude',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Longitude'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:34
+
+import re
+
+from django.db import migrations, models
+
+
+def somente_digitos(valor):
+    # Cópia de entregas.models.somente_digitos, congelada para esta migração.
+    return re.sub(r'[^0-9]', '', valor or '')
+
+
+def preencher_digitos(apps, schema_editor):
+    for modelo, colunas in (('Cliente', {'cpf_digitos': 'cpf', 'telefone_digitos': 'telefone'}), ('Endereco', {'cep_digitos': 'cep'})):
+        Modelo = apps.get_model('entregas', modelo)
+        pendentes = []
+        for objeto in Modelo.objects.only(*colunas.values()).iterator(chunk_size=2000):
+            for coluna, origem in colunas.items():
+                setattr(objeto, coluna, somente_digitos(getattr(objeto, origem)))
+            pendentes.append(objeto)
+            if len(pendentes) >= 2000:
+                Modelo.objects.bulk_update(pendentes, list(colunas))
+                pendentes = []
+        if pendentes:
+            Modelo.objects.bulk_update(pendentes, list(colunas))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entregas', '0011_endereco_coordenadas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='cpf_digitos',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=11, verbose_name='CPF (dígitos)'),
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='telefone_digitos',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=11, verbose_name='Telefone (dígitos)'),
+        ),
+        migrations.AddField(
+            model_name='endereco',
+            name='cep_digitos',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=8, verbose_name='CEP (dígitos)'),
+        ),
+        migrations.RunPython(preencher_digitos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entregas', '0012_digitos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='entrega',
+            index=models.Index(fields=['status', '-data_hora_entrega', '-id'], name='entrega_status_data_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entrega',
+            index=models.Index(fields=['entregador', '-data_hora_entrega', '-id'], name='entrega_entregador_data_idx'),
+        ),
+    ]
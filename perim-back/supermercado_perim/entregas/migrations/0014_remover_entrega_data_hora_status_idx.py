@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:08
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entregas', '0013_entrega_indices_filtros'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='entrega',
+            name='entrega_data_hora_status_idx',
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:10
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def juntar_repetidas(apps, schema_editor):
+    # Linhas "sem entregador" duplicadas por escritas concorrentes viram uma só, com a soma.
+    EntregaDiaria = apps.get_model('entregas', 'EntregaDiaria')
+    repetidas = (
+        EntregaDiaria.objects.filter(entregador__isnull=True)
+        .values('dia', 'status')
+        .annotate(linhas=Count('id'), soma=Sum('total'))
+        .filter(linhas__gt=1)
+        .order_by()
+    )
+    for grupo in repetidas:
+        linhas = EntregaDiaria.objects.filter(entregador__isnull=True, dia=grupo['dia'], status=grupo['status'])
+        manter = linhas.order_by('id').first()
+        linhas.exclude(pk=manter.pk).delete()
+        EntregaDiaria.objects.filter(pk=manter.pk).update(total=grupo['soma'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entregas', '0014_remover_entrega_data_hora_status_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(juntar_repetidas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='entregadiaria',
+            constraint=models.UniqueConstraint(condition=models.Q(('entregador__isnull', True)), fields=('dia', 'status'), name='unique_entrega_diaria_sem_entregador'),
+        ),
+    ]
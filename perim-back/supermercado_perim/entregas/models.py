@@ -1,9 +1,71 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import RegexValidator
 from django.core.exceptions import ValidationError
 import re
 
-class Entregador(models.Model):
+from .busca import montar_documento
+
+
+class RastreiaAlteracoesMixin:
+    # Guarda os valores vindos do banco para que os handlers de post_save
+    # saibam o estado anterior sem precisar de uma consulta extra.
+    campos_rastreados = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        carregados = dict(zip(field_names, values))
+        instance._originais = {
+            campo: carregados[campo] for campo in cls.campos_rastreados if campo in carregados
+        }
+        return instance
+
+    def valores_originais(self):
+        # None quando o objeto ainda não existe no banco.
+        if self._state.adding:
+            return None
+        originais = getattr(self, '_originais', {})
+        faltando = [campo for campo in self.campos_rastreados if campo not in originais]
+        if faltando:
+            carregados = type(self)._base_manager.filter(pk=self.pk).values(*faltando).first() or {}
+            originais = {**originais, **carregados}
+            self._originais = originais
+        return originais
+
+    def valores_atuais(self):
+        return {campo: getattr(self, campo) for campo in self.campos_rastreados}
+
+    def save(self, *args, **kwargs):
+        self.valores_originais()
+        super().save(*args, **kwargs)
+        self._originais = self.valores_atuais()
+
+
+def somente_digitos(valor):
+    return re.sub(r'[^0-9]', '', valor or '')
+
+
+class ColunasDigitosMixin:
+    # Colunas com só os dígitos de campos mascarados (CPF, telefone, CEP),
+    # indexadas para buscas exatas e por prefixo. Quem grava sem passar pelo
+    # save() (bulk_create) chama preencher_digitos() antes.
+    colunas_digitos = {}
+
+    def preencher_digitos(self):
+        for coluna, origem in self.colunas_digitos.items():
+            setattr(self, coluna, somente_digitos(getattr(self, origem)))
+
+    def save(self, *args, **kwargs):
+        self.preencher_digitos()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {
+                *update_fields, *(coluna for coluna, origem in self.colunas_digitos.items() if origem in update_fields)
+            }
+        super().save(*args, **kwargs)
+
+
+class Entregador(RastreiaAlteracoesMixin, models.Model):
     nome = models.CharField(max_length=100, verbose_name="Nome do Entregador")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -13,10 +75,19 @@ class Entregador(models.Model):
         verbose_name_plural = "Entregadores"
         ordering = ['nome']
 
+    campos_rastreados = ('nome',)
+
     def __str__(self):
         return self.nome
 
-class Cliente(models.Model):
+class ClienteQuerySet(models.QuerySet):
+    def com_enderecos(self):
+        # Com os endereços já carregados, Cliente.endereco_principal escolhe o
+        # principal em Python, sem uma consulta por cliente.
+        return self.prefetch_related('enderecos')
+
+
+class Cliente(ColunasDigitosMixin, RastreiaAlteracoesMixin, models.Model):
     nome = models.CharField(max_length=200, verbose_name="Nome")
     cpf = models.CharField(
         max_length=14,
@@ -35,18 +106,31 @@ class Cliente(models.Model):
         )],
         verbose_name="Telefone"
     )
+    cpf_digitos = models.CharField(max_length=11, default='', editable=False, db_index=True, verbose_name="CPF (dígitos)")
+    telefone_digitos = models.CharField(max_length=11, default='', editable=False, db_index=True, verbose_name="Telefone (dígitos)")
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ClienteQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Cliente"
         verbose_name_plural = "Clientes"
         ordering = ['nome']
 
+    campos_rastreados = ('nome',)
+    colunas_digitos = {'cpf_digitos': 'cpf', 'telefone_digitos': 'telefone'}
+
     def __str__(self):
         return f"{self.nome} - {self.cpf}"
 
+    @property
+    def endereco_principal(self):
+        if 'enderecos' in getattr(self, '_prefetched_objects_cache', {}):
+            return next((endereco for endereco in self.enderecos.all() if endereco.principal), None)
+        return self.enderecos.filter(principal=True).first()
+
     def clean(self):
         super().clean()
         if not self.is_valid_cpf(self.cpf):
@@ -54,7 +138,7 @@ class Cliente(models.Model):
 
     @staticmethod
     def is_valid_cpf(cpf_value):
-        cpf_cleaned = re.sub(r'[^0-9]', '', cpf_value)
+        cpf_cleaned = somente_digitos(cpf_value)
         if len(cpf_cleaned) != 11:
             return False
         if cpf_cleaned == cpf_cleaned[0] * 11:
@@ -68,7 +152,7 @@ class Cliente(models.Model):
         return cpf_cleaned[-2:] == f"{digito1}{digito2}"
 
 
-class Endereco(models.Model):
+class Endereco(ColunasDigitosMixin, RastreiaAlteracoesMixin, models.Model):
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name='enderecos', verbose_name="Cliente")
     cep = models.CharField(
         max_length=9,
@@ -78,6 +162,7 @@ class Endereco(models.Model):
         )],
         verbose_name="CEP"
     )
+    cep_digitos = models.CharField(max_length=8, default='', editable=False, db_index=True, verbose_name="CEP (dígitos)")
     logradouro = models.CharField(max_length=200, verbose_name="Logradouro")
     numero = models.CharField(max_length=10, verbose_name="Número")
     complemento = models.CharField(max_length=100, blank=True, null=True, verbose_name="Complemento")
@@ -85,6 +170,9 @@ class Endereco(models.Model):
     cidade = models.CharField(max_length=100, verbose_name="Cidade")
     estado = models.CharField(max_length=2, verbose_name="Estado")
     principal = models.BooleanField(default=False, verbose_name="Endereço Principal")
+    latitude = models.FloatField(null=True, blank=True, editable=False, verbose_name="Latitude")
+    longitude = models.FloatField(null=True, blank=True, editable=False, verbose_name="Longitude")
+    geocelula = models.BigIntegerField(null=True, blank=True, editable=False, db_index=True, verbose_name="Célula da Grade")
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -97,30 +185,38 @@ class Endereco(models.Model):
             models.UniqueConstraint(fields=['cliente', 'principal'], condition=models.Q(principal=True), name='unique_principal_por_cliente_if_true')
         ]
 
+    campos_rastreados = ('logradouro', 'bairro', 'cep')
+    colunas_digitos = {'cep_digitos': 'cep'}
+
 
     def __str__(self):
         complemento_str = f", {self.complemento}" if self.complemento else ""
         return f"{self.logradouro}, {self.numero}{complemento_str}, {self.bairro}, {self.cidade}/{self.estado} (CEP: {self.cep})"
 
     def save(self, *args, **kwargs):
-        if self.principal:
-            Endereco.objects.filter(cliente=self.cliente, principal=True).exclude(pk=self.pk).update(principal=False)
-        
-        is_new = self._state.adding
-        super().save(*args, **kwargs) 
-
-        if is_new and not self.cliente.enderecos.filter(principal=True).exclude(pk=self.pk).exists():
-             if not self.principal: 
+        # No máximo dois comandos, na mesma transação:
+        #   principal=True: desmarca o principal anterior do cliente + INSERT/UPDATE;
+        #   novo, principal=False: INSERT + vira principal se o cliente não tiver outro;
+        #   alteração, principal=False: UPDATE + volta a ser principal se for o único endereço.
+        with transaction.atomic(using=kwargs.get('using')):
+            if self.principal:
+                outros = Endereco.objects.filter(cliente_id=self.cliente_id, principal=True)
+                if not self._state.adding:
+                    outros = outros.exclude(pk=self.pk)
+                outros.update(principal=False)
+                super().save(*args, **kwargs)
+                return
+
+            is_new = self._state.adding
+            super().save(*args, **kwargs)
+            outros = Endereco.objects.filter(cliente_id=self.cliente_id).exclude(pk=self.pk)
+            if is_new:
+                outros = outros.filter(principal=True)
+            if Endereco.objects.filter(pk=self.pk).exclude(models.Exists(outros)).update(principal=True):
                 self.principal = True
-                super().save(update_fields=['principal']) 
-        elif not self.cliente.enderecos.filter(principal=True).exists() and self.cliente.enderecos.exists():
-            if self.cliente.enderecos.count() == 1 and self.pk == self.cliente.enderecos.first().pk:
-                if not self.principal:
-                    self.principal = True
-                    super().save(update_fields=['principal'])
 
 
-class Entrega(models.Model):
+class Entrega(RastreiaAlteracoesMixin, models.Model):
     STATUS_PENDENTE = 'pendente'
     STATUS_EM_TRANSITO = 'em_transito'
     STATUS_ENTREGUE = 'entregue'
@@ -131,6 +227,13 @@ class Entrega(models.Model):
         (STATUS_ENTREGUE, 'Entregue'),
     ]
 
+    # Destinos permitidos a partir de cada status; uma entrega concluída não volta atrás.
+    TRANSICOES_STATUS = {
+        STATUS_PENDENTE: (STATUS_EM_TRANSITO, STATUS_ENTREGUE),
+        STATUS_EM_TRANSITO: (STATUS_PENDENTE, STATUS_ENTREGUE),
+        STATUS_ENTREGUE: (),
+    }
+
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name='entregas', verbose_name="Cliente")
     endereco = models.ForeignKey(Endereco, on_delete=models.CASCADE, verbose_name="Endereço de Entrega")
     entregador = models.ForeignKey(
@@ -158,6 +261,8 @@ class Entrega(models.Model):
     serie_nfce = models.CharField(max_length=10, verbose_name="Série NFCe")
     data_compra = models.DateField(verbose_name="Data da Compra")
     data_hora_entrega = models.DateTimeField(verbose_name="Data/Hora da Entrega")
+    ordem_rota = models.PositiveIntegerField(null=True, blank=True, verbose_name="Ordem na Rota")
+    documento_busca = models.TextField(blank=True, default='', editable=False, verbose_name="Documento de Busca")
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -166,11 +271,30 @@ class Entrega(models.Model):
         verbose_name = "Entrega"
         verbose_name_plural = "Entregas"
         ordering = ['-data_hora_entrega']
+        indexes = [
+            models.Index(fields=['-data_hora_entrega', '-id'], name='entrega_data_hora_id_idx'),
+            models.Index(fields=['cliente', '-data_hora_entrega', '-id'], name='entrega_cliente_data_hora_idx'),
+            models.Index(fields=['status', '-data_hora_entrega', '-id'], name='entrega_status_data_idx'),
+            models.Index(fields=['entregador', '-data_hora_entrega', '-id'], name='entrega_entregador_data_idx'),
+        ]
+
+    campos_rastreados = ('cliente_id', 'entregador_id', 'status', 'data_hora_entrega')
 
     def __str__(self):
         entregador_nome = f" (Entregador: {self.entregador.nome})" if self.entregador else ""
         return f"Entrega {self.id} - {self.cliente.nome} ({self.get_status_display()}) - {self.data_hora_entrega.strftime('%d/%m/%Y %H:%M')}{entregador_nome}"
 
+    def save(self, *args, **kwargs):
+        self.documento_busca = montar_documento(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'documento_busca'}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def status_de_origem(cls, destino):
+        return [origem for origem, destinos in cls.TRANSICOES_STATUS.items() if destino in destinos]
+
     @property
     def endereco_completo_str(self):
         return str(self.endereco)
@@ -183,3 +307,106 @@ class Entrega(models.Model):
         if self.vassoura_rodo: volumes.append("Vassoura/Rodo")
         if self.outros: volumes.append("Outros")
         return volumes
+
+
+class EntregaDiaria(models.Model):
+    """Total de entregas por dia (no TIME_ZONE do projeto), entregador e status."""
+    dia = models.DateField(verbose_name="Dia")
+    entregador = models.ForeignKey(
+        Entregador,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Entregador"
+    )
+    status = models.CharField(max_length=20, choices=Entrega.STATUS_CHOICES, verbose_name="Status da Entrega")
+    total = models.IntegerField(default=0, verbose_name="Total de Entregas")
+
+    class Meta:
+        verbose_name = "Entregas por Dia"
+        verbose_name_plural = "Entregas por Dia"
+        ordering = ['-dia']
+        constraints = [
+            models.UniqueConstraint(fields=['dia', 'entregador', 'status'], name='unique_entrega_diaria'),
+            # NULLs são distintos no índice acima; "sem entregador" precisa da sua própria restrição.
+            models.UniqueConstraint(
+                fields=['dia', 'status'], condition=models.Q(entregador__isnull=True),
+                name='unique_entrega_diaria_sem_entregador'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} - {self.entregador_id} - {self.status}: {self.total}"
+
+
+class TotalEntregasCliente(models.Model):
+    cliente = models.OneToOneField(
+        Cliente,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='+',
+        verbose_name="Cliente"
+    )
+    total = models.IntegerField(default=0, db_index=True, verbose_name="Total de Entregas")
+
+    class Meta:
+        verbose_name = "Total de Entregas do Cliente"
+        verbose_name_plural = "Totais de Entregas dos Clientes"
+
+    def __str__(self):
+        return f"{self.cliente_id}: {self.total}"
+
+
+class Cep(models.Model):
+    ORIGEM_SERVICO = 'servico'
+    ORIGEM_OFFLINE = 'offline'
+
+    ORIGEM_CHOICES = [
+        (ORIGEM_SERVICO, 'Serviço de CEP'),
+        (ORIGEM_OFFLINE, 'Base Offline'),
+    ]
+
+    cep = models.CharField(max_length=8, primary_key=True, verbose_name="CEP (somente dígitos)")
+    logradouro = models.CharField(max_length=200, blank=True, verbose_name="Logradouro")
+    complemento = models.CharField(max_length=200, blank=True, verbose_name="Complemento")
+    bairro = models.CharField(max_length=100, blank=True, verbose_name="Bairro")
+    cidade = models.CharField(max_length=100, blank=True, verbose_name="Cidade")
+    estado = models.CharField(max_length=2, blank=True, verbose_name="Estado")
+    origem = models.CharField(max_length=10, choices=ORIGEM_CHOICES, default=ORIGEM_SERVICO, verbose_name="Origem")
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    class Meta:
+        verbose_name = "CEP"
+        verbose_name_plural = "CEPs"
+
+    def __str__(self):
+        return f"{self.cep[:5]}-{self.cep[5:]} - {self.logradouro}, {self.cidade}/{self.estado}"
+
+    @staticmethod
+    def campos_de_endereco(endereco):
+        return {campo: endereco.get(campo) or '' for campo in ('logradouro', 'complemento', 'bairro', 'cidade', 'estado')}
+
+    def como_endereco(self):
+        return {
+            'cep': f"{self.cep[:5]}-{self.cep[5:]}",
+            'logradouro': self.logradouro,
+            'complemento': self.complemento,
+            'bairro': self.bairro,
+            'cidade': self.cidade,
+            'estado': self.estado,
+        }
+
+
+class CentroideCep(models.Model):
+    """Coordenadas aproximadas de um prefixo de CEP (8, 5 ou 3 dígitos)."""
+    prefixo = models.CharField(max_length=8, primary_key=True, verbose_name="Prefixo do CEP")
+    latitude = models.FloatField(verbose_name="Latitude")
+    longitude = models.FloatField(verbose_name="Longitude")
+
+    class Meta:
+        verbose_name = "Centroide de CEP"
+        verbose_name_plural = "Centroides de CEP"
+
+    def __str__(self):
+        return f"{self.prefixo}: {self.latitude}, {self.longitude}"
@@ -0,0 +1,120 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginação por cursor (keyset) opcional.
+
+    Só é ativada quando a requisição traz `cursor` ou `page_size` (ou sempre,
+    com `opcional = False`); caso contrário a view continua devolvendo a
+    lista completa. A ordenação é
+    sempre decrescente pelos campos de `ordering`, e o último campo deve ser
+    único (normalmente o `id`) para desempatar registros com o mesmo valor.
+    """
+    ordering = ('-data_hora_entrega', '-id')
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 25
+    max_page_size = 100
+    invalid_cursor_message = 'Cursor inválido.'
+    opcional = True
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.opcional and self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+
+        self.request = request
+        self.limite = self.get_page_size(request)
+        campos = [campo.lstrip('-') for campo in self.ordering]
+
+        queryset = queryset.order_by(*self.ordering)
+        cursor = params.get(self.cursor_query_param)
+        if cursor:
+            valores = self.decode_cursor(cursor, queryset.model, campos)
+            queryset = queryset.filter(self.filtro_apos(campos, valores))
+
+        registros = list(queryset[:self.limite + 1])
+        self.tem_proxima = len(registros) > self.limite
+        registros = registros[:self.limite]
+        self.proximo_cursor = None
+        if self.tem_proxima:
+            ultimo = registros[-1]
+            # Registros podem ser instâncias ou dicionários de .values() (ver leitura_rapida.py).
+            if isinstance(ultimo, dict):
+                valores = [ultimo[campo] for campo in campos]
+            else:
+                valores = [getattr(ultimo, campo) for campo in campos]
+            self.proximo_cursor = self.encode_cursor(valores)
+        return registros
+
+    def get_page_size(self, request):
+        try:
+            tamanho = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if tamanho <= 0:
+            return self.page_size
+        return min(tamanho, self.max_page_size)
+
+    @staticmethod
+    def filtro_apos(campos, valores):
+        # (a, b, c) < (va, vb, vc) expandido, já que nem todo banco aceita
+        # comparação de tuplas: a < va OR (a = va AND b < vb) OR ...
+        filtro = Q()
+        for i, campo in enumerate(campos):
+            condicao = Q(**{f'{campo}__lt': valores[i]})
+            for anterior, valor in zip(campos[:i], valores[:i]):
+                condicao &= Q(**{anterior: valor})
+            filtro |= condicao
+        return filtro
+
+    def encode_cursor(self, valores):
+        # isoformat() completo: o DjangoJSONEncoder trunca microssegundos e
+        # o cursor deixaria de apontar exatamente para o último registro.
+        valores = [valor.isoformat() if hasattr(valor, 'isoformat') else valor for valor in valores]
+        bruto = json.dumps(valores, default=str, separators=(',', ':'))
+        return base64.urlsafe_b64encode(bruto.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor, model, campos):
+        try:
+            preenchido = cursor + '=' * (-len(cursor) % 4)
+            valores = json.loads(base64.urlsafe_b64decode(preenchido.encode('ascii')))
+            if not isinstance(valores, list) or len(valores) != len(campos):
+                raise ValueError
+            return [model._meta.get_field(campo).to_python(valor) for campo, valor in zip(campos, valores)]
+        except (TypeError, ValueError, UnicodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.proximo_cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.limite)
+        return replace_query_param(url, self.cursor_query_param, self.proximo_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'next_cursor': self.proximo_cursor,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'next_cursor': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
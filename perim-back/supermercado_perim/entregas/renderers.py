@@ -0,0 +1,58 @@
+import io
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # sem orjson, renderer e parser se comportam como os do DRF
+    orjson = None
+
+# Renderer e parser JSON sobre o orjson, com a mesma saída do JSONRenderer
+# do DRF na configuração padrão (compacto, UTF-8, \u2028/\u2029 escapados).
+# Datas e horas passam pelo encoder do DRF (OPT_PASSTHROUGH_DATETIME), que
+# troca +00:00 por Z e mantém os microssegundos. Indentação, COMPACT_JSON ou
+# UNICODE_JSON desligados e qualquer valor que o orjson recuse (inteiros
+# acima de 64 bits, chaves não-string) caem no json da biblioteca padrão.
+
+SEPARADORES_DE_LINHA = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+class OrjsonRenderer(JSONRenderer):
+    opcoes = orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+    def __init__(self):
+        self._padrao = self.encoder_class().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            data is None or orjson is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self._padrao, option=self.opcoes)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        for separador, escapado in SEPARADORES_DE_LINHA:
+            if separador in ret:
+                ret = ret.replace(separador, escapado)
+        return ret
+
+
+class OrjsonParser(JSONParser):
+    renderer_class = OrjsonRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('_', '-') not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        corpo = stream.read()
+        try:
+            return orjson.loads(corpo)
+        except orjson.JSONDecodeError:
+            # O json da biblioteca padrão aceita o que o orjson recusa (inteiros
+            # grandes) e dá a mesma mensagem de erro de sempre.
+            return super().parse(io.BytesIO(corpo), media_type, parser_context)
@@ -0,0 +1,282 @@
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .agregados import inicio_do_dia
+from . import geo
+from .busca import montar_documento
+from .lote import gravar_campos
+from .models import Entrega, Entregador
+from .signals import notificar_entregas_em_massa
+
+# Planejamento das rotas do dia: as entregas pendentes são divididas entre os
+# entregadores disponíveis e cada rota é ordenada.
+#   1. Coordenadas: latitude/longitude gravadas no endereço ou, na falta
+#      delas, o centroide do CEP (geo.coordenadas).
+#   2. Divisão (sweep): as entregas são ordenadas pelo ângulo em torno do
+#      depósito e cortadas em setores contíguos de carga parecida. A carga de
+#      uma entrega é numero_caixas, mais ROTAS_PESO_FRIOS se tiver
+#      frios/congelados.
+#   3. Ordem: vizinho mais próximo a partir do depósito, com as entregas de
+#      frios/congelados primeiro, melhorada por 2-opt (trecho de frios com fim
+#      livre; o restante volta ao depósito). O 2-opt só testa arestas novas
+#      entre vizinhos próximos (ROTAS_VIZINHOS_2OPT), o que o mantém linear
+#      no tamanho da rota.
+# Distâncias em km pela projeção equirretangular, suficiente na escala de uma
+# cidade. Entregas sem coordenadas vão para o fim das rotas mais leves.
+
+RAIO_TERRA_KM = 6371.0
+
+
+def _peso_frios():
+    return getattr(settings, 'ROTAS_PESO_FRIOS', 2)
+
+
+def _iteracoes_2opt():
+    return getattr(settings, 'ROTAS_ITERACOES_2OPT', 1000)
+
+
+def projetar(latlon, origem):
+    # (lat, lon) em graus -> (x, y) em km, em torno de `origem`.
+    latlon = np.radians(np.asarray(latlon, dtype=float).reshape(-1, 2))
+    lat0, lon0 = np.radians(origem)
+    x = (latlon[:, 1] - lon0) * np.cos(lat0) * RAIO_TERRA_KM
+    y = (latlon[:, 0] - lat0) * RAIO_TERRA_KM
+    return np.column_stack((x, y))
+
+
+def matriz_distancias(pontos):
+    diferencas = pontos[:, None, :] - pontos[None, :, :]
+    return np.hypot(diferencas[..., 0], diferencas[..., 1])
+
+
+def dividir(pontos, pesos, quantidade):
+    """Índices de cada um dos `quantidade` setores de carga parecida (pontos relativos ao depósito)."""
+    if not len(pontos):
+        return [np.empty(0, dtype=int) for _ in range(quantidade)]
+    if pesos.sum() <= 0:
+        pesos = np.ones(len(pontos))
+    angulos = np.arctan2(pontos[:, 1], pontos[:, 0])
+    ordem = np.argsort(angulos, kind='stable')
+    # Começa o giro na maior abertura entre pontos vizinhos, para não partir um bairro ao meio.
+    ordenados = angulos[ordem]
+    aberturas = np.diff(np.append(ordenados, ordenados[0] + 2 * np.pi))
+    ordem = np.roll(ordem, -((int(np.argmax(aberturas)) + 1) % len(ordem)))
+    acumulado = np.cumsum(pesos[ordem]) - pesos[ordem] / 2
+    cortes = np.searchsorted(acumulado, pesos.sum() * np.arange(1, quantidade) / quantidade)
+    return np.split(ordem, cortes)
+
+
+def vizinho_mais_proximo(distancias, inicio, candidatos):
+    caminho = []
+    restantes = np.asarray(candidatos, dtype=int)
+    atual = inicio
+    while len(restantes):
+        proximo = int(np.argmin(distancias[atual, restantes]))
+        atual = int(restantes[proximo])
+        caminho.append(atual)
+        restantes = np.delete(restantes, proximo)
+    return caminho
+
+
+def _vizinhos_2opt():
+    return getattr(settings, 'ROTAS_VIZINHOS_2OPT', 10)
+
+
+def dois_opt(distancias, caminho, iteracoes, vizinhos=None):
+    """
+    Melhora `caminho` (índices em `distancias`) invertendo trechos enquanto
+    houver ganho. As pontas caminho[0] e caminho[-1] ficam fixas.
+
+    Só são testadas as inversões que criam uma aresta entre um ponto e um dos
+    seus `vizinhos` mais próximos: cada iteração custa O(n·k) em vez de O(n²).
+    """
+    caminho = np.asarray(caminho, dtype=int)
+    n = len(caminho)
+    if n < 4:
+        return caminho
+    k = min(_vizinhos_2opt() if vizinhos is None else vizinhos, n - 1)
+    # Daqui em diante os pontos são as posições iniciais em `caminho`.
+    locais = distancias[np.ix_(caminho, caminho)]
+    np.fill_diagonal(locais, np.inf)
+    proximos = np.argpartition(locais, k - 1, axis=1)[:, :k]
+    np.fill_diagonal(locais, 0)
+    ordem = np.arange(n)
+    posicao = np.empty(n, dtype=int)
+    meio = np.arange(1, n - 1)
+    for _ in range(iteracoes):
+        posicao[ordem] = np.arange(n)
+        # Inverter ordem[i:j + 1] troca as arestas (i-1, i) e (j, j+1) por (i-1, j) e (i, j+1).
+        # Nova aresta (i-1, j) com ordem[j] vizinho de ordem[i-1]:
+        antes, primeiro = ordem[meio - 1], ordem[meio]
+        ultimo = proximos[antes]
+        j = posicao[ultimo]
+        depois = ordem[np.minimum(j + 1, n - 1)]
+        ganho_inicio = (
+            locais[antes[:, None], ultimo] + locais[primeiro[:, None], depois]
+            - locais[antes, primeiro][:, None] - locais[ultimo, depois]
+        )
+        ganho_inicio[(j <= meio[:, None]) | (j >= n - 1)] = 0
+        # Nova aresta (i, j+1) com ordem[i] vizinho de ordem[j+1]:
+        ultimo_fim, depois_fim = ordem[meio], ordem[meio + 1]
+        primeiro_fim = proximos[depois_fim]
+        i = posicao[primeiro_fim]
+        antes_fim = ordem[np.maximum(i - 1, 0)]
+        ganho_fim = (
+            locais[antes_fim, ultimo_fim[:, None]] + locais[primeiro_fim, depois_fim[:, None]]
+            - locais[antes_fim, primeiro_fim] - locais[ultimo_fim, depois_fim][:, None]
+        )
+        ganho_fim[(i < 1) | (i >= meio[:, None])] = 0
+
+        melhor_inicio, melhor_fim = int(np.argmin(ganho_inicio)), int(np.argmin(ganho_fim))
+        if ganho_inicio.flat[melhor_inicio] <= ganho_fim.flat[melhor_fim]:
+            if ganho_inicio.flat[melhor_inicio] > -1e-9:
+                break
+            linha = melhor_inicio // k
+            inicio, fim = meio[linha], j.flat[melhor_inicio]
+        else:
+            if ganho_fim.flat[melhor_fim] > -1e-9:
+                break
+            linha = melhor_fim // k
+            inicio, fim = i.flat[melhor_fim], meio[linha]
+        ordem[inicio:fim + 1] = ordem[inicio:fim + 1][::-1]
+    return caminho[ordem]
+
+
+def ordenar(pontos, urgentes, iteracoes=None):
+    """
+    Ordem de visita dos `pontos` (relativos ao depósito, na origem): urgentes
+    primeiro, depois os demais. Devolve os índices em `pontos`.
+    """
+    iteracoes = _iteracoes_2opt() if iteracoes is None else iteracoes
+    quantidade = len(pontos)
+    if not quantidade:
+        return np.empty(0, dtype=int)
+    # Nós extras: depósito (quantidade) e um fim livre (quantidade + 1) a distância zero de todos.
+    distancias = np.zeros((quantidade + 2, quantidade + 2))
+    distancias[:quantidade + 1, :quantidade + 1] = matriz_distancias(np.vstack((pontos, np.zeros((1, 2)))))
+    deposito, livre = quantidade, quantidade + 1
+
+    primeiros = np.flatnonzero(urgentes)
+    demais = np.flatnonzero(~urgentes)
+    trecho_urgente = vizinho_mais_proximo(distancias, deposito, primeiros)
+    trecho_urgente = dois_opt(distancias, [deposito, *trecho_urgente, livre], iteracoes)[1:-1]
+    inicio = int(trecho_urgente[-1]) if len(trecho_urgente) else deposito
+    trecho = vizinho_mais_proximo(distancias, inicio, demais)
+    trecho = dois_opt(distancias, [inicio, *trecho, deposito], iteracoes)[1:-1]
+    return np.concatenate((np.asarray(trecho_urgente, dtype=int), np.asarray(trecho, dtype=int)))
+
+
+def planejar(latlon, pesos, urgentes, quantidade, deposito=None, iteracoes=None):
+    """
+    Divide e ordena as entregas com coordenadas `latlon` entre `quantidade`
+    rotas. Devolve uma lista de arrays de índices, uma por rota, já na ordem
+    de visita.
+    """
+    latlon = np.asarray(latlon, dtype=float).reshape(-1, 2)
+    pesos = np.asarray(pesos, dtype=float)
+    urgentes = np.asarray(urgentes, dtype=bool)
+    if deposito is None:
+        deposito = latlon.mean(axis=0) if len(latlon) else (0.0, 0.0)
+    pontos = projetar(latlon, deposito)
+    rotas = []
+    for setor in dividir(pontos, pesos, quantidade):
+        rotas.append(setor[ordenar(pontos[setor], urgentes[setor], iteracoes)])
+    return rotas
+
+
+def distancia_da_rota(pontos):
+    if not len(pontos):
+        return 0.0
+    caminho = np.vstack((np.zeros((1, 2)), pontos, np.zeros((1, 2))))
+    return float(np.hypot(*np.diff(caminho, axis=0).T).sum())
+
+
+def planejar_rotas(dia, entregador_ids=None, aplicar=True):
+    """
+    Distribui as entregas pendentes de `dia` entre os entregadores
+    (`entregador_ids`, ou todos) e, com `aplicar`, grava entregador e
+    ordem_rota de cada uma numa única escrita em massa.
+    """
+    entregadores = Entregador.objects.order_by('id')
+    if entregador_ids is not None:
+        entregadores = entregadores.filter(id__in=entregador_ids)
+    entregadores = list(entregadores)
+    if not entregadores:
+        return {'rotas': [], 'sem_coordenadas': []}
+
+    inicio = inicio_do_dia(dia)
+    queryset = Entrega.objects.filter(
+        status=Entrega.STATUS_PENDENTE,
+        data_hora_entrega__gte=inicio, data_hora_entrega__lt=inicio_do_dia(dia + timedelta(days=1)),
+    ).select_related('cliente', 'endereco').order_by('id')
+
+    with transaction.atomic():
+        if aplicar:
+            queryset = queryset.select_for_update(of=('self',))
+        entregas = list(queryset)
+        centroides = geo.coordenadas(entrega.endereco.cep for entrega in entregas if entrega.endereco.latitude is None)
+        posicoes = {}
+        for entrega in entregas:
+            endereco = entrega.endereco
+            if endereco.latitude is not None:
+                posicoes[entrega.id] = (endereco.latitude, endereco.longitude)
+            elif endereco.cep in centroides:
+                posicoes[entrega.id] = centroides[endereco.cep]
+        com_coordenadas = [entrega for entrega in entregas if entrega.id in posicoes]
+        sem_coordenadas = [entrega for entrega in entregas if entrega.id not in posicoes]
+
+        pesos = np.array([
+            entrega.numero_caixas + (_peso_frios() if entrega.frios_congelados else 0) for entrega in com_coordenadas
+        ], dtype=float)
+        latlon = [posicoes[entrega.id] for entrega in com_coordenadas]
+        deposito = getattr(settings, 'ROTAS_DEPOSITO', None)
+        if deposito is None and latlon:
+            deposito = tuple(np.mean(latlon, axis=0))
+        indices = planejar(
+            latlon, pesos, [entrega.frios_congelados for entrega in com_coordenadas], len(entregadores), deposito
+        )
+
+        rotas = [[com_coordenadas[i] for i in rota] for rota in indices]
+        cargas = [float(pesos[rota].sum()) for rota in indices]
+        for entrega in sem_coordenadas:
+            mais_leve = cargas.index(min(cargas))
+            rotas[mais_leve].append(entrega)
+            cargas[mais_leve] += entrega.numero_caixas + (_peso_frios() if entrega.frios_congelados else 0)
+
+        pontos = projetar(latlon, deposito) if latlon else np.empty((0, 2))
+        indice_de = {entrega.id: i for i, entrega in enumerate(com_coordenadas)}
+        resultado = []
+        alteradas, alteracoes = [], []
+        agora = timezone.now()
+        for entregador, rota, carga in zip(entregadores, rotas, cargas):
+            for ordem, entrega in enumerate(rota, start=1):
+                anteriores = entrega.valores_atuais()
+                entrega.entregador = entregador
+                entrega.ordem_rota = ordem
+                entrega.documento_busca = montar_documento(entrega)
+                entrega.updated_at = agora
+                alteradas.append(entrega)
+                alteracoes.append((anteriores, {**entrega.valores_atuais(), 'id': entrega.id, 'updated_at': agora}))
+            resultado.append({
+                'entregador': entregador.id,
+                'entregador_nome': entregador.nome,
+                'entregas': [entrega.id for entrega in rota],
+                'caixas': sum(entrega.numero_caixas for entrega in rota),
+                'frios_congelados': sum(entrega.frios_congelados for entrega in rota),
+                'carga': carga,
+                'distancia_km': round(distancia_da_rota(
+                    pontos[[indice_de[entrega.id] for entrega in rota if entrega.id in indice_de]]
+                ), 2),
+            })
+
+        if aplicar and alteradas:
+            gravar_campos(alteradas, ['entregador', 'ordem_rota', 'documento_busca', 'updated_at'])
+            for entrega in alteradas:
+                entrega._originais = entrega.valores_atuais()
+            notificar_entregas_em_massa(alteracoes)
+
+    return {'rotas': resultado, 'sem_coordenadas': [entrega.id for entrega in sem_coordenadas]}
@@ -1,6 +1,54 @@
 from rest_framework import serializers
 from .models import Cliente, Endereco, Entrega, Entregador
 
+
+def campos_solicitados(params, parametro='fields'):
+    # `?fields=id,status,cliente_nome` -> ['id', 'status', 'cliente_nome']; None sem o parâmetro.
+    valor = params.get(parametro)
+    if valor is None:
+        return None
+    return [campo.strip() for campo in valor.split(',') if campo.strip()]
+
+
+class CamposDinamicosMixin:
+    """
+    Aceita `campos=[...]` no construtor e serializa só esses campos (os
+    desconhecidos são ignorados). Sem `campos`, nada muda.
+
+    `expansoes` liga nomes de `?expand=` aos campos aninhados que eles
+    acrescentam; `relacionados` diz de qual relação cada campo depende, para
+    que a view só faça o select_related do que vai ser serializado.
+    """
+    expansoes = {}
+    relacionados = {}
+
+    def __init__(self, *args, campos=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if campos is not None:
+            for nome in set(self.fields) - set(campos):
+                self.fields.pop(nome)
+
+    @classmethod
+    def campos_da_requisicao(cls, params):
+        # `?fields=id,status&expand=entregador` -> ['id', 'status', 'entregador'].
+        # Só com `?expand=`, parte de Meta.fields; sem nenhum dos dois, None.
+        campos = campos_solicitados(params)
+        expandidos = campos_solicitados(params, 'expand')
+        if campos is None:
+            if expandidos is None:
+                return None
+            campos = list(cls.Meta.fields)
+        for nome in expandidos or []:
+            if nome in cls.expansoes and cls.expansoes[nome] not in campos:
+                campos.append(cls.expansoes[nome])
+        return campos
+
+    @classmethod
+    def select_related_para(cls, campos):
+        nomes = cls.Meta.fields if campos is None else campos
+        return sorted({cls.relacionados[nome] for nome in nomes if nome in cls.relacionados})
+
+
 class EntregadorSerializer(serializers.ModelSerializer):
     class Meta:
         model = Entregador
@@ -11,7 +59,8 @@ class EnderecoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Endereco
         fields = ['id', 'cep', 'logradouro', 'numero', 'complemento',
-                  'bairro', 'cidade', 'estado', 'principal', 'cliente']
+                  'bairro', 'cidade', 'estado', 'principal', 'cliente',
+                  'latitude', 'longitude']
         read_only_fields = ['id']
         extra_kwargs = {
             'cliente': {'read_only': True}
@@ -28,7 +77,7 @@ class ClienteSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at', 'enderecos', 'endereco_principal']
 
     def get_endereco_principal(self, obj):
-        endereco = obj.enderecos.filter(principal=True).first()
+        endereco = obj.endereco_principal
         if endereco:
             return EnderecoSerializer(endereco, context=self.context).data
         return None
@@ -49,7 +98,7 @@ class ClienteCreateUpdateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("CPF inválido.")
         return value
 
-class EntregaSerializer(serializers.ModelSerializer):
+class EntregaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     cliente_nome = serializers.CharField(source='cliente.nome', read_only=True)
     endereco_detalhes = EnderecoSerializer(source='endereco', read_only=True)
     volumes_extras_list = serializers.ListField(source='get_volumes_extras_list', read_only=True)
@@ -63,20 +112,22 @@ class EntregaSerializer(serializers.ModelSerializer):
     )
     status_display = serializers.CharField(source='get_status_display', read_only=True)
 
+    expansoes = {'endereco': 'endereco_detalhes', 'entregador': 'entregador'}
+    relacionados = {'cliente_nome': 'cliente', 'endereco_detalhes': 'endereco', 'entregador': 'entregador'}
 
     class Meta:
         model = Entrega
         fields = [
             'id', 'cliente', 'cliente_nome',
             'endereco', 'endereco_detalhes',
-            'entregador', 'entregador_id',
+            'entregador', 'entregador_id', 'ordem_rota',
             'status', 'status_display',
             'numero_caixas', 'bebidas', 'frios_congelados',
             'vassoura_rodo', 'outros', 'volumes_extras_list', 'nome_embalador',
             'numero_nfce', 'serie_nfce', 'data_compra', 'data_hora_entrega',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'cliente_nome', 'endereco_detalhes', 'volumes_extras_list', 'entregador', 'status_display']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'cliente_nome', 'endereco_detalhes', 'volumes_extras_list', 'entregador', 'ordem_rota', 'status_display']
 
 class EntregaCreateUpdateSerializer(serializers.ModelSerializer):
     cliente = serializers.PrimaryKeyRelatedField(queryset=Cliente.objects.all())
@@ -130,3 +181,30 @@ class EntregaCreateUpdateSerializer(serializers.ModelSerializer):
                     {'endereco': 'Este endereço não pertence ao cliente selecionado.'}
                 )
         return data
+
+class EntregaLoteItemSerializer(serializers.ModelSerializer):
+    # Chaves como inteiros: a existência dos registros e o vínculo
+    # endereço/cliente são verificados em lote (ver lote.py).
+    cliente = serializers.IntegerField(min_value=1)
+    endereco = serializers.IntegerField(min_value=1)
+    entregador = serializers.IntegerField(min_value=1, allow_null=True, required=False)
+
+    class Meta:
+        model = Entrega
+        fields = EntregaCreateUpdateSerializer.Meta.fields
+
+class EntregaStatusLoteSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=Entrega.STATUS_CHOICES)
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False, max_length=5000)
+    entregador = serializers.IntegerField(min_value=1, required=False)
+    data = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if 'ids' not in data and not ('entregador' in data and 'data' in data):
+            raise serializers.ValidationError('Informe ids ou entregador e data.')
+        return data
+
+class PlanejarRotasSerializer(serializers.Serializer):
+    data = serializers.DateField()
+    entregadores = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+    aplicar = serializers.BooleanField(default=True)
@@ -0,0 +1,70 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class ServidorCepLocal:
+    """
+    Servidor HTTP que imita o ViaCEP (GET /<cep>/json/), para testes e
+    benchmarks sem acesso à rede. Use como context manager e aponte
+    CEP_SERVICO_URL para `url`.
+    """
+
+    def __init__(self, ceps=None, atraso=0.0):
+        self.ceps = ceps or {}
+        self.atraso = atraso
+        self.requisicoes = 0
+        self._lock = threading.Lock()
+        self._servidor = None
+
+    @property
+    def url(self):
+        host, porta = self._servidor.server_address[:2]
+        return f'http://{host}:{porta}'
+
+    def _criar_handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with servidor._lock:
+                    servidor.requisicoes += 1
+                if servidor.atraso:
+                    time.sleep(servidor.atraso)
+                encontrado = re.fullmatch(r'/(\d{8})/json/?', self.path)
+                if not encontrado:
+                    corpo, codigo = {'erro': 'requisição inválida'}, 400
+                else:
+                    cep = encontrado.group(1)
+                    corpo, codigo = servidor.ceps.get(cep, {'erro': True}), 200
+                    if 'erro' not in corpo:
+                        corpo = {'cep': f'{cep[:5]}-{cep[5:]}', **corpo}
+                dados = json.dumps(corpo).encode('utf-8')
+                try:
+                    self.send_response(codigo)
+                    self.send_header('Content-Type', 'application/json; charset=utf-8')
+                    self.send_header('Content-Length', str(len(dados)))
+                    self.end_headers()
+                    self.wfile.write(dados)
+                except (BrokenPipeError, ConnectionResetError):
+                    # O cliente desistiu (timeout); nada a responder.
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', 0), self._criar_handler())
+        self._servidor.daemon_threads = True
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._servidor.server_close()
@@ -0,0 +1,126 @@
+from collections import Counter
+
+from django.db import connections
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import agregados, busca, eventos, geo
+from .cache_respostas import invalidar
+from .models import Cliente, Endereco, Entrega, Entregador
+
+
+def notificar_entregas_em_massa(alteracoes):
+    # Operações em massa (bulk_create, update) não disparam sinais; elas
+    # chamam esta função com pares (anteriores, atuais) no formato de
+    # Entrega.valores_atuais() (None para criação/remoção). Pares que trazem
+    # também `id` (e `updated_at`) geram eventos para o stream SSE.
+    deltas_dia, deltas_cliente = Counter(), Counter()
+    clientes = set()
+    publicados = []
+    for anteriores, atuais in alteracoes:
+        agregados.acumular_deltas(deltas_dia, deltas_cliente, anteriores, atuais)
+        clientes.update(valores['cliente_id'] for valores in (anteriores, atuais) if valores)
+        valores = atuais or anteriores
+        if 'id' in valores:
+            publicados.append(eventos.evento(anteriores, atuais, valores['id'], valores.get('updated_at')))
+    agregados.aplicar_deltas(deltas_dia, deltas_cliente)
+    invalidar(*(f'cliente:{cliente_id}' for cliente_id in clientes))
+    eventos.publicar(publicados)
+
+
+@receiver(post_save, sender=Entrega)
+def entrega_salva(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    anteriores = None if created else instance.valores_originais()
+    atuais = instance.valores_atuais()
+    if anteriores != atuais:
+        agregados.registrar_alteracao(anteriores, atuais)
+    eventos.publicar([eventos.evento(anteriores, atuais, instance.pk, instance.updated_at)])
+
+
+@receiver(post_delete, sender=Entrega)
+def entrega_removida(sender, instance, **kwargs):
+    anteriores = instance.valores_originais() or instance.valores_atuais()
+    agregados.registrar_alteracao(anteriores=anteriores)
+    eventos.publicar([eventos.evento(anteriores, None, instance.pk)])
+
+
+@receiver(pre_delete, sender=Entregador)
+def entregador_removido(sender, instance, **kwargs):
+    agregados.transferir_para_sem_entregador(instance.pk)
+
+
+@receiver(pre_save, sender=Endereco)
+def geocodificar_endereco(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Um CEP fora de geo.cache_centroides custa uma consulta a CentroideCep,
+    # além dos dois comandos de escrita de Endereco.save.
+    if raw or (update_fields is not None and 'cep' not in update_fields):
+        return
+    originais = instance.valores_originais()
+    if originais is None or originais.get('cep') != instance.cep or instance.latitude is None:
+        geo.preencher([instance])
+
+
+@receiver([post_save, post_delete], sender=Cliente)
+def invalidar_cache_cliente(sender, instance, **kwargs):
+    invalidar('clientes', f'cliente:{instance.pk}')
+
+
+@receiver([post_save, post_delete], sender=Endereco)
+def invalidar_cache_endereco(sender, instance, **kwargs):
+    invalidar('clientes', f'cliente:{instance.cliente_id}')
+
+
+@receiver([post_save, post_delete], sender=Entrega)
+def invalidar_cache_entrega(sender, instance, **kwargs):
+    clientes = {instance.cliente_id}
+    originais = getattr(instance, '_originais', None) or {}
+    if originais.get('cliente_id'):
+        clientes.add(originais['cliente_id'])
+    invalidar(*(f'cliente:{cliente_id}' for cliente_id in clientes))
+
+
+@receiver([post_save, post_delete], sender=Entregador)
+def invalidar_cache_entregador(sender, instance, **kwargs):
+    invalidar('entregadores')
+
+
+def _campos_alterados(instance, created):
+    return not created and instance.valores_originais() != instance.valores_atuais()
+
+
+@receiver(post_save, sender=Cliente)
+def reindexar_busca_cliente(sender, instance, created, raw=False, **kwargs):
+    if not raw and _campos_alterados(instance, created):
+        busca.reindexar(Entrega.objects.filter(cliente_id=instance.pk))
+
+
+@receiver(post_save, sender=Endereco)
+def reindexar_busca_endereco(sender, instance, created, raw=False, **kwargs):
+    if not raw and _campos_alterados(instance, created):
+        busca.reindexar(Entrega.objects.filter(endereco_id=instance.pk))
+
+
+@receiver(post_save, sender=Entregador)
+def reindexar_busca_entregador(sender, instance, created, raw=False, **kwargs):
+    if not raw and _campos_alterados(instance, created):
+        busca.reindexar(Entrega.objects.filter(entregador_id=instance.pk))
+
+
+@receiver(pre_delete, sender=Entregador)
+def limpar_busca_entregador(sender, instance, **kwargs):
+    # O SET_NULL não passa por Entrega.save(); o nome sai do documento aqui.
+    entregas = list(Entrega.objects.filter(entregador_id=instance.pk).select_related('cliente', 'endereco'))
+    for entrega in entregas:
+        entrega.entregador = None
+        entrega.documento_busca = busca.montar_documento(entrega)
+    Entrega.objects.bulk_update(entregas, ['documento_busca'], batch_size=500)
+    eventos.publicar(
+        eventos.Evento(eventos.ALTERADA, entrega.pk, entrega.status, None, entrega.updated_at, entrega.status, instance.pk)
+        for entrega in entregas
+    )
+
+
+def garantir_indice_busca(sender, using, **kwargs):
+    busca.garantir_indice(connections[using])
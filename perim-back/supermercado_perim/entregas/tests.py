@@ -1,10 +1,48 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from unittest import mock, skipUnless
+
+import numpy as np
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.http import HttpResponse
+from django.db import IntegrityError, connection, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F, Q
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.utils import timezone
-from datetime import date
-from .models import Cliente, Entrega
+from datetime import date, datetime, timedelta
+from . import agregados
+from . import cep as cep_service
+from . import checks
+from . import coalescencia
+from . import dados_sinteticos
+from . import eventos
+from . import filters
+from . import geo
+from . import importacao
+from . import leitura_rapida
+from . import lote
+from . import middleware
+from .models import Cep, CentroideCep, Cliente, Endereco, Entrega, EntregaDiaria, Entregador, TotalEntregasCliente
+from .management.commands.benchmark_api import nomes_sem_caso
+from .servidor_cep_local import ServidorCepLocal
 
 class ClienteModelTest(TestCase):
     def setUp(self):
@@ -12,12 +50,6 @@ class ClienteModelTest(TestCase):
             'nome': 'João Silva',
             'cpf': '123.456.789-01',
             'telefone': '(11) 99999-9999',
-            'cep': '01234-567',
-            'logradouro': 'Rua das Flores',
-            'numero': '123',
-            'bairro': 'Centro',
-            'cidade': 'São Paulo',
-            'estado': 'SP'
         }
     
     def test_criar_cliente(self):
@@ -42,7 +74,10 @@ class EntregaModelTest(TestCase):
         self.cliente = Cliente.objects.create(
             nome='Maria Santos',
             cpf='111.444.777-35',
-            telefone='(11) 88888-8888',
+            telefone='(11) 88888-8888'
+        )
+        self.endereco = Endereco.objects.create(
+            cliente=self.cliente,
             cep='01234-567',
             logradouro='Av. Principal',
             numero='456',
@@ -53,12 +88,7 @@ class EntregaModelTest(TestCase):
         
         self.entrega_data = {
             'cliente': self.cliente,
-            'endereco_cep': '01234-567',
-            'endereco_logradouro': 'Av. Principal',
-            'endereco_numero': '456',
-            'endereco_bairro': 'Vila Nova',
-            'endereco_cidade': 'São Paulo',
-            'endereco_estado': 'SP',
+            'endereco': self.endereco,
             'numero_caixas': 3,
             'bebidas': True,
             'frios_congelados': False,
@@ -80,13 +110,13 @@ class EntregaModelTest(TestCase):
     
     def test_endereco_completo(self):
         entrega = Entrega.objects.create(**self.entrega_data)
-        endereco_esperado = "Av. Principal, 456, Vila Nova, São Paulo/SP, 01234-567"
-        self.assertEqual(entrega.endereco_completo, endereco_esperado)
+        endereco_esperado = "Av. Principal, 456, Vila Nova, São Paulo/SP (CEP: 01234-567)"
+        self.assertEqual(entrega.endereco_completo_str, endereco_esperado)
     
     def test_volumes_extras_list(self):
         entrega = Entrega.objects.create(**self.entrega_data)
         volumes_esperados = ['Bebidas', 'Outros']
-        self.assertEqual(entrega.volumes_extras_list, volumes_esperados)
+        self.assertEqual(entrega.get_volumes_extras_list, volumes_esperados)
 
 class ClienteAPITest(APITestCase):
     def setUp(self):
@@ -115,13 +145,7 @@ class ClienteAPITest(APITestCase):
         Cliente.objects.create(
             nome='Teste Cliente',
             cpf='111.444.777-35',
-            telefone='(11) 99999-9999',
-            cep='01234-567',
-            logradouro='Rua Teste',
-            numero='123',
-            bairro='Teste',
-            cidade='São Paulo',
-            estado='SP'
+            telefone='(11) 99999-9999'
         )
         
         url = reverse('entregas:cliente-list-create')
@@ -134,7 +158,10 @@ class EntregaAPITest(APITestCase):
         self.cliente = Cliente.objects.create(
             nome='Pedro Lima',
             cpf='111.444.777-35',
-            telefone='(11) 66666-6666',
+            telefone='(11) 66666-6666'
+        )
+        self.endereco = Endereco.objects.create(
+            cliente=self.cliente,
             cep='01234-567',
             logradouro='Rua Lima',
             numero='321',
@@ -145,26 +172,17 @@ class EntregaAPITest(APITestCase):
         
         self.entrega_data = {
             'cliente': self.cliente.id,
-            'endereco': {
-                'cep': '01234-567',
-                'logradouro': 'Rua Lima',
-                'numero': '321',
-                'bairro': 'Alto',
-                'cidade': 'São Paulo',
-                'estado': 'SP'
-            },
-            'numeroCaixas': 2,
-            'volumesExtras': {
-                'bebidas': True,
-                'friosCongelados': False,
-                'vassouraRodo': True,
-                'outros': False
-            },
-            'nomeEmbalador': 'Roberto',
-            'numeroNFCe': '54321',
-            'serieNFCe': '2',
-            'dataCompra': '2024-01-15',
-            'dataHoraEntrega': timezone.now().isoformat()
+            'endereco': self.endereco.id,
+            'numero_caixas': 2,
+            'bebidas': True,
+            'frios_congelados': False,
+            'vassoura_rodo': True,
+            'outros': False,
+            'nome_embalador': 'Roberto',
+            'numero_nfce': '54321',
+            'serie_nfce': '2',
+            'data_compra': '2024-01-15',
+            'data_hora_entrega': timezone.now().isoformat()
         }
     
     def test_criar_entrega_api(self):
@@ -182,12 +200,7 @@ class EntregaAPITest(APITestCase):
     def test_listar_entregas_api(self):
         Entrega.objects.create(
             cliente=self.cliente,
-            endereco_cep='01234-567',
-            endereco_logradouro='Rua Lima',
-            endereco_numero='321',
-            endereco_bairro='Alto',
-            endereco_cidade='São Paulo',
-            endereco_estado='SP',
+            endereco=self.endereco,
             numero_caixas=1,
             nome_embalador='Teste',
             numero_nfce='11111',
@@ -199,4 +212,1809 @@ class EntregaAPITest(APITestCase):
         url = reverse('entregas:entrega-list-create')
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
\ No newline at end of file
+        self.assertEqual(len(response.data), 1)
+
+class EntregaPaginacaoAPITest(APITestCase):
+    def setUp(self):
+        self.cliente = Cliente.objects.create(
+            nome='Pedro Lima',
+            cpf='111.444.777-35',
+            telefone='(11) 66666-6666'
+        )
+        self.endereco = Endereco.objects.create(
+            cliente=self.cliente,
+            cep='01234-567',
+            logradouro='Rua Lima',
+            numero='321',
+            bairro='Alto',
+            cidade='São Paulo',
+            estado='SP'
+        )
+        self.entregador = Entregador.objects.create(nome='Carlos')
+        self.mesmo_horario = timezone.now()
+        for i in range(7):
+            Entrega.objects.create(
+                cliente=self.cliente,
+                endereco=self.endereco,
+                entregador=self.entregador if i % 2 else None,
+                numero_caixas=1,
+                nome_embalador='Teste',
+                numero_nfce=str(1000 + i),
+                serie_nfce='1',
+                data_compra=date.today(),
+                # Vários registros no mesmo instante para exercitar o desempate por id.
+                data_hora_entrega=self.mesmo_horario - timedelta(hours=i // 3)
+            )
+        self.url = reverse('entregas:entrega-list-create')
+
+    def test_sem_parametros_retorna_lista_completa(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 7)
+
+    def test_percorre_todas_as_paginas_sem_repetir(self):
+        ids = []
+        response = self.client.get(self.url, {'page_size': 3})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids.extend(item['id'] for item in response.data['results'])
+            if not response.data['next_cursor']:
+                break
+            response = self.client.get(self.url, {'page_size': 3, 'cursor': response.data['next_cursor']})
+
+        esperado = list(
+            Entrega.objects.order_by('-data_hora_entrega', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, esperado)
+
+    def test_paginacao_respeita_filtros(self):
+        response = self.client.get(self.url, {'page_size': 2, 'entregador': self.entregador.id})
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get(self.url, {
+            'page_size': 2, 'entregador': self.entregador.id, 'cursor': response.data['next_cursor']
+        })
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next'])
+
+    def test_page_size_limitado(self):
+        response = self.client.get(self.url, {'page_size': 10000})
+        self.assertEqual(len(response.data['results']), 7)
+        self.assertIsNone(response.data['next_cursor'])
+
+    def test_cursor_invalido(self):
+        response = self.client.get(self.url, {'cursor': 'nao-e-um-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class EntregaCamposAPITest(APITestCase):
+    def setUp(self):
+        cliente = Cliente.objects.create(nome='Ana Costa', cpf='111.444.777-35', telefone='(11) 77777-7777')
+        endereco = Endereco.objects.create(
+            cliente=cliente, cep='01234-567', logradouro='Rua Nova', numero='789',
+            bairro='Jardim', cidade='São Paulo', estado='SP'
+        )
+        self.entrega = Entrega.objects.create(
+            cliente=cliente, endereco=endereco, entregador=Entregador.objects.create(nome='Carlos'),
+            numero_caixas=2, nome_embalador='Roberto', numero_nfce='1', serie_nfce='1',
+            data_compra=date.today(), data_hora_entrega=timezone.now()
+        )
+        self.url = reverse('entregas:entrega-list-create')
+
+    def _listar(self, params):
+        with CaptureQueriesContext(connection) as contexto:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data, [consulta['sql'] for consulta in contexto.captured_queries]
+
+    def test_campos_sem_relacoes_nao_fazem_join(self):
+        dados, consultas = self._listar({'fields': 'id,status,numero_caixas'})
+        self.assertEqual(dados, [{'id': self.entrega.id, 'status': 'pendente', 'numero_caixas': 2}])
+        self.assertEqual(len(consultas), 1)
+        self.assertNotIn('JOIN', consultas[0])
+
+    def test_expand_inclui_e_junta_so_o_pedido(self):
+        dados, consultas = self._listar({'fields': 'id,cliente_nome', 'expand': 'entregador'})
+        self.assertEqual(set(dados[0]), {'id', 'cliente_nome', 'entregador'})
+        self.assertEqual(dados[0]['entregador']['nome'], 'Carlos')
+        self.assertIn('entregas_entregador', consultas[0])
+        self.assertNotIn('entregas_endereco', consultas[0])
+
+    def test_expand_sem_fields_parte_de_todos_os_campos(self):
+        completo, _ = self._listar({})
+        dados, consultas = self._listar({'expand': 'entregador'})
+        self.assertEqual(dados, completo)
+        self.assertEqual(dados[0]['entregador']['nome'], 'Carlos')
+        self.assertEqual(len(consultas), 1)
+
+    def test_sem_parametros_a_resposta_e_completa(self):
+        dados, consultas = self._listar({})
+        self.assertIn('endereco_detalhes', dados[0])
+        self.assertEqual(len(consultas), 1)
+        detalhe = self.client.get(reverse('entregas:entrega-detail', args=[self.entrega.id]), {'fields': 'status'})
+        self.assertEqual(detalhe.data, {'status': 'pendente'})
+
+
+class LeituraRapidaCompatibilidadeTest(APITestCase):
+    # A leitura rápida (LEITURA_RAPIDA) precisa produzir exatamente os mesmos
+    # bytes que os serializers do DRF.
+    def setUp(self):
+        self.ana = Cliente.objects.create(nome='Ana Costa', cpf='111.444.777-35', telefone='(11) 77777-7777')
+        self.bruno = Cliente.objects.create(nome='Bruno Dias', cpf='529.982.247-25', telefone='(11) 55555-5555')
+        Cliente.objects.create(nome='Célia Sem Endereço', cpf='390.533.447-05', telefone='(11) 44444-4444')
+        enderecos = [
+            Endereco.objects.create(
+                cliente=self.ana, cep='01234-567', logradouro='Rua Nova', numero='789',
+                complemento='Apto 1', bairro='Jardim', cidade='São Paulo', estado='SP'
+            ),
+            Endereco.objects.create(
+                cliente=self.ana, cep='01234-568', logradouro='Avenida Brasil', numero='10',
+                bairro='Centro', cidade='São Paulo', estado='SP', principal=True
+            ),
+            Endereco.objects.create(
+                cliente=self.bruno, cep='20040-020', logradouro='Rua do Ouvidor', numero='5',
+                bairro='Centro', cidade='Rio de Janeiro', estado='RJ'
+            ),
+        ]
+        carlos = Entregador.objects.create(nome='Carlos')
+        agora = timezone.now().replace(microsecond=123456)
+        variacoes = [
+            {'entregador': carlos, 'bebidas': True, 'outros': True},
+            {'entregador': None, 'status': Entrega.STATUS_EM_TRANSITO, 'frios_congelados': True},
+            {'entregador': carlos, 'status': Entrega.STATUS_ENTREGUE, 'vassoura_rodo': True},
+        ]
+        for i in range(9):
+            endereco = enderecos[i % 3]
+            Entrega.objects.create(
+                cliente=endereco.cliente, endereco=endereco, numero_caixas=i + 1, nome_embalador='Roberto',
+                numero_nfce=str(1000 + i), serie_nfce='1', data_compra=date(2025, 1, 1) + timedelta(days=i),
+                data_hora_entrega=(agora - timedelta(hours=7 * i)).replace(microsecond=0 if i % 2 else 123456),
+                **variacoes[i % 3]
+            )
+
+    def _comparar(self, url, params=None):
+        respostas = []
+        for rapida in (False, True):
+            caches['respostas'].clear()
+            with self.settings(LEITURA_RAPIDA=rapida):
+                response = self.client.get(url, params or {})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            respostas.append(response.content)
+        self.assertEqual(respostas[1], respostas[0])
+        return json.loads(respostas[1])
+
+    def test_lista_de_entregas(self):
+        url = reverse('entregas:entrega-list-create')
+        self.assertEqual(len(self._comparar(url)), 9)
+        for params in (
+            {'fields': 'id,status,status_display,entregador,volumes_extras_list'},
+            {'fields': 'id,cliente_nome,inexistente', 'expand': 'endereco'},
+            {'search': 'ana'},
+            {'status': Entrega.STATUS_ENTREGUE},
+        ):
+            self._comparar(url, params)
+        with self.settings(TIME_ZONE='UTC'):
+            self._comparar(url)
+
+    def test_paginas_de_entregas(self):
+        url = reverse('entregas:entrega-list-create')
+        params = {'page_size': 4, 'fields': 'id,numero_nfce'}
+        pagina = self._comparar(url, params)
+        while pagina['next_cursor']:
+            params['cursor'] = pagina['next_cursor']
+            pagina = self._comparar(url, params)
+
+    def test_listas_de_clientes_e_enderecos(self):
+        clientes = self._comparar(reverse('entregas:cliente-list-create'))
+        self.assertEqual(clientes[0]['endereco_principal']['logradouro'], 'Avenida Brasil')
+        self.assertIsNone(clientes[2]['endereco_principal'])
+        self._comparar(reverse('entregas:cliente-list-create'), {'search': 'Bruno'})
+        self._comparar(reverse('entregas:endereco-list-create', args=[self.ana.id]))
+
+    def test_cache_de_funcoes_limitado_aos_campos_conhecidos(self):
+        leitor = leitura_rapida.Leitor(leitura_rapida.leitor_entregas.campos)
+        for i in range(50):
+            leitor.compilar([f'lixo{i}', 'status', 'id'])
+            leitor.compilar(['id', 'status', f'outro{i}'])
+        self.assertEqual(list(leitor._compilados), [('id', 'status')])
+        self.assertIs(leitor.compilar(None), leitor.compilar(list(reversed(leitor.campos))))
+
+
+class OrjsonRendererTest(APITestCase):
+    def test_mesma_saida_do_json_renderer(self):
+        from decimal import Decimal
+        from zoneinfo import ZoneInfo
+        from rest_framework.renderers import JSONRenderer
+        from .renderers import OrjsonRenderer
+
+        agora = timezone.now().replace(microsecond=654321)
+        dados = {
+            'utc': agora,
+            'sem_microssegundos': agora.replace(microsecond=0),
+            'sao_paulo': agora.astimezone(ZoneInfo('America/Sao_Paulo')),
+            'ingenua': datetime(2025, 1, 2, 3, 4, 5),
+            'dia': date(2025, 1, 2),
+            'decimal': Decimal('10.50'),
+            'texto': 'Praça da Sé \u2028 linha \u2029 "aspas"',
+            'lista': [1, 2.5, None, True, ('a', 'b')],
+        }
+        self.assertEqual(OrjsonRenderer().render(dados), JSONRenderer().render(dados))
+        # Inteiros acima de 64 bits caem no json da biblioteca padrão.
+        self.assertEqual(OrjsonRenderer().render({'grande': 2 ** 70}), b'{"grande":1180591620717411303424}')
+        self.assertEqual(
+            OrjsonRenderer().render(dados, 'application/json; indent=2'),
+            JSONRenderer().render(dados, 'application/json; indent=2')
+        )
+
+    def test_lista_de_entregas_e_parser(self):
+        cliente = Cliente.objects.create(nome='Ana Costa', cpf='111.444.777-35', telefone='(11) 77777-7777')
+        endereco = Endereco.objects.create(
+            cliente=cliente, cep='01234-567', logradouro='Rua Nova', numero='789',
+            bairro='Jardim', cidade='São Paulo', estado='SP'
+        )
+        response = self.client.post(reverse('entregas:entrega-list-create'), data=json.dumps({
+            'cliente': cliente.id, 'endereco': endereco.id, 'numero_caixas': 2, 'nome_embalador': 'José',
+            'numero_nfce': '1', 'serie_nfce': '1', 'data_compra': '2025-01-02',
+            'data_hora_entrega': '2025-01-02T10:00:00.123456-03:00'
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        from rest_framework.renderers import JSONRenderer
+        response = self.client.get(reverse('entregas:entrega-list-create'))
+        self.assertEqual(response.content, JSONRenderer().render(response.data))
+        self.assertEqual(response.data[0]['data_hora_entrega'], '2025-01-02T10:00:00.123456-03:00')
+
+        response = self.client.post(
+            reverse('entregas:entrega-list-create'), data='{"cliente": ', content_type='application/json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(response.data['detail'].startswith('JSON parse error'))
+
+
+class EntregaExportacaoTest(APITestCase):
+    def setUp(self):
+        self.cliente = Cliente.objects.create(nome='Ana Costa', cpf='111.444.777-35', telefone='(11) 77777-7777')
+        self.endereco = Endereco.objects.create(
+            cliente=self.cliente, cep='01234-567', logradouro='Rua Nova', numero='789',
+            bairro='Jardim', cidade='São Paulo', estado='SP'
+        )
+        for i, status_entrega in enumerate([Entrega.STATUS_PENDENTE, Entrega.STATUS_ENTREGUE, Entrega.STATUS_ENTREGUE]):
+            Entrega.objects.create(
+                cliente=self.cliente, endereco=self.endereco, status=status_entrega,
+                numero_caixas=i + 1, nome_embalador='Roberto', numero_nfce=str(500 + i), serie_nfce='1',
+                data_compra=date(2025, 5, 1), data_hora_entrega=timezone.now() - timedelta(minutes=i)
+            )
+        self.url = reverse('entregas:entrega-exportar')
+
+    def _conteudo(self, response):
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_exportar_ndjson(self):
+        response = self.client.get(self.url, {'status': Entrega.STATUS_ENTREGUE})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        linhas = [json.loads(linha) for linha in self._conteudo(response).splitlines()]
+        self.assertEqual([linha['numero_nfce'] for linha in linhas], ['501', '502'])
+        self.assertEqual(linhas[0]['cliente_nome'], 'Ana Costa')
+        self.assertEqual(linhas[0]['endereco_cidade'], 'São Paulo')
+        self.assertIsNone(linhas[0]['entregador_nome'])
+
+    def test_exportar_csv(self):
+        response = self.client.get(self.url, {'formato': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        linhas = list(csv.reader(io.StringIO(self._conteudo(response))))
+        self.assertEqual(linhas[0][:3], ['id', 'cliente_id', 'cliente_nome'])
+        self.assertEqual(len(linhas), 4)
+
+    def test_formato_invalido(self):
+        response = self.client.get(self.url, {'formato': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CompressaoTest(APITestCase):
+    def setUp(self):
+        cliente = Cliente.objects.create(nome='Ana Costa', cpf='111.444.777-35', telefone='(11) 77777-7777')
+        endereco = Endereco.objects.create(
+            cliente=cliente, cep='01234-567', logradouro='Rua Nova', numero='789',
+            bairro='Jardim', cidade='São Paulo', estado='SP'
+        )
+        for i in range(30):
+            Entrega.objects.create(
+                cliente=cliente, endereco=endereco, numero_caixas=i + 1, nome_embalador='Roberto',
+                numero_nfce=str(500 + i), serie_nfce='1', data_compra=date(2025, 5, 1),
+                data_hora_entrega=timezone.now() - timedelta(minutes=i)
+            )
+        self.url = reverse('entregas:entrega-list-create')
+
+    def test_resposta_grande_comprimida(self):
+        sem_compressao = self.client.get(self.url)
+        self.assertNotIn('Content-Encoding', sem_compressao)
+        self.assertIn('Accept-Encoding', sem_compressao['Vary'])
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertEqual(gzip.decompress(response.content), sem_compressao.content)
+
+    @skipUnless(middleware.brotli, 'brotli não instalado')
+    def test_brotli_preferido(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(len(json.loads(middleware.brotli.decompress(response.content))), 30)
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip;q=0.5, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+    def test_limite_e_tipos(self):
+        response = self.client.get(self.url, {'page_size': 1}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response)
+
+        compressao = middleware.CompressaoMiddleware(lambda request: None)
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+        imagem = compressao.process_response(request, HttpResponse(b'\0' * 4096, content_type='image/png'))
+        self.assertNotIn('Content-Encoding', imagem)
+        texto = compressao.process_response(request, HttpResponse(b'a' * 4096, content_type='text/plain'))
+        self.assertEqual(texto['Content-Encoding'], 'gzip')
+
+    def test_exportacao_em_streaming(self):
+        url = reverse('entregas:entrega-exportar')
+        esperado = b''.join(self.client.get(url, {'formato': 'csv'}).streaming_content)
+        response = self.client.get(url, {'formato': 'csv'}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', response)
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), esperado)
+
+    def test_index_precomprimido(self):
+        # Um build do Vite em miniatura: index.html e um bundle em assets/.
+        with tempfile.TemporaryDirectory() as diretorio:
+            with open(os.path.join(diretorio, 'index.html'), 'w', encoding='utf-8') as arquivo:
+                arquivo.write('<!doctype html><title>Perim</title>' + '<div>entregas</div>' * 200)
+            os.mkdir(os.path.join(diretorio, 'assets'))
+            with open(os.path.join(diretorio, 'assets', 'index.js'), 'w', encoding='utf-8') as arquivo:
+                arquivo.write('console.log("entregas");' * 200)
+            templates = [{'BACKEND': 'django.template.backends.django.DjangoTemplates', 'DIRS': [diretorio]}]
+            with self.settings(TEMPLATES=templates, FRONTEND_BUILD_DIR=diretorio):
+                renderizado = self.client.get(reverse('entregas:index'))
+                self.assertNotIn('Content-Encoding', renderizado)
+                call_command('precomprimir_frontend', stdout=io.StringIO())
+                self.assertTrue(os.path.exists(os.path.join(diretorio, 'index.html.gz')))
+                with open(os.path.join(diretorio, 'assets', 'index.js.gz'), 'rb') as arquivo:
+                    self.assertEqual(gzip.decompress(arquivo.read()), b'console.log("entregas");' * 200)
+
+                response = self.client.get(reverse('entregas:index'), HTTP_ACCEPT_ENCODING='gzip')
+                self.assertEqual(response['Content-Encoding'], 'gzip')
+                self.assertEqual(gzip.decompress(response.content), renderizado.content)
+                self.assertNotIn('Content-Encoding', self.client.get(reverse('entregas:index')))
+
+
+class AgregadosEntregaTest(APITestCase):
+    def setUp(self):
+        self.cliente = Cliente.objects.create(nome='Ana Costa', cpf='111.444.777-35', telefone='(11) 77777-7777')
+        self.outro_cliente = Cliente.objects.create(nome='Bruno Dias', cpf='529.982.247-25', telefone='(11) 55555-5555')
+        self.endereco = Endereco.objects.create(
+            cliente=self.cliente, cep='01234-567', logradouro='Rua Nova', numero='789',
+            bairro='Jardim', cidade='São Paulo', estado='SP'
+        )
+        self.outro_endereco = Endereco.objects.create(
+            cliente=self.outro_cliente, cep='01234-000', logradouro='Rua Velha', numero='1',
+            bairro='Centro', cidade='São Paulo', estado='SP'
+        )
+        self.carlos = Entregador.objects.create(nome='Carlos')
+        self.joana = Entregador.objects.create(nome='Joana')
+
+    def _criar_entrega(self, cliente, endereco, entregador=None, quando=None, **extra):
+        return Entrega.objects.create(
+            cliente=cliente, endereco=endereco, entregador=entregador,
+            numero_caixas=1, nome_embalador='Roberto', numero_nfce='1', serie_nfce='1',
+            data_compra=date.today(), data_hora_entrega=quando or timezone.now(), **extra
+        )
+
+    def _snapshot(self):
+        diarias = sorted(
+            (linha['dia'], linha['entregador_id'], linha['status'], linha['total'])
+            for linha in EntregaDiaria.objects.filter(total__gt=0).values('dia', 'entregador_id', 'status', 'total')
+        )
+        clientes = sorted(TotalEntregasCliente.objects.filter(total__gt=0).values_list('cliente_id', 'total'))
+        return diarias, clientes
+
+    def test_sinais_mantem_agregados_iguais_a_reconstrucao(self):
+        entrega = self._criar_entrega(self.cliente, self.endereco, self.carlos)
+        self._criar_entrega(self.cliente, self.endereco, self.joana, quando=timezone.now() - timedelta(days=40))
+        removida = self._criar_entrega(self.outro_cliente, self.outro_endereco)
+
+        entrega.status = Entrega.STATUS_ENTREGUE
+        entrega.entregador = self.joana
+        entrega.save()
+        recarregada = Entrega.objects.get(pk=entrega.pk)
+        recarregada.data_hora_entrega = timezone.now() - timedelta(days=2)
+        recarregada.save()
+        removida.delete()
+        self.carlos.delete()
+
+        incremental = self._snapshot()
+        agregados.reconstruir()
+        self.assertEqual(incremental, self._snapshot())
+
+    def test_estatisticas_usa_agregados(self):
+        self._criar_entrega(self.cliente, self.endereco, self.carlos)
+        self._criar_entrega(self.cliente, self.endereco, self.carlos, status=Entrega.STATUS_ENTREGUE)
+        self._criar_entrega(self.outro_cliente, self.outro_endereco, self.joana)
+
+        response = self.client.get(reverse('entregas:estatisticas'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_entregas'], 3)
+        self.assertEqual(response.data['top_clientes_com_mais_entregas'][0], {
+            'id': self.cliente.id, 'nome': 'Ana Costa', 'total_entregas': 2
+        })
+        self.assertEqual(response.data['entregador_do_dia']['id'], self.carlos.id)
+        self.assertEqual(response.data['entregador_do_dia']['total_entregas_hoje'], 2)
+        self.assertEqual(response.data['distribuicao_status_entregas'], [
+            {'status': 'entregue', 'total': 1}, {'status': 'pendente', 'total': 2}
+        ])
+        self.assertEqual(sum(mes['total'] for mes in response.data['entregas_por_mes']), 3)
+
+    def test_comando_reconstruir_agregados(self):
+        self._criar_entrega(self.cliente, self.endereco, self.carlos)
+        EntregaDiaria.objects.all().delete()
+        call_command('reconstruir_agregados', stdout=io.StringIO())
+        self.assertEqual(agregados.total_entregas(), 1)
+
+    def test_janela_configuravel_de_entregas_por_mes(self):
+        self._criar_entrega(self.cliente, self.endereco, quando=timezone.now() - timedelta(days=100))
+        self._criar_entrega(self.cliente, self.endereco)
+        url = reverse('entregas:estatisticas')
+
+        response = self.client.get(url, {'dias': 30})
+        self.assertEqual(sum(mes['total'] for mes in response.data['entregas_por_mes']), 1)
+        with self.settings(ESTATISTICAS_JANELA_DIAS=365):
+            response = self.client.get(url)
+        self.assertEqual(sum(mes['total'] for mes in response.data['entregas_por_mes']), 2)
+        self.assertEqual(self.client.get(url, {'dias': 'abc'}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_concorrencia_sem_entregador_nao_duplica_linha(self):
+        hoje = timezone.localdate()
+        EntregaDiaria.objects.create(dia=hoje, entregador=None, status='pendente', total=1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            EntregaDiaria.objects.create(dia=hoje, entregador=None, status='pendente', total=1)
+
+        # Outra requisição criou a linha entre o UPDATE (que não achou nada) e o INSERT.
+        queryset = EntregaDiaria.objects.filter(dia=hoje, entregador_id=None, status='pendente')
+        atualizar = queryset.update
+        chamadas = []
+
+        def update(**campos):
+            chamadas.append(campos)
+            return 0 if len(chamadas) == 1 else atualizar(**campos)
+
+        queryset.update = update
+        agregados._somar(queryset, 2, dia=hoje, entregador_id=None, status='pendente')
+        self.assertEqual(len(chamadas), 2)
+        self.assertEqual(list(EntregaDiaria.objects.filter(entregador=None).values_list('total', flat=True)), [3])
+
+    def test_status_fora_das_opcoes_entra_na_contagem(self):
+        entrega = self._criar_entrega(self.cliente, self.endereco)
+        entrega.status = 'Cancelada'
+        entrega.save()
+        self.assertEqual(agregados.distribuicao_status(), [{'status': 'Cancelada', 'total': 1}])
+        agregados.reconstruir()
+        self.assertEqual(agregados.distribuicao_status(), [{'status': 'Cancelada', 'total': 1}])
+
+    def test_reconstrucao_parcial_preserva_dias_antigos(self):
+        self._criar_entrega(self.cliente, self.endereco, quando=timezone.now() - timedelta(days=100))
+        self._criar_entrega(self.cliente, self.endereco)
+        EntregaDiaria.objects.filter(dia=timezone.localdate()).delete()
+        agregados.reconstruir(desde=timezone.localdate() - timedelta(days=7))
+        self.assertEqual(agregados.total_entregas(), 2)
+
+    def test_benchmark_exige_indice_nas_consultas_por_dia(self):
+        for dias in range(0, 400, 20):
+            self._criar_entrega(self.cliente, self.endereco, self.carlos, quando=timezone.now() - timedelta(days=dias))
+        saida = io.StringIO()
+        call_command('benchmark_estatisticas', '--repeticoes', '1', stdout=saida)
+        self.assertIn('/api/estatisticas/', saida.getvalue())
+        with mock.patch('entregas.management.commands.benchmark_estatisticas.usa_indice', return_value=False):
+            with self.assertRaises(CommandError):
+                call_command('benchmark_estatisticas', '--repeticoes', '1', stdout=io.StringIO())
+
+    @skipUnless(connection.vendor == 'sqlite', 'Plano de execução específico do SQLite.')
+    def test_usa_indice_exige_busca_pela_coluna(self):
+        from .management.commands.benchmark_estatisticas import usa_indice
+
+        self.assertTrue(usa_indice('SEARCH entregas_entregadiaria USING INDEX i (dia>?)', 'entregas_entregadiaria', 'dia'))
+        self.assertFalse(usa_indice(
+            'SCAN entregas_entregadiaria USING COVERING INDEX i', 'entregas_entregadiaria', 'dia'
+        ))
+        self.assertFalse(usa_indice(
+            'SEARCH entregas_entregadiaria USING INDEX i (entregador_id=?)', 'entregas_entregadiaria', 'dia'
+        ))
+
+class CacheRespostasTest(APITestCase):
+    def setUp(self):
+        caches['respostas'].clear()
+        self.cliente = Cliente.objects.create(nome='Ana Costa', cpf='111.444.777-35', telefone='(11) 77777-7777')
+        self.endereco = Endereco.objects.create(
+            cliente=self.cliente, cep='01234-567', logradouro='Rua Nova', numero='789',
+            bairro='Jardim', cidade='São Paulo', estado='SP'
+        )
+        self.entregador = Entregador.objects.create(nome='Carlos')
+        self.url_clientes = reverse('entregas:cliente-list-create')
+        self.url_cliente_entregas = reverse('entregas:cliente-entregas-custom-list', args=[self.cliente.id])
+
+    def test_segunda_leitura_nao_consulta_o_banco(self):
+        primeira = self.client.get(self.url_clientes)
+        with self.assertNumQueries(0):
+            segunda = self.client.get(self.url_clientes)
+        self.assertEqual(primeira.data, segunda.data)
+
+    def test_parametros_fazem_parte_da_chave(self):
+        Cliente.objects.create(nome='Bruno Dias', cpf='529.982.247-25', telefone='(11) 55555-5555')
+        self.assertEqual(len(self.client.get(self.url_clientes).data), 2)
+        self.assertEqual(len(self.client.get(self.url_clientes, {'nome': 'Bruno'}).data), 1)
+
+    def test_sinais_invalidam_recursos_afetados(self):
+        self.client.get(self.url_clientes)
+        self.client.get(self.url_cliente_entregas)
+
+        Entrega.objects.create(
+            cliente=self.cliente, endereco=self.endereco, numero_caixas=1, nome_embalador='Roberto',
+            numero_nfce='1', serie_nfce='1', data_compra=date.today(), data_hora_entrega=timezone.now()
+        )
+        # A lista de clientes não depende de entregas e continua em cache.
+        with self.assertNumQueries(0):
+            self.client.get(self.url_clientes)
+        self.assertEqual(len(self.client.get(self.url_cliente_entregas).data['entregas_do_cliente']), 1)
+
+        self.endereco.numero = '790'
+        self.endereco.save()
+        response = self.client.get(self.url_clientes)
+        self.assertEqual(response.data[0]['enderecos'][0]['numero'], '790')
+
+        self.client.get(reverse('entregas:entregador-list-create'))
+        Entregador.objects.create(nome='Joana')
+        self.assertEqual(len(self.client.get(reverse('entregas:entregador-list-create')).data), 2)
+
+    def test_etag_retorna_304(self):
+        response = self.client.get(self.url_cliente_entregas)
+        etag = response['ETag']
+        response = self.client.get(self.url_cliente_entregas, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.cliente.nome = 'Ana Costa Souza'
+        self.cliente.save()
+        response = self.client.get(self.url_cliente_entregas, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_respostas_de_erro_nao_sao_guardadas(self):
+        url = reverse('entregas:cliente-entregas-custom-list', args=[9999])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertNotIn('ETag', self.client.get(url))
+
+
+    def test_check_de_deploy_recusa_cache_local_sem_debug(self):
+        locmem = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+        banco = {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'perim_cache'}
+        with self.settings(DEBUG=False, CACHES={'default': banco, 'respostas': locmem}):
+            self.assertEqual([erro.id for erro in checks.caches_compartilhados(None)], ['entregas.E001'])
+        with self.settings(DEBUG=False, CACHES={'default': banco, 'respostas': banco}):
+            self.assertEqual(checks.caches_compartilhados(None), [])
+        with self.settings(DEBUG=True, CACHES={'default': locmem, 'respostas': locmem}):
+            self.assertEqual(checks.caches_compartilhados(None), [])
+
+    def test_check_da_coalescencia_entre_processos(self):
+        arquivo = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp/perim'}
+        redis = {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379'}
+        self.assertEqual(checks.cache_da_coalescencia(None), [])
+        with self.settings(COALESCENCIA_ENTRE_PROCESSOS=True, CACHES={'default': arquivo}):
+            self.assertEqual([erro.id for erro in checks.cache_da_coalescencia(None)], ['entregas.E002'])
+        with self.settings(COALESCENCIA_ENTRE_PROCESSOS=True, CACHES={'default': redis}):
+            self.assertEqual(checks.cache_da_coalescencia(None), [])
+
+class ClienteEntregasAPITest(APITestCase):
+    def setUp(self):
+        caches['respostas'].clear()
+        self.cliente = Cliente.objects.create(nome='Ana Costa', cpf='111.444.777-35', telefone='(11) 77777-7777')
+        self.endereco = Endereco.objects.create(
+            cliente=self.cliente, cep='01234-567', logradouro='Rua Nova', numero='789',
+            bairro='Jardim', cidade='São Paulo', estado='SP'
+        )
+        self.entregador = Entregador.objects.create(nome='Carlos')
+        self.url = reverse('entregas:cliente-entregas-custom-list', args=[self.cliente.id])
+        self.agora = timezone.now()
+
+    def _criar(self, quantidade):
+        inicio = Entrega.objects.count()
+        for i in range(inicio, inicio + quantidade):
+            Entrega.objects.create(
+                cliente=self.cliente, endereco=self.endereco, entregador=self.entregador,
+                status=Entrega.STATUS_ENTREGUE if i % 2 else Entrega.STATUS_PENDENTE,
+                numero_caixas=1, nome_embalador='Roberto', numero_nfce=str(i), serie_nfce='1',
+                data_compra=date.today(), data_hora_entrega=self.agora - timedelta(days=i)
+            )
+
+    def test_percorre_o_historico_por_cursor(self):
+        self._criar(25)
+        ids, params = [], {'page_size': 10}
+        while True:
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.data['cliente']['nome'], 'Ana Costa')
+            ids.extend(entrega['id'] for entrega in response.data['entregas_do_cliente'])
+            if not response.data['next_cursor']:
+                break
+            params['cursor'] = response.data['next_cursor']
+        esperados = list(Entrega.objects.order_by('-data_hora_entrega', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, esperados)
+
+    def test_consultas_nao_dependem_do_historico(self):
+        self._criar(5)
+        with CaptureQueriesContext(connection) as contexto:
+            self.client.get(self.url)
+        self._criar(40)
+        caches['respostas'].clear()
+        with self.assertNumQueries(len(contexto.captured_queries)):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data['entregas_do_cliente']), 25)
+
+    def test_janela_status_e_campos(self):
+        self._criar(10)
+        response = self.client.get(self.url, {
+            'data_inicio': (self.agora - timedelta(days=5)).date().isoformat(),
+            'status': Entrega.STATUS_ENTREGUE,
+            'fields': 'id,numero_nfce,status',
+        })
+        entregas = response.data['entregas_do_cliente']
+        self.assertEqual([entrega['numero_nfce'] for entrega in entregas], ['1', '3', '5'])
+        self.assertEqual(set(entregas[0]), {'id', 'numero_nfce', 'status'})
+        self.assertIsNone(response.data['next_cursor'])
+
+
+class CoalescenciaTest(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.calculos = 0
+        self.lock = threading.Lock()
+
+    def _calcular(self, atraso=0.2):
+        with self.lock:
+            self.calculos += 1
+        time.sleep(atraso)
+        return {'total': 42}
+
+    def _em_threads(self, alvo, quantidade, espacamento=0.0):
+        resultados = []
+        threads = []
+        for _ in range(quantidade):
+            thread = threading.Thread(target=lambda: resultados.append(alvo()))
+            thread.start()
+            threads.append(thread)
+            time.sleep(espacamento)
+        for thread in threads:
+            thread.join()
+        return resultados
+
+    def test_requisicoes_simultaneas_calculam_uma_vez(self):
+        resultados = self._em_threads(lambda: coalescencia.executar('estatisticas', self._calcular), 10)
+        self.assertEqual(self.calculos, 1)
+        self.assertEqual(resultados, [{'total': 42}] * 10)
+
+        # Terminado o cálculo, uma nova requisição calcula de novo.
+        coalescencia.executar('estatisticas', self._calcular)
+        self.assertEqual(self.calculos, 2)
+
+    def test_lider_de_outro_processo(self):
+        # Cada chamada de _entre_processos disputa a liderança só pelo cache,
+        # como fariam dois processos distintos com um cache compartilhado.
+        with self.settings(COALESCENCIA_ENTRE_PROCESSOS=True):
+            resultados = self._em_threads(
+                lambda: coalescencia._entre_processos('estatisticas', self._calcular, timeout=5), 3, espacamento=0.05
+            )
+            self.assertEqual(self.calculos, 1)
+            self.assertEqual(resultados, [{'total': 42}] * 3)
+            # O resultado de um líder anterior não serve para quem chega depois.
+            coalescencia._entre_processos('estatisticas', self._calcular, timeout=5)
+            self.assertEqual(self.calculos, 2)
+
+    def test_sem_disputa_nao_usa_cache(self):
+        with mock.patch.object(coalescencia, '_cache', side_effect=AssertionError('cache consultado')):
+            self.assertEqual(coalescencia.executar('estatisticas', lambda: self._calcular(atraso=0)), {'total': 42})
+
+    def test_espera_limitada_pelo_timeout(self):
+        resultados = self._em_threads(
+            lambda: coalescencia.executar('lento', lambda: self._calcular(atraso=0.5), timeout=0.05), 2, espacamento=0.01
+        )
+        self.assertEqual(self.calculos, 2)
+        self.assertEqual(len(resultados), 2)
+
+
+class ClienteConsultasTest(APITestCase):
+    tamanhos = (1, 100, 1000)
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+
+    def _popular(self, total):
+        inicio = Cliente.objects.count()
+        clientes = Cliente.objects.bulk_create([
+            Cliente(nome=f'Cliente {inicio + i:05d}', cpf=f'{inicio + i:011d}', telefone='(11) 99999-9999')
+            for i in range(total - inicio)
+        ])
+        Endereco.objects.bulk_create([
+            Endereco(
+                cliente=cliente, cep='01234-567', logradouro=f'Rua {j}', numero=str(j),
+                bairro='Centro', cidade='São Paulo', estado='SP', principal=(j == 0)
+            )
+            for cliente in clientes for j in range(2)
+        ])
+        caches['respostas'].clear()
+
+    def _contar(self, url, **extra):
+        with CaptureQueriesContext(connection) as contexto:
+            response = self.client.get(url, **extra)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(contexto.captured_queries), response
+
+    def test_lista_de_clientes_tem_numero_constante_de_consultas(self):
+        url = reverse('entregas:cliente-list-create')
+        self._popular(self.tamanhos[0])
+        esperado, _ = self._contar(url)
+        for tamanho in self.tamanhos[1:]:
+            self._popular(tamanho)
+            with self.assertNumQueries(esperado):
+                response = self.client.get(url)
+            self.assertEqual(len(response.data), tamanho)
+            self.assertEqual(response.data[0]['endereco_principal']['logradouro'], 'Rua 0')
+
+    def test_detalhe_do_cliente_tem_numero_constante_de_consultas(self):
+        esperado = None
+        for tamanho in self.tamanhos:
+            self._popular(tamanho)
+            cliente = Cliente.objects.order_by('-id').first()
+            total, response = self._contar(reverse('entregas:cliente-detail', args=[cliente.id]))
+            esperado = esperado or total
+            self.assertEqual(total, esperado)
+            self.assertEqual(response.data['endereco_principal']['logradouro'], 'Rua 0')
+        # O cliente e, numa só consulta, os seus endereços (o principal sai dela).
+        self.assertEqual(esperado, 2)
+
+    def test_changelist_do_admin_tem_numero_constante_de_consultas(self):
+        self.client.force_login(self.admin)
+        url = reverse('admin:entregas_cliente_changelist')
+        esperado = None
+        for tamanho in self.tamanhos:
+            self._popular(tamanho)
+            total, response = self._contar(url)
+            esperado = esperado or total
+            self.assertEqual(total, esperado)
+        self.assertContains(response, 'Rua 0')
+
+
+class EntregaLoteAPITest(APITestCase):
+    def setUp(self):
+        self.cliente = Cliente.objects.create(nome='Ana Costa', cpf='111.444.777-35', telefone='(11) 77777-7777')
+        self.outro_cliente = Cliente.objects.create(nome='Bruno Dias', cpf='529.982.247-25', telefone='(11) 55555-5555')
+        self.endereco = Endereco.objects.create(
+            cliente=self.cliente, cep='01234-567', logradouro='Rua Nova', numero='789',
+            bairro='Jardim', cidade='São Paulo', estado='SP'
+        )
+        self.endereco_outro = Endereco.objects.create(
+            cliente=self.outro_cliente, cep='01234-000', logradouro='Rua Velha', numero='1',
+            bairro='Centro', cidade='São Paulo', estado='SP'
+        )
+        self.entregador = Entregador.objects.create(nome='Carlos')
+        self.url = reverse('entregas:entrega-lote')
+
+    def _item(self, **extra):
+        item = {
+            'cliente': self.cliente.id,
+            'endereco': self.endereco.id,
+            'entregador': self.entregador.id,
+            'numero_caixas': 2,
+            'bebidas': True,
+            'nome_embalador': 'Roberto',
+            'numero_nfce': '54321',
+            'serie_nfce': '2',
+            'data_compra': '2025-05-20',
+            'data_hora_entrega': timezone.now().isoformat(),
+        }
+        item.update(extra)
+        return item
+
+    def test_cria_mil_entregas_com_consultas_constantes(self):
+        itens = [self._item(numero_nfce=str(i)) for i in range(1000)]
+        with CaptureQueriesContext(connection) as contexto:
+            response = self.client.post(self.url, itens, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['criadas'], 1000)
+        self.assertEqual(Entrega.objects.count(), 1000)
+        # 3 buscas em lote + INSERTs em lotes (o SQLite limita a 999 parâmetros por comando).
+        self.assertLess(len(contexto.captured_queries), 60)
+        self.assertEqual(agregados.total_entregas(), 1000)
+
+    def test_erros_por_item_e_nada_gravado(self):
+        itens = [
+            self._item(),
+            self._item(endereco=self.endereco_outro.id),
+            self._item(entregador=9999),
+            self._item(numero_caixas=-1),
+        ]
+        response = self.client.post(self.url, itens, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        erros = response.data['erros']
+        self.assertEqual(erros[0], {})
+        self.assertIn('endereco', erros[1])
+        self.assertIn('entregador', erros[2])
+        self.assertIn('numero_caixas', erros[3])
+        self.assertEqual(Entrega.objects.count(), 0)
+
+    def test_lote_precisa_ser_lista_dentro_do_limite(self):
+        self.assertEqual(self.client.post(self.url, {'cliente': 1}, format='json').status_code, status.HTTP_400_BAD_REQUEST)
+        with self.settings(ENTREGAS_LOTE_LIMITE=1):
+            response = self.client.post(self.url, [self._item(), self._item()], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class EntregaStatusLoteAPITest(APITestCase):
+    def setUp(self):
+        self.cliente = Cliente.objects.create(nome='Ana Costa', cpf='111.444.777-35', telefone='(11) 77777-7777')
+        self.endereco = Endereco.objects.create(
+            cliente=self.cliente, cep='01234-567', logradouro='Rua Nova', numero='789',
+            bairro='Jardim', cidade='São Paulo', estado='SP'
+        )
+        self.carlos = Entregador.objects.create(nome='Carlos')
+        self.joana = Entregador.objects.create(nome='Joana')
+        self.url = reverse('entregas:entrega-status-lote')
+
+    def _criar(self, entregador, status_entrega=Entrega.STATUS_PENDENTE, quando=None):
+        return Entrega.objects.create(
+            cliente=self.cliente, endereco=self.endereco, entregador=entregador, status=status_entrega,
+            numero_caixas=1, nome_embalador='Roberto', numero_nfce='1', serie_nfce='1',
+            data_compra=date.today(), data_hora_entrega=quando or timezone.now()
+        )
+
+    def test_altera_por_ids_respeitando_transicoes(self):
+        pendente = self._criar(self.carlos)
+        entregue = self._criar(self.carlos, Entrega.STATUS_ENTREGUE)
+        with CaptureQueriesContext(connection) as contexto:
+            response = self.client.post(self.url, {
+                'status': Entrega.STATUS_EM_TRANSITO, 'ids': [pendente.id, entregue.id]
+            }, format='json')
+        self.assertEqual(response.data, {'atualizadas': 1, 'ignoradas': [entregue.id]})
+        updates = [q for q in contexto.captured_queries if q['sql'].startswith('UPDATE "entregas_entrega"')]
+        self.assertEqual(len(updates), 1)
+        pendente.refresh_from_db()
+        entregue.refresh_from_db()
+        self.assertEqual(pendente.status, Entrega.STATUS_EM_TRANSITO)
+        self.assertEqual(entregue.status, Entrega.STATUS_ENTREGUE)
+
+    def test_altera_rota_do_entregador_no_dia(self):
+        hoje = [self._criar(self.carlos) for _ in range(3)]
+        ontem = self._criar(self.carlos, quando=timezone.now() - timedelta(days=1))
+        da_joana = self._criar(self.joana)
+        response = self.client.post(self.url, {
+            'status': Entrega.STATUS_EM_TRANSITO, 'entregador': self.carlos.id, 'data': timezone.localdate().isoformat()
+        }, format='json')
+        self.assertEqual(response.data, {'atualizadas': 3})
+        self.assertEqual(
+            set(Entrega.objects.filter(status=Entrega.STATUS_EM_TRANSITO).values_list('id', flat=True)),
+            {entrega.id for entrega in hoje}
+        )
+        self.assertEqual(Entrega.objects.get(pk=ontem.pk).status, Entrega.STATUS_PENDENTE)
+        self.assertEqual(Entrega.objects.get(pk=da_joana.pk).status, Entrega.STATUS_PENDENTE)
+
+        incremental = sorted(EntregaDiaria.objects.filter(total__gt=0).values_list('dia', 'entregador_id', 'status', 'total'))
+        agregados.reconstruir()
+        self.assertEqual(
+            incremental,
+            sorted(EntregaDiaria.objects.filter(total__gt=0).values_list('dia', 'entregador_id', 'status', 'total'))
+        )
+
+    def test_parametros_obrigatorios(self):
+        response = self.client.post(self.url, {'status': Entrega.STATUS_ENTREGUE}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, {'status': 'cancelada', 'ids': [1]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PlanejarRotasTest(APITestCase):
+    def setUp(self):
+        geo.cache_centroides.clear()
+        self.cliente = Cliente.objects.create(nome='Ana Costa', cpf='111.444.777-35', telefone='(11) 77777-7777')
+        # Dois bairros: um ao norte e outro ao sul do centro.
+        CentroideCep.objects.create(prefixo='01001', latitude=-23.50, longitude=-46.63)
+        CentroideCep.objects.create(prefixo='04001', latitude=-23.60, longitude=-46.63)
+        CentroideCep.objects.create(prefixo='040', latitude=-23.61, longitude=-46.62)
+        self.norte = self._endereco('01001-000')
+        self.sul = self._endereco('04001-000')
+        self.sul_prefixo = self._endereco('04099-000')
+        self.sem_centroide = self._endereco('99999-000')
+        self.carlos = Entregador.objects.create(nome='Carlos')
+        self.joana = Entregador.objects.create(nome='Joana')
+        self.url = reverse('entregas:rotas-planejar')
+
+    def _endereco(self, cep):
+        return Endereco.objects.create(
+            cliente=self.cliente, cep=cep, logradouro='Rua Nova', numero='1', bairro='Centro', cidade='São Paulo', estado='SP'
+        )
+
+    def _criar(self, endereco, caixas=2, frios=False, status_entrega=Entrega.STATUS_PENDENTE, quando=None):
+        return Entrega.objects.create(
+            cliente=self.cliente, endereco=endereco, status=status_entrega, numero_caixas=caixas, frios_congelados=frios,
+            nome_embalador='Roberto', numero_nfce='1', serie_nfce='1', data_compra=date.today(),
+            data_hora_entrega=quando or timezone.now()
+        )
+
+    def test_planejar(self):
+        import numpy as np
+        from . import rotas
+
+        gerador = np.random.default_rng(0)
+        latlon = np.vstack((
+            [-23.50, -46.63] + gerador.normal(0, 0.005, (20, 2)),
+            [-23.60, -46.63] + gerador.normal(0, 0.005, (20, 2)),
+        ))
+        urgentes = np.zeros(40, dtype=bool)
+        urgentes[[5, 30]] = True
+        resultado = rotas.planejar(latlon, np.ones(40), urgentes, 2)
+        self.assertEqual(sorted(np.concatenate(resultado).tolist()), list(range(40)))
+        self.assertEqual(sorted(len(rota) for rota in resultado), [20, 20])
+        for rota in resultado:
+            # Cada rota fica num bairro e começa pelos frios/congelados.
+            self.assertEqual(len({indice < 20 for indice in rota}), 1)
+            self.assertTrue(urgentes[rota[0]])
+
+    def test_dois_opt_desfaz_cruzamento(self):
+        import numpy as np
+        from . import rotas
+
+        pontos = np.array([[0, 0], [0, 1], [1, 0], [1, 1], [0, 0]], dtype=float)
+        distancias = rotas.matriz_distancias(pontos)
+        caminho = rotas.dois_opt(distancias, [0, 1, 2, 3, 4], 10)
+        self.assertEqual(caminho.tolist(), [0, 1, 3, 2, 4])
+
+    def test_dois_opt_com_vizinhos_proximos(self):
+        import numpy as np
+        from . import rotas
+
+        pontos = np.random.default_rng(2).uniform(0, 10, (300, 2))
+        distancias = rotas.matriz_distancias(pontos)
+        inicial = list(range(300))
+        caminho = rotas.dois_opt(distancias, inicial, 1000, vizinhos=5)
+        self.assertEqual(sorted(caminho.tolist()), inicial)
+        self.assertEqual((caminho[0], caminho[-1]), (0, 299))
+
+        def comprimento(ordem):
+            return distancias[ordem[:-1], ordem[1:]].sum()
+
+        self.assertLess(comprimento(caminho), comprimento(np.array(inicial)) * 0.3)
+
+    def test_planejar_rotas_do_dia(self):
+        norte = [self._criar(self.norte) for _ in range(3)]
+        sul = [self._criar(self.sul), self._criar(self.sul_prefixo, frios=True), self._criar(self.sul)]
+        sem_coordenadas = self._criar(self.sem_centroide)
+        ontem = self._criar(self.norte, quando=timezone.now() - timedelta(days=1))
+        entregue = self._criar(self.norte, status_entrega=Entrega.STATUS_ENTREGUE)
+
+        response = self.client.post(self.url, {'data': timezone.localdate().isoformat()}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['sem_coordenadas'], [sem_coordenadas.id])
+        rotas_planejadas = {rota['entregador']: rota for rota in response.data['rotas']}
+        self.assertEqual(set(rotas_planejadas), {self.carlos.id, self.joana.id})
+        grupos = sorted(
+            (sorted(rota['entregas']) for rota in response.data['rotas']),
+            key=lambda ids: ids[0]
+        )
+        self.assertEqual(set(grupos[0]) - {sem_coordenadas.id}, {entrega.id for entrega in norte})
+        self.assertEqual(set(grupos[1]) - {sem_coordenadas.id}, {entrega.id for entrega in sul})
+
+        rota_sul = next(rota for rota in response.data['rotas'] if sul[0].id in rota['entregas'])
+        self.assertEqual(rota_sul['entregas'][0], sul[1].id)
+        for rota in response.data['rotas']:
+            for ordem, entrega_id in enumerate(rota['entregas'], start=1):
+                entrega = Entrega.objects.get(pk=entrega_id)
+                self.assertEqual((entrega.entregador_id, entrega.ordem_rota), (rota['entregador'], ordem))
+
+        for entrega in (ontem, entregue):
+            entrega.refresh_from_db()
+            self.assertIsNone(entrega.entregador_id)
+        # Agregados e documento de busca acompanham a atribuição.
+        pendentes_carlos = EntregaDiaria.objects.get(
+            dia=timezone.localdate(), entregador=self.carlos, status=Entrega.STATUS_PENDENTE
+        )
+        self.assertEqual(pendentes_carlos.total, len(rotas_planejadas[self.carlos.id]['entregas']))
+        self.assertFalse(EntregaDiaria.objects.filter(
+            dia=timezone.localdate(), entregador=None, status=Entrega.STATUS_PENDENTE, total__gt=0
+        ).exists())
+        self.assertIn('carlos', Entrega.objects.get(pk=rotas_planejadas[self.carlos.id]['entregas'][0]).documento_busca)
+
+    def test_sem_aplicar_nao_grava(self):
+        entrega = self._criar(self.norte)
+        response = self.client.post(self.url, {
+            'data': timezone.localdate().isoformat(), 'entregadores': [self.joana.id], 'aplicar': False
+        }, format='json')
+        self.assertEqual(response.data['rotas'][0]['entregas'], [entrega.id])
+        entrega.refresh_from_db()
+        self.assertIsNone(entrega.entregador_id)
+        self.assertIsNone(entrega.ordem_rota)
+
+    def test_entregador_inexistente(self):
+        response = self.client.post(self.url, {
+            'data': timezone.localdate().isoformat(), 'entregadores': [self.carlos.id, 999]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class GeoEnderecoTest(APITestCase):
+    def setUp(self):
+        geo.cache_centroides.clear()
+        CentroideCep.objects.create(prefixo='01001000', latitude=-23.5505, longitude=-46.6340)
+        CentroideCep.objects.create(prefixo='01310', latitude=-23.5614, longitude=-46.6559)
+        CentroideCep.objects.create(prefixo='040', latitude=-23.6000, longitude=-46.6700)
+        self.cliente = Cliente.objects.create(nome='Ana Costa', cpf='111.444.777-35', telefone='(11) 77777-7777')
+        self.se = self._endereco('01001-000')
+        self.paulista = self._endereco('01310-930')
+        self.vila_mariana = self._endereco('04012-000')
+        self.sem_centroide = self._endereco('99999-000')
+
+    def _endereco(self, cep):
+        return Endereco.objects.create(
+            cliente=self.cliente, cep=cep, logradouro='Rua Nova', numero='1', bairro='Centro', cidade='São Paulo', estado='SP'
+        )
+
+    def test_coordenadas_pelo_prefixo_mais_longo(self):
+        self.assertEqual((self.se.latitude, self.se.longitude), (-23.5505, -46.6340))
+        self.assertEqual(self.paulista.latitude, -23.5614)
+        self.assertEqual(self.vila_mariana.latitude, -23.6000)
+        self.assertEqual(self.se.geocelula, geo.celula(-23.5505, -46.6340))
+        self.assertIsNone(self.sem_centroide.latitude)
+        self.assertIsNone(self.sem_centroide.geocelula)
+
+        self.se.cep = '04012-000'
+        self.se.save()
+        self.se.refresh_from_db()
+        self.assertEqual((self.se.latitude, self.se.longitude), (-23.6000, -46.6700))
+
+    def test_celulas_vizinhas_numeradas_em_sequencia(self):
+        tamanho = settings.GEO_CELULA_GRAUS
+        celula = geo.celula(-23.555, -46.635)
+        self.assertEqual(geo.celula(-23.555, -46.635 + tamanho), celula + 1)
+        self.assertNotEqual(geo.celula(-23.555 + tamanho, -46.635), celula + 1)
+
+    def test_filtro_por_raio(self):
+        url = reverse('entregas:endereco-list')
+        response = self.client.get(url, {'lat': -23.5505, 'lon': -46.6340, 'raio_km': 1})
+        self.assertEqual([endereco['id'] for endereco in response.data], [self.se.id])
+        # Sé -> Paulista: ~2,5 km.
+        response = self.client.get(url, {'lat': -23.5505, 'lon': -46.6340, 'raio_km': 3})
+        self.assertEqual({endereco['id'] for endereco in response.data}, {self.se.id, self.paulista.id})
+        self.assertEqual(response.data[0]['latitude'], -23.5614)
+
+        response = self.client.get(
+            reverse('entregas:endereco-list-create', args=[self.cliente.id]),
+            {'lat': -23.6, 'lon': -46.67, 'raio_km': 0.5}
+        )
+        self.assertEqual([endereco['id'] for endereco in response.data], [self.vila_mariana.id])
+
+    def test_filtro_por_retangulo_nas_entregas(self):
+        for endereco in (self.se, self.paulista, self.vila_mariana, self.sem_centroide):
+            Entrega.objects.create(
+                cliente=self.cliente, endereco=endereco, numero_caixas=1, nome_embalador='Roberto',
+                numero_nfce='1', serie_nfce='1', data_compra=date.today(), data_hora_entrega=timezone.now()
+            )
+        response = self.client.get(reverse('entregas:entrega-list-create'), {'bbox': '-23.57,-46.66,-23.54,-46.63'})
+        self.assertEqual(
+            {entrega['endereco'] for entrega in response.data}, {self.se.id, self.paulista.id}
+        )
+        # Parâmetros inválidos são ignorados, como os demais filtros.
+        response = self.client.get(reverse('entregas:entrega-list-create'), {'bbox': '1,2,3', 'raio_km': 'x'})
+        self.assertEqual(len(response.data), 4)
+
+    def test_geocodificar_enderecos(self):
+        Endereco.objects.filter(pk=self.se.pk).update(latitude=None, longitude=None, geocelula=None)
+        CentroideCep.objects.create(prefixo='999', latitude=-10.0, longitude=-50.0)
+        geo.cache_centroides.clear()
+        call_command('geocodificar_enderecos', stdout=io.StringIO())
+        self.se.refresh_from_db()
+        self.sem_centroide.refresh_from_db()
+        self.assertEqual(self.se.latitude, -23.5505)
+        self.assertEqual((self.sem_centroide.latitude, self.sem_centroide.geocelula), (-10.0, geo.celula(-10.0, -50.0)))
+
+
+class EnderecoPrincipalTest(TestCase):
+    def setUp(self):
+        geo.cache_centroides.clear()
+        self.cliente = Cliente.objects.create(nome='Ana Costa', cpf='111.444.777-35', telefone='(11) 77777-7777')
+
+    def _endereco(self, **campos):
+        return Endereco(**{
+            'cliente': self.cliente, 'cep': '01001-000', 'logradouro': 'Rua Nova', 'numero': '1', 'bairro': 'Centro',
+            'cidade': 'São Paulo', 'estado': 'SP', **campos,
+        })
+
+    def _comandos(self, funcao):
+        with CaptureQueriesContext(connection) as contexto:
+            funcao()
+        return [
+            query['sql'] for query in contexto.captured_queries
+            if not query['sql'].startswith(('SAVEPOINT', 'RELEASE SAVEPOINT'))
+        ]
+
+    def _principais(self):
+        return list(Endereco.objects.filter(cliente=self.cliente, principal=True).values_list('id', flat=True))
+
+    def test_primeiro_endereco_vira_principal(self):
+        # Cache de centroides vazio: o CEP é geocodificado antes dos dois comandos de escrita.
+        endereco = self._endereco()
+        comandos = self._comandos(endereco.save)
+        self.assertEqual(len(comandos), 3)
+        self.assertIn('"entregas_centroidecep"', comandos[0])
+        self.assertTrue(endereco.principal)
+        self.assertEqual(self._principais(), [endereco.id])
+
+    def test_cep_novo_consulta_centroide_uma_vez(self):
+        self._endereco().save()
+        segundo = self._endereco(numero='2', cep='20040-020')
+        comandos = self._comandos(segundo.save)
+        self.assertEqual(len(comandos), 3)
+        self.assertIn('"entregas_centroidecep"', comandos[0])
+        terceiro = self._endereco(numero='3', cep='20040-020')
+        self.assertEqual(len(self._comandos(terceiro.save)), 2)
+
+    def test_novo_endereco_nao_substitui_principal(self):
+        primeiro = self._endereco()
+        primeiro.save()
+        segundo = self._endereco(numero='2')
+        self.assertEqual(len(self._comandos(segundo.save)), 2)
+        self.assertFalse(segundo.principal)
+        self.assertEqual(self._principais(), [primeiro.id])
+
+    def test_novo_endereco_principal(self):
+        primeiro = self._endereco()
+        primeiro.save()
+        segundo = self._endereco(numero='2', principal=True)
+        self.assertEqual(len(self._comandos(segundo.save)), 2)
+        self.assertEqual(self._principais(), [segundo.id])
+
+    def test_alteracao_para_principal(self):
+        primeiro = self._endereco()
+        primeiro.save()
+        segundo = self._endereco(numero='2')
+        segundo.save()
+        segundo.principal = True
+        self.assertEqual(len(self._comandos(segundo.save)), 2)
+        self.assertEqual(self._principais(), [segundo.id])
+
+    def test_unico_endereco_continua_principal(self):
+        endereco = self._endereco()
+        endereco.save()
+        endereco.principal = False
+        endereco.numero = '10'
+        self.assertEqual(len(self._comandos(endereco.save)), 2)
+        self.assertTrue(endereco.principal)
+        self.assertEqual(self._principais(), [endereco.id])
+
+    def test_desmarcar_principal_com_outros_enderecos(self):
+        primeiro = self._endereco()
+        primeiro.save()
+        self._endereco(numero='2').save()
+        primeiro.principal = False
+        self.assertEqual(len(self._comandos(primeiro.save)), 2)
+        self.assertFalse(primeiro.principal)
+        self.assertEqual(self._principais(), [])
+
+    def test_criar_enderecos_em_massa(self):
+        outro = Cliente.objects.create(nome='Bruno Lima', cpf='529.982.247-25', telefone='(11) 66666-6666')
+        antigo = self._endereco()
+        antigo.save()
+
+        def importar(quantidade):
+            enderecos = []
+            for i in range(quantidade):
+                enderecos.append(self._endereco(numero=str(i)))
+                enderecos.append(Endereco(
+                    cliente=outro, cep='01001-000', logradouro='Rua Velha', numero=str(i), bairro='Centro',
+                    cidade='São Paulo', estado='SP', principal=i == quantidade - 1,
+                ))
+            return lambda: lote.criar_enderecos(enderecos)
+
+        importar(2)()
+        # Consulta dos principais + UPDATE do principal trocado + INSERT (até 66 linhas por INSERT no SQLite).
+        self.assertEqual(len(self._comandos(importar(3))), 3)
+        self.assertEqual(len(self._comandos(importar(30))), 3)
+
+        self.assertEqual(self._principais(), [antigo.id])
+        principais_outro = Endereco.objects.filter(cliente=outro, principal=True)
+        self.assertEqual(principais_outro.count(), 1)
+        self.assertEqual(principais_outro.get().numero, '29')
+
+        novo = self._endereco(numero='99', principal=True)
+        lote.criar_enderecos([self._endereco(numero='98'), novo])
+        self.assertEqual(self._principais(), [novo.id])
+
+
+class ImportacaoClientesTest(APITestCase):
+    CABECALHO = 'nome,cpf,telefone,cep,logradouro,numero,complemento,bairro,cidade,estado\n'
+
+    def setUp(self):
+        Cliente.objects.create(nome='Ana Costa', cpf='111.444.777-35', telefone='(11) 77777-7777')
+
+    def _csv(self, *linhas):
+        return (self.CABECALHO + ''.join(f'{linha}\n' for linha in linhas)).encode('utf-8')
+
+    def test_validacao_em_lote_igual_a_do_modelo(self):
+        cpfs = ['11144477735', '52998224725', '12345678909', '11144477736', '11111111111', '00000000000', '98765432100']
+        self.assertEqual(
+            list(importacao.digitos_verificadores_validos(cpfs)), [Cliente.is_valid_cpf(cpf) for cpf in cpfs]
+        )
+        self.assertEqual(len(importacao.digitos_verificadores_validos([])), 0)
+
+    def test_importacao_pela_api(self):
+        arquivo = io.BytesIO(self._csv(
+            'Bruno Lima,529.982.247-25,11 66666-6666,01001000,Praça da Sé,1,,Sé,São Paulo,sp',
+            'Carla Dias,12345678909,(11) 5555-5555,,,,,,,',
+            'Ana Repetida,111.444.777-35,(11) 77777-7777,,,,,,,',
+            'Carla de Novo,123.456.789-09,(11) 5555-5555,,,,,,,',
+            'CPF Errado,123.456.789-00,(11) 5555-5555,,,,,,,',
+            'Sem Telefone,987.654.321-00,,,,,,,,',
+            'Sem Bairro,987.654.321-00,(11) 5555-5555,01001-000,Praça da Sé,1,,,São Paulo,SP',
+        ))
+        arquivo.name = 'clientes.csv'
+        with CaptureQueriesContext(connection) as contexto:
+            response = self.client.post(reverse('entregas:cliente-importar'), {'arquivo': arquivo}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['clientes_criados'], 2)
+        self.assertEqual(response.data['enderecos_criados'], 1)
+        self.assertEqual(response.data['linhas_recusadas'], 5)
+        self.assertEqual([erro['linha'] for erro in response.data['erros']], [4, 5, 6, 7, 8])
+        self.assertEqual(response.data['erros'][0]['erro'], importacao.MENSAGEM_CPF_CADASTRADO)
+        self.assertEqual(response.data['erros'][1]['erro'], importacao.MENSAGEM_CPF_REPETIDO.format(linha=3))
+        self.assertEqual(response.data['erros'][2]['erro'], importacao.MENSAGEM_CPF_INVALIDO)
+        self.assertIn('bairro', response.data['erros'][4]['erro'])
+        self.assertLess(len(contexto.captured_queries), 15)
+
+        bruno = Cliente.objects.get(cpf='529.982.247-25')
+        self.assertEqual(bruno.telefone, '(11) 66666-6666')
+        endereco = bruno.endereco_principal
+        self.assertEqual((endereco.cep, endereco.estado), ('01001-000', 'SP'))
+        self.assertFalse(Cliente.objects.get(cpf='123.456.789-09').enderecos.exists())
+
+    def test_colunas_ausentes(self):
+        arquivo = io.BytesIO(b'nome,telefone\nBruno,(11) 66666-6666\n')
+        arquivo.name = 'clientes.csv'
+        response = self.client.post(reverse('entregas:cliente-importar'), {'arquivo': arquivo}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('cpf', response.data['erro'])
+
+    def test_comando_grava_relatorio_de_erros(self):
+        diretorio = tempfile.mkdtemp()
+        caminho = os.path.join(diretorio, 'clientes.csv')
+        with open(caminho, 'wb') as arquivo:
+            arquivo.write(self._csv(
+                'Bruno Lima,529.982.247-25,(11) 66666-6666,,,,,,,',
+                'CPF Errado,123.456.789-00,(11) 5555-5555,,,,,,,',
+            ))
+        call_command('importar_clientes', caminho, '--lote', '1', stdout=io.StringIO())
+        self.assertTrue(Cliente.objects.filter(cpf='529.982.247-25').exists())
+        with open(f'{caminho}.erros.csv', encoding='utf-8') as relatorio:
+            linhas = list(csv.reader(relatorio))
+        self.assertEqual(linhas, [['linha', 'cpf', 'erro'], ['3', '123.456.789-00', importacao.MENSAGEM_CPF_INVALIDO]])
+
+    def test_cpf_criado_por_outra_gravacao_durante_a_importacao(self):
+        importacao_em_curso = importacao.Importacao()
+        # Outro processo cadastra o mesmo CPF depois da leitura dos já cadastrados.
+        bruno = Cliente.objects.create(nome='Bruno Lima', cpf='529.982.247-25', telefone='(11) 66666-6666')
+        principal = Endereco.objects.create(
+            cliente=bruno, cep='01001-000', logradouro='Praça da Sé', numero='1', bairro='Sé',
+            cidade='São Paulo', estado='SP'
+        )
+        resumo = importacao_em_curso.processar(csv.DictReader(io.StringIO(self._csv(
+            'Bruno Importado,529.982.247-25,(11) 66666-6666,20040020,Avenida Rio Branco,1,,Centro,Rio de Janeiro,RJ',
+            'Carla Dias,123.456.789-09,(11) 5555-5555,01310100,Avenida Paulista,10,,Bela Vista,São Paulo,SP',
+        ).decode('utf-8'))))
+
+        self.assertEqual(resumo, {'linhas': 2, 'clientes_criados': 1, 'enderecos_criados': 1, 'linhas_recusadas': 1})
+        self.assertEqual(importacao_em_curso.erros, [(2, '529.982.247-25', importacao.MENSAGEM_CPF_CADASTRADO)])
+        self.assertEqual(list(bruno.enderecos.values_list('id', 'principal')), [(principal.id, True)])
+        self.assertEqual(Cliente.objects.get(cpf='123.456.789-09').endereco_principal.logradouro, 'Avenida Paulista')
+
+
+class ColunasDigitosTest(APITestCase):
+    def setUp(self):
+        self.ana = Cliente.objects.create(nome='Ana Costa', cpf='111.444.777-35', telefone='(11) 77777-7777')
+        self.bruno = Cliente.objects.create(nome='Bruno Lima', cpf='529.982.247-25', telefone='(21) 99999-8888')
+        Endereco.objects.create(
+            cliente=self.bruno, cep='01001-000', logradouro='Praça da Sé', numero='1', bairro='Sé',
+            cidade='São Paulo', estado='SP'
+        )
+
+    def _buscar(self, **params):
+        response = self.client.get(reverse('entregas:cliente-list-create'), params)
+        return sorted(cliente['nome'] for cliente in response.data)
+
+    def test_colunas_acompanham_os_campos(self):
+        self.assertEqual((self.ana.cpf_digitos, self.ana.telefone_digitos), ('11144477735', '11777777777'))
+        self.ana.telefone = '(11) 5555-4444'
+        self.ana.save(update_fields=['telefone'])
+        self.ana.refresh_from_db()
+        self.assertEqual(self.ana.telefone_digitos, '1155554444')
+        self.assertEqual(self.bruno.enderecos.get().cep_digitos, '01001000')
+
+        lote.criar_enderecos([Endereco(
+            cliente=self.ana, cep='20040-020', logradouro='Avenida Rio Branco', numero='1', bairro='Centro',
+            cidade='Rio de Janeiro', estado='RJ'
+        )])
+        self.assertEqual(self.ana.enderecos.get().cep_digitos, '20040020')
+
+    def test_busca_numerica_por_prefixo(self):
+        self.assertEqual(self._buscar(search='11144477735'), ['Ana Costa'])
+        self.assertEqual(self._buscar(search='111.444'), ['Ana Costa'])
+        self.assertEqual(self._buscar(search='(21) 9999'), ['Bruno Lima'])
+        self.assertEqual(self._buscar(search='01001-0'), ['Bruno Lima'])
+        self.assertEqual(self._buscar(search='1'), ['Ana Costa'])
+        self.assertEqual(self._buscar(search='444'), [])
+        self.assertEqual(self._buscar(search='lima'), ['Bruno Lima'])
+        self.assertEqual(self._buscar(cpf='52998224725'), ['Bruno Lima'])
+        self.assertEqual(self._buscar(cpf='529.982.247-25'), ['Bruno Lima'])
+
+    def test_prefixo_so_com_noves(self):
+        Cliente.objects.create(nome='Carla Dias', cpf='999.999.999-99', telefone='(11) 5555-5555')
+        self.assertEqual(self._buscar(search='99'), ['Carla Dias'])
+
+    @skipUnless(connection.vendor == 'sqlite', 'Plano de execução específico do SQLite.')
+    def test_buscas_usam_os_indices(self):
+        consultas = {
+            'cpf_digitos': filters.filtrar_clientes(Cliente.objects.all(), {'cpf': '111.444.777-35'}),
+            'telefone_digitos': filters.filtrar_clientes(Cliente.objects.all(), {'search': '1177'}),
+            'cep_digitos': filters.filtrar_enderecos(Endereco.objects.all(), {'cep': '01001'}),
+        }
+        for coluna, queryset in consultas.items():
+            plano = queryset.explain()
+            self.assertRegex(plano, rf'USING INDEX \w*{coluna}')
+            self.assertNotRegex(plano, r'SCAN entregas_(cliente|endereco)\b')
+
+    def test_filtro_de_enderecos_por_cep(self):
+        response = self.client.get(reverse('entregas:endereco-list'), {'cep': '01001'})
+        self.assertEqual([endereco['cep'] for endereco in response.data], ['01001-000'])
+        response = self.client.get(reverse('entregas:endereco-list'), {'cep': '02'})
+        self.assertEqual(response.data, [])
+
+
+class PlanosConsultaEntregaTest(APITestCase):
+    # EXPLAIN QUERY PLAN da consulta principal de /api/entregas/ para cada
+    # combinação de filtros. Falha se alguma tabela for lida por inteiro ou,
+    # quando há filtro de coluna, se entregas_entrega for percorrida inteira
+    # pelo índice; sem busca textual ou região, a ordem também deve vir do índice.
+    COMBINACOES = [
+        {},
+        {'status': 'pendente'},
+        {'entregador': '1'},
+        {'cliente': '1'},
+        {'data_inicio': '2025-03-01'},
+        {'data_fim': '2025-03-31'},
+        {'data_inicio': '2025-03-01', 'data_fim': '2025-03-31'},
+        {'status': 'pendente', 'data_inicio': '2025-03-01', 'data_fim': '2025-03-31'},
+        {'entregador': '1', 'data_inicio': '2025-03-01', 'data_fim': '2025-03-31'},
+        {'cliente': '1', 'data_inicio': '2025-03-01'},
+        {'status': 'entregue', 'entregador': '1'},
+        {'status': 'entregue', 'cliente': '1'},
+        {'cliente': '1', 'entregador': '1', 'status': 'entregue', 'data_fim': '2025-03-31'},
+        {'search': 'lima'},
+        {'search': 'lima', 'status': 'pendente'},
+        {'lat': '-23.55', 'lon': '-46.63', 'raio_km': '2'},
+        {'bbox': '-23.6,-46.7,-23.5,-46.6', 'data_inicio': '2025-03-01'},
+    ]
+    VARIANTES = [{}, {'page_size': '25'}, {'fields': 'id,status'}, {'fields': 'id,endereco_detalhes', 'expand': 'endereco'}, {'expand': 'entregador'}]
+
+    def setUp(self):
+        cliente = Cliente.objects.create(nome='Pedro Lima', cpf='111.444.777-35', telefone='(11) 66666-6666')
+        endereco = Endereco.objects.create(
+            cliente=cliente, cep='01234-567', logradouro='Rua Lima', numero='321', bairro='Alto',
+            cidade='São Paulo', estado='SP'
+        )
+        Entrega.objects.create(
+            cliente=cliente, endereco=endereco, entregador=Entregador.objects.create(nome='Carlos'),
+            numero_caixas=1, nome_embalador='Teste', numero_nfce='1', serie_nfce='1',
+            data_compra=date(2025, 3, 10), data_hora_entrega=timezone.now()
+        )
+
+    def _plano(self, params):
+        # EXPLAIN QUERY PLAN e os textos conferidos abaixo são do SQLite.
+        with CaptureQueriesContext(connection) as contexto:
+            response = self.client.get(reverse('entregas:entrega-list-create'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        consultas = [query['sql'] for query in contexto.captured_queries if 'FROM "entregas_entrega"' in query['sql']]
+        self.assertEqual(len(consultas), 1, consultas)
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {consultas[0]}')
+            return [linha[-1] for linha in cursor.fetchall()]
+
+    @skipUnless(connection.vendor == 'sqlite', 'Plano de execução específico do SQLite.')
+    def test_filtros_usam_indices(self):
+        colunas = {'status', 'entregador', 'cliente', 'data_inicio', 'data_fim'}
+        for combinacao in self.COMBINACOES:
+            for variante in self.VARIANTES:
+                params = {**combinacao, **variante}
+                with self.subTest(params=params):
+                    plano = self._plano(params)
+                    texto = '\n'.join(plano)
+                    for linha in plano:
+                        if linha.startswith('SCAN ') and 'INDEX' not in linha:
+                            self.fail(f'Leitura completa de tabela:\n{texto}')
+                    if colunas & set(combinacao):
+                        self.assertNotIn('SCAN entregas_entrega ', texto)
+                    if not {'search', 'lat', 'bbox'} & set(combinacao):
+                        self.assertNotIn('USE TEMP B-TREE', texto)
+
+    def test_datas_em_faixas_no_fuso_local(self):
+        fuso = timezone.get_default_timezone()
+        Entrega.objects.update(data_hora_entrega=datetime(2025, 3, 31, 23, 30, tzinfo=fuso))
+        url = reverse('entregas:entrega-list-create')
+        self.assertEqual(len(self.client.get(url, {'data_fim': '2025-03-31'}).data), 1)
+        self.assertEqual(len(self.client.get(url, {'data_inicio': '2025-04-01'}).data), 0)
+        Entrega.objects.update(data_hora_entrega=datetime(2025, 4, 1, 0, 0, tzinfo=fuso))
+        self.assertEqual(len(self.client.get(url, {'data_fim': '2025-03-31'}).data), 0)
+        self.assertEqual(len(self.client.get(url, {'data_inicio': '2025-04-01', 'data_fim': '2025-04-01'}).data), 1)
+        self.assertEqual(len(self.client.get(url, {'data_fim': '9999-12-31'}).data), 1)
+        self.assertEqual(len(self.client.get(url, {'data_inicio': '0001-01-01'}).data), 1)
+        self.assertEqual(len(self.client.get(url, {'data_inicio': '9999-12-31'}).data), 0)
+        self.assertEqual(self.client.get(reverse('entregas:entrega-exportar'), {'data_fim': '9999-12-31'}).status_code, 200)
+
+
+class BuscaEntregaTest(APITestCase):
+    def setUp(self):
+        self.cliente = Cliente.objects.create(nome='José da Conceição', cpf='111.444.777-35', telefone='(11) 77777-7777')
+        self.endereco = Endereco.objects.create(
+            cliente=self.cliente, cep='01234-567', logradouro='Avenida São João', numero='789',
+            bairro='Jardim Paulistano', cidade='São Paulo', estado='SP'
+        )
+        self.outro_cliente = Cliente.objects.create(nome='Bruno Dias', cpf='529.982.247-25', telefone='(11) 55555-5555')
+        self.outro_endereco = Endereco.objects.create(
+            cliente=self.outro_cliente, cep='04567-000', logradouro='Rua Augusta', numero='1',
+            bairro='Consolação', cidade='São Paulo', estado='SP'
+        )
+        self.entregador = Entregador.objects.create(nome='Márcia Antunes')
+        self.entrega = self._criar(self.cliente, self.endereco, self.entregador, numero_nfce='998877')
+        self.outra = self._criar(self.outro_cliente, self.outro_endereco, None, numero_nfce='112233')
+        self.url = reverse('entregas:entrega-list-create')
+
+    def _criar(self, cliente, endereco, entregador, **extra):
+        return Entrega.objects.create(
+            cliente=cliente, endereco=endereco, entregador=entregador,
+            numero_caixas=1, nome_embalador='Roberto', serie_nfce='1',
+            data_compra=date.today(), data_hora_entrega=timezone.now(), **extra
+        )
+
+    def _buscar(self, termo):
+        return [item['id'] for item in self.client.get(self.url, {'search': termo}).data]
+
+    def test_busca_ignora_acentos_e_maiusculas(self):
+        self.assertEqual(self._buscar('Sao Joao'), [self.entrega.id])
+        self.assertEqual(self._buscar('CONCEICAO'), [self.entrega.id])
+        self.assertEqual(self._buscar('consolação'), [self.outra.id])
+        self.assertEqual(self._buscar('marcia'), [self.entrega.id])
+        self.assertEqual(self._buscar('8877'), [self.entrega.id])
+        self.assertEqual(self._buscar('04567'), [self.outra.id])
+        self.assertEqual(self._buscar('xyzw'), [])
+
+    def test_busca_por_status_e_termos_curtos(self):
+        self.client.post(reverse('entregas:entrega-status-lote'), {
+            'status': Entrega.STATUS_EM_TRANSITO, 'ids': [self.outra.id]
+        }, format='json')
+        self.assertEqual(self._buscar('transito'), [self.outra.id])
+        self.assertEqual(sorted(self._buscar('jo')), [self.entrega.id])
+
+    def test_documento_acompanha_alteracoes_relacionadas(self):
+        self.cliente.nome = 'Joaquim Barbosa'
+        self.cliente.save()
+        self.assertEqual(self._buscar('joaquim'), [self.entrega.id])
+        self.assertEqual(self._buscar('conceicao'), [])
+
+        self.outro_endereco.bairro = 'Bela Vista'
+        self.outro_endereco.save()
+        self.assertEqual(self._buscar('bela vista'), [self.outra.id])
+
+        self.entregador.delete()
+        self.assertEqual(self._buscar('marcia'), [])
+
+    def test_documento_preenchido_na_criacao_em_lote(self):
+        response = self.client.post(reverse('entregas:entrega-lote'), [{
+            'cliente': self.outro_cliente.id, 'endereco': self.outro_endereco.id, 'numero_caixas': 1,
+            'nome_embalador': 'Zuleica', 'numero_nfce': '1', 'serie_nfce': '1',
+            'data_compra': '2025-05-20', 'data_hora_entrega': timezone.now().isoformat(),
+        }], format='json')
+        self.assertEqual(self._buscar('zuleica'), response.data['ids'])
+
+
+class BuscarCepTest(APITestCase):
+    ceps = {
+        '01001000': {
+            'logradouro': 'Praça da Sé', 'complemento': 'lado ímpar', 'bairro': 'Sé',
+            'localidade': 'São Paulo', 'uf': 'SP'
+        },
+    }
+
+    def setUp(self):
+        cep_service.cache_memoria.clear()
+        self.url = reverse('entregas:buscar-cep')
+
+    def _buscar(self, cep):
+        return self.client.post(self.url, {'cep': cep}, format='json')
+
+    def test_cep_repetido_nao_consulta_o_servico_novamente(self):
+        with ServidorCepLocal(self.ceps) as servidor, self.settings(CEP_SERVICO_URL=servidor.url):
+            response = self._buscar('01001-000')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data, {
+                'cep': '01001-000', 'logradouro': 'Praça da Sé', 'complemento': 'lado ímpar',
+                'bairro': 'Sé', 'cidade': 'São Paulo', 'estado': 'SP'
+            })
+            with self.assertNumQueries(0):
+                self._buscar('01001000')
+
+            cep_service.cache_memoria.clear()
+            self.assertEqual(self._buscar('01001000').status_code, status.HTTP_200_OK)
+            self.assertEqual(servidor.requisicoes, 1)
+
+    def test_cache_do_banco_expira(self):
+        with ServidorCepLocal(self.ceps) as servidor, self.settings(CEP_SERVICO_URL=servidor.url):
+            self._buscar('01001000')
+            Cep.objects.filter(cep='01001000').update(atualizado_em=timezone.now() - timedelta(days=365))
+            cep_service.cache_memoria.clear()
+            self._buscar('01001000')
+            self.assertEqual(servidor.requisicoes, 2)
+
+    def test_base_offline_dispensa_o_servico(self):
+        caminho = os.path.join(tempfile.mkdtemp(), 'ceps.csv')
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            arquivo.write('cep,logradouro,complemento,bairro,cidade,estado\n')
+            arquivo.write('20040-020,Avenida Rio Branco,,Centro,Rio de Janeiro,RJ\n')
+            arquivo.write('invalido,,,,,\n')
+        call_command('carregar_ceps', caminho, stdout=io.StringIO())
+        Cep.objects.filter(cep='20040020').update(atualizado_em=timezone.now() - timedelta(days=365))
+
+        with self.settings(CEP_SERVICO_URL='http://127.0.0.1:9'):
+            response = self._buscar('20040020')
+        self.assertEqual(response.data['cidade'], 'Rio de Janeiro')
+
+    def test_cep_inexistente_e_invalido(self):
+        with ServidorCepLocal(self.ceps) as servidor, self.settings(CEP_SERVICO_URL=servidor.url):
+            self.assertEqual(self._buscar('99999999').status_code, status.HTTP_404_NOT_FOUND)
+            self.assertEqual(self._buscar('99999999').status_code, status.HTTP_404_NOT_FOUND)
+            self.assertEqual(servidor.requisicoes, 1)
+        self.assertEqual(self._buscar('123').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_timeout_do_servico(self):
+        with ServidorCepLocal(self.ceps, atraso=0.5) as servidor, \
+                self.settings(CEP_SERVICO_URL=servidor.url, CEP_TIMEOUT=(0.5, 0.05)):
+            response = self._buscar('01001000')
+        self.assertEqual(response.status_code, status.HTTP_504_GATEWAY_TIMEOUT)
+
+    async def test_consultas_simultaneas_do_mesmo_cep_sao_agrupadas(self):
+        with ServidorCepLocal(self.ceps, atraso=0.2) as servidor, self.settings(CEP_SERVICO_URL=servidor.url):
+            resultados = await asyncio.gather(*(cep_service.resolver_async('01001000') for _ in range(5)))
+            self.assertEqual(servidor.requisicoes, 1)
+        self.assertTrue(all(resultado['cidade'] == 'São Paulo' for resultado in resultados))
+        self.assertTrue(await Cep.objects.filter(cep='01001000').aexists())
+
+    async def test_view_assincrona(self):
+        url = reverse('entregas:buscar-cep-async')
+        with ServidorCepLocal(self.ceps) as servidor, self.settings(CEP_SERVICO_URL=servidor.url):
+            response = await self.async_client.post(url, {'cep': '01001-000'}, content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.json()['logradouro'], 'Praça da Sé')
+            response = await self.async_client.post(url, {'cep': '99999999'}, content_type='application/json')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = await self.async_client.post(url, {'cep': '123'}, content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_cliente_http_fechado_com_o_loop(self):
+        async def obter():
+            return await cep_service.cliente_async()
+
+        # Cada async_to_sync roda num loop próprio, fechado ao terminar.
+        primeiro = async_to_sync(obter)()
+        self.assertTrue(primeiro.is_closed)
+        segundo = async_to_sync(obter)()
+        self.assertIsNot(segundo, primeiro)
+        self.assertTrue(segundo.is_closed)
+        self.assertNotIn(primeiro, [cliente for cliente, _ in cep_service._clientes_async.values()])
+
+
+class EstatisticasAsyncTest(TransactionTestCase):
+    # As consultas rodam em threads com conexões próprias, que não enxergam
+    # a transação aberta por um TestCase.
+    def test_mesma_resposta_da_view_sincrona(self):
+        cliente = Cliente.objects.create(nome='Ana Costa', cpf='111.444.777-35', telefone='(11) 77777-7777')
+        endereco = Endereco.objects.create(
+            cliente=cliente, cep='01234-567', logradouro='Rua Nova', numero='789',
+            bairro='Jardim', cidade='São Paulo', estado='SP'
+        )
+        entregador = Entregador.objects.create(nome='Carlos')
+        for status_entrega in (Entrega.STATUS_PENDENTE, Entrega.STATUS_ENTREGUE):
+            Entrega.objects.create(
+                cliente=cliente, endereco=endereco, entregador=entregador, status=status_entrega,
+                numero_caixas=1, nome_embalador='Roberto', numero_nfce='1', serie_nfce='1',
+                data_compra=date.today(), data_hora_entrega=timezone.now()
+            )
+
+        sincrona = self.client.get(reverse('entregas:estatisticas'), {'dias': 30})
+        assincrona = async_to_sync(self.async_client.get)(reverse('entregas:estatisticas-async'), {'dias': 30})
+        self.assertEqual(assincrona.status_code, status.HTTP_200_OK)
+        self.assertEqual(assincrona.json(), sincrona.json())
+        self.assertEqual(assincrona.json()['total_entregas'], 2)
+
+        invalida = async_to_sync(self.async_client.get)(reverse('entregas:estatisticas-async'), {'dias': 0})
+        self.assertEqual(invalida.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # As threads das consultas são fixas e reaproveitam as conexões entre requisições.
+        criadas = []
+        connection_created.connect(lambda **kwargs: criadas.append(kwargs['connection']), weak=False, dispatch_uid='teste')
+        self.addCleanup(connection_created.disconnect, dispatch_uid='teste')
+        for _ in range(5):
+            async_to_sync(self.async_client.get)(reverse('entregas:estatisticas-async'), {'dias': 30})
+        self.assertLessEqual(len(criadas), settings.CONSULTAS_PARALELAS)
+
+
+class EventosEntregaTest(TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.cliente = Cliente.objects.create(nome='Ana Costa', cpf='111.444.777-35', telefone='(11) 77777-7777')
+        self.endereco = Endereco.objects.create(
+            cliente=self.cliente, cep='01234-567', logradouro='Rua Nova', numero='789',
+            bairro='Jardim', cidade='São Paulo', estado='SP'
+        )
+        self.carlos = Entregador.objects.create(nome='Carlos')
+        self.joana = Entregador.objects.create(nome='Joana')
+
+    def _assinar(self, **filtros):
+        async def assinar():
+            return eventos.hub.assinar(**filtros)
+        assinatura = self.loop.run_until_complete(assinar())
+        self.addCleanup(eventos.hub.cancelar, assinatura)
+        return assinatura
+
+    def _recebidos(self, assinatura):
+        self.loop.run_until_complete(asyncio.sleep(0))
+        recebidos = []
+        while not assinatura.fila.empty():
+            mensagem = assinatura.fila.get_nowait()
+            recebidos.append(mensagem if mensagem is eventos.REINICIAR else json.loads(mensagem.split(b'data: ', 1)[1]))
+        return recebidos
+
+    def _criar(self, entregador=None):
+        return Entrega.objects.create(
+            cliente=self.cliente, endereco=self.endereco, entregador=entregador, numero_caixas=1,
+            nome_embalador='Roberto', numero_nfce='1', serie_nfce='1', data_compra=date.today(),
+            data_hora_entrega=timezone.now()
+        )
+
+    def test_sinais_publicam_depois_do_commit(self):
+        todas = self._assinar()
+        with self.captureOnCommitCallbacks(execute=True):
+            entrega = self._criar(self.carlos)
+            self.assertEqual(self._recebidos(todas), [])
+        [criada] = self._recebidos(todas)
+        self.assertEqual(
+            {chave: criada[chave] for chave in ('tipo', 'id', 'status', 'entregador_id')},
+            {'tipo': 'criada', 'id': entrega.id, 'status': 'pendente', 'entregador_id': self.carlos.id}
+        )
+        self.assertTrue(criada['updated_at'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            entrega.status = Entrega.STATUS_EM_TRANSITO
+            entrega.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            entrega_id = entrega.id
+            entrega.delete()
+        self.assertEqual(
+            [(evento['tipo'], evento['id'], evento['status']) for evento in self._recebidos(todas)],
+            [('alterada', entrega_id, 'em_transito'), ('removida', entrega_id, 'em_transito')]
+        )
+
+    def test_filtros_por_entregador_e_status(self):
+        do_carlos = self._assinar(entregadores={self.carlos.id})
+        entregues = self._assinar(status={Entrega.STATUS_ENTREGUE})
+        with self.captureOnCommitCallbacks(execute=True):
+            entrega = self._criar(self.joana)
+        self.assertEqual(self._recebidos(do_carlos), [])
+        self.assertEqual(self._recebidos(entregues), [])
+
+        # A entrega passa da Joana para o Carlos: ele passa a vê-la.
+        with self.captureOnCommitCallbacks(execute=True):
+            entrega.entregador = self.carlos
+            entrega.save()
+        self.assertEqual([evento['entregador_id'] for evento in self._recebidos(do_carlos)], [self.carlos.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            lote.alterar_status(Entrega.STATUS_ENTREGUE, ids=[entrega.id])
+        [entregue] = self._recebidos(entregues)
+        self.assertEqual((entregue['id'], entregue['status']), (entrega.id, 'entregue'))
+        self.assertEqual(len(self._recebidos(do_carlos)), 1)
+
+        # E um evento que tira a entrega da lista também chega a quem filtrava pelo valor antigo.
+        with self.captureOnCommitCallbacks(execute=True):
+            entrega.entregador = self.joana
+            entrega.save()
+        self.assertEqual([evento['entregador_id'] for evento in self._recebidos(do_carlos)], [self.joana.id])
+
+    def test_fila_cheia_reinicia(self):
+        with self.settings(EVENTOS_FILA_MAXIMA=2):
+            assinatura = self._assinar()
+        for i in range(3):
+            eventos.hub.entregar(eventos.Evento(eventos.ALTERADA, i, 'pendente', None, None))
+        self.assertEqual(self._recebidos(assinatura), [eventos.REINICIAR])
+
+    def test_sem_asgi_responde_501(self):
+        response = self.client.get(reverse('entregas:eventos-entregas'))
+        self.assertEqual(response.status_code, status.HTTP_501_NOT_IMPLEMENTED)
+        self.assertEqual(len(eventos.hub), 0)
+
+    def test_stream_sse(self):
+        async def ler():
+            response = await self.async_client.get(reverse('entregas:eventos-entregas'), {'entregador': str(self.carlos.id)})
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            fluxo = aiter(response.streaming_content)
+            self.assertEqual(await anext(fluxo), b'retry: 3000\n\n')
+            proximo = asyncio.ensure_future(anext(fluxo))
+            await asyncio.sleep(0)
+            eventos.hub.entregar(eventos.Evento(eventos.CRIADA, 7, 'pendente', self.joana.id, None))
+            eventos.hub.entregar(eventos.Evento(eventos.CRIADA, 8, 'pendente', self.carlos.id, None))
+            mensagem = await asyncio.wait_for(proximo, 1)
+            await fluxo.aclose()
+            return mensagem
+
+        with self.settings(EVENTOS_HEARTBEAT=5):
+            mensagem = async_to_sync(ler)()
+        self.assertTrue(mensagem.startswith(b'event: entrega\ndata: '))
+        self.assertEqual(json.loads(mensagem.split(b'data: ', 1)[1])['id'], 8)
+        self.assertEqual(len(eventos.hub), 0)
+
+    @skipUnless(hasattr(socket, 'AF_UNIX'), 'sockets Unix indisponíveis')
+    def test_backend_socket(self):
+        with tempfile.TemporaryDirectory() as diretorio:
+            with self.settings(EVENTOS_BACKEND='socket', EVENTOS_SOCKET_DIRETORIO=diretorio):
+                assinatura = self._assinar()
+                eventos.backend().publicar([eventos.Evento(eventos.ALTERADA, 5, 'entregue', 2, None, 'em_transito', 1)])
+                limite = time.monotonic() + 2
+                recebidos = []
+                while not recebidos and time.monotonic() < limite:
+                    time.sleep(0.01)
+                    recebidos = self._recebidos(assinatura)
+            self.assertEqual(recebidos, [{
+                'tipo': 'alterada', 'id': 5, 'status': 'entregue', 'entregador_id': 2, 'updated_at': None
+            }])
+
+
+class DadosSinteticosTest(TestCase):
+    def setUp(self):
+        geo.cache_centroides.clear()
+
+    def test_cpfs_validos_e_distintos(self):
+        cpfs = dados_sinteticos.gerar_cpfs(2000, np.random.default_rng(3))
+        self.assertEqual(len(set(cpfs)), 2000)
+        self.assertTrue(all(Cliente.is_valid_cpf(cpf) for cpf in cpfs))
+
+    def test_gerar(self):
+        criados = dados_sinteticos.gerar(clientes=30, enderecos_por_cliente=3, entregas=400, entregadores=4, meses=2, lote=50)
+        self.assertEqual(criados, {'entregadores': 4, 'clientes': 30, 'enderecos': 90, 'entregas': 400})
+
+        self.assertFalse(Cliente.objects.exclude(cpf_digitos__regex=r'^\d{11}$').exists())
+        self.assertEqual(Endereco.objects.filter(principal=True).values('cliente').distinct().count(), 30)
+        self.assertEqual(Endereco.objects.filter(principal=True).count(), 30)
+        self.assertFalse(Endereco.objects.filter(Q(latitude__isnull=True) | Q(geocelula__isnull=True)).exists())
+        self.assertFalse(Entrega.objects.filter(data_hora_entrega__gt=timezone.now()).exclude(status='pendente').exists())
+        self.assertFalse(Entrega.objects.filter(documento_busca='').exists())
+        # Cada entrega usa um endereço do próprio cliente e os agregados batem com as entregas.
+        self.assertFalse(Entrega.objects.exclude(endereco__cliente=F('cliente')).exists())
+        self.assertEqual(agregados.total_entregas(), 400)
+        self.assertEqual(filters.filtrar_entregas(Entrega.objects.all(), {'search': 'paulista'}).count(),
+                         Entrega.objects.filter(endereco__logradouro='Avenida Paulista').count())
+
+    def test_gerar_de_novo_nao_repete_cpfs(self):
+        dados_sinteticos.gerar(clientes=20, enderecos_por_cliente=1, entregas=10, entregadores=1, lote=50)
+        criados = dados_sinteticos.gerar(clientes=20, enderecos_por_cliente=1, entregas=10, entregadores=1, lote=50)
+        self.assertEqual(criados['clientes'], 20)
+        self.assertEqual(Cliente.objects.values('cpf_digitos').distinct().count(), 40)
+
+    def test_benchmark_api_cobre_todas_as_urls(self):
+        self.assertEqual(nomes_sem_caso(), [])
@@ -10,8 +10,12 @@ urlpatterns = [
 
     # --- API Clientes ---
     path('api/clientes/', views.ClienteListCreateView.as_view(), name='cliente-list-create'),
+    path('api/clientes/importar/', views.importar_clientes, name='cliente-importar'),
     path('api/clientes/<int:pk>/', views.ClienteRetrieveUpdateDestroyView.as_view(), name='cliente-detail'),
 
+    # --- API Endereços ---
+    path('api/enderecos/', views.EnderecoListView.as_view(), name='endereco-list'),
+
     # --- API Endereços (Aninhada sob Clientes) ---
     path('api/clientes/<int:cliente_pk>/enderecos/', views.EnderecoListCreateView.as_view(), name='endereco-list-create'),
     path('api/clientes/<int:cliente_pk>/enderecos/<int:pk>/', views.EnderecoRetrieveUpdateDestroyView.as_view(), name='endereco-detail'),
@@ -22,12 +26,23 @@ urlpatterns = [
 
     # --- API Entregas ---
     path('api/entregas/', views.EntregaListCreateView.as_view(), name='entrega-list-create'),
+    path('api/entregas/lote/', views.entregas_em_lote, name='entrega-lote'),
+    path('api/entregas/status/', views.alterar_status_em_lote, name='entrega-status-lote'),
+    path('api/entregas/exportar/', views.exportar_entregas, name='entrega-exportar'),
     path('api/entregas/<int:pk>/', views.EntregaRetrieveUpdateDestroyView.as_view(), name='entrega-detail'),
 
+    # --- API Rotas ---
+    path('api/rotas/planejar/', views.planejar_rotas, name='rotas-planejar'),
+
     # --- API Views Customizadas ---
     path('api/clientes/<int:cliente_id>/lista-entregas/', views.cliente_entregas, name='cliente-entregas-custom-list'),
 
     # API Utilitários
     path('api/buscar-cep/', views.buscar_cep, name='buscar-cep'),
     path('api/estatisticas/', views.estatisticas, name='estatisticas'),
+
+    # Versões assíncronas (servidas pelo asgi.py)
+    path('api/async/buscar-cep/', views.buscar_cep_async, name='buscar-cep-async'),
+    path('api/async/estatisticas/', views.estatisticas_async, name='estatisticas-async'),
+    path('api/eventos/entregas/', views.eventos_entregas, name='eventos-entregas'),
 ]
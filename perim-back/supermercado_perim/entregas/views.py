@@ -1,28 +1,101 @@
+import asyncio
+import csv
+import io
+import json
+
 from rest_framework import generics, status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404
-from django.db.models import Q, Count
-from django.utils.dateparse import parse_date
-from django.utils import timezone
-from datetime import timedelta, date
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
 
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
+from . import agregados, eventos, importacao, leitura_rapida, lote, rotas
+from .assincrono import executar_em_paralelo
+from . import cep as cep_service
+from .cache_respostas import CacheRespostaMixin, cache_resposta
+from .coalescencia import coalescer
 from .models import Cliente, Endereco, Entrega, Entregador
+from .exportacao import FORMATOS as FORMATOS_EXPORTACAO
+from .filters import filtrar_clientes, filtrar_enderecos, filtrar_entregas
+from .middleware import precomprimido
+from .pagination import KeysetPagination
 from .serializers import (
     ClienteSerializer, ClienteCreateUpdateSerializer,
     EnderecoSerializer,
-    EntregaSerializer, EntregaCreateUpdateSerializer,
+    EntregaSerializer, EntregaCreateUpdateSerializer, EntregaLoteItemSerializer, EntregaStatusLoteSerializer,
+    PlanejarRotasSerializer,
     EntregadorSerializer
 )
 
 def index(request):
-    return render(request, 'index.html')
+    # Usa o index.html pré-comprimido por `manage.py precomprimir_frontend`, se houver.
+    try:
+        origem = get_template('index.html').origin.name
+    except TemplateDoesNotExist:
+        origem = None
+    encontrado = origem and precomprimido(origem, request.headers.get('Accept-Encoding', ''))
+    if not encontrado:
+        return render(request, 'index.html')
+    codificacao, caminho = encontrado
+    with open(caminho, 'rb') as arquivo:
+        response = HttpResponse(arquivo.read(), content_type='text/html; charset=utf-8')
+    response.headers['Content-Encoding'] = codificacao
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+PARAMETROS_REGIAO = [
+    openapi.Parameter('lat', openapi.IN_QUERY, type=openapi.TYPE_NUMBER, description='Latitude do centro (com lon e raio_km).'),
+    openapi.Parameter('lon', openapi.IN_QUERY, type=openapi.TYPE_NUMBER, description='Longitude do centro (com lat e raio_km).'),
+    openapi.Parameter('raio_km', openapi.IN_QUERY, type=openapi.TYPE_NUMBER, description='Raio em km em torno de lat/lon.'),
+    openapi.Parameter(
+        'bbox', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+        description='Retângulo lat_min,lon_min,lat_max,lon_max.'
+    ),
+]
+
+class LeituraRapidaMixin:
+    # Com LEITURA_RAPIDA = True, listas montadas por leitura_rapida.py
+    # (mesmo JSON dos serializers).
+    leitor = None
+
+    def list(self, request, *args, **kwargs):
+        if not leitura_rapida.habilitada():
+            return super().list(request, *args, **kwargs)
+        campos = self.campos() if hasattr(self, 'campos') else None
+        linhas = self.leitor.valores(self.filter_queryset(self.get_queryset()), campos)
+        pagina = self.paginate_queryset(linhas)
+        if pagina is not None:
+            return self.get_paginated_response(self.leitor.serializar(pagina, campos))
+        return Response(self.leitor.serializar(linhas, campos))
+
+PARAMETROS_CLIENTES = [
+    openapi.Parameter('cpf', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='CPF exato, com ou sem máscara.'),
+    openapi.Parameter('nome', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Trecho do nome.'),
+    openapi.Parameter(
+        'search', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+        description='Só números (com ou sem máscara): início do CPF, do telefone ou do CEP. Texto: trecho do nome.'
+    ),
+]
 
-class ClienteListCreateView(generics.ListCreateAPIView):
-    queryset = Cliente.objects.prefetch_related('enderecos').all().order_by('nome')
+PARAMETROS_ENDERECOS = [
+    openapi.Parameter('cep', openapi.IN_QUERY, type=openapi.TYPE_STRING, description='Início do CEP, com ou sem máscara.'),
+    *PARAMETROS_REGIAO,
+]
+
+class ClienteListCreateView(CacheRespostaMixin, LeituraRapidaMixin, generics.ListCreateAPIView):
+    cache_recursos = ['clientes']
+    leitor = leitura_rapida.leitor_clientes
+    queryset = Cliente.objects.com_enderecos().order_by('nome')
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -30,41 +103,55 @@ class ClienteListCreateView(generics.ListCreateAPIView):
         return ClienteSerializer
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        search_term = self.request.query_params.get('search', None)
-        nome_param = self.request.query_params.get('nome', None) 
-
-        if nome_param:
-            queryset = queryset.filter(nome__icontains=nome_param)
-        elif search_term:
-            queryset = queryset.filter(
-                Q(nome__icontains=search_term) |
-                Q(cpf__icontains=search_term) |
-                Q(telefone__icontains=search_term)
-            )
-        return queryset
+        return filtrar_clientes(super().get_queryset(), self.request.query_params)
+
+    @swagger_auto_schema(manual_parameters=PARAMETROS_CLIENTES)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
 class ClienteRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Cliente.objects.prefetch_related('enderecos').all()
+    queryset = Cliente.objects.com_enderecos()
 
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
             return ClienteCreateUpdateSerializer
         return ClienteSerializer
 
-class EnderecoListCreateView(generics.ListCreateAPIView):
+class EnderecoListCreateView(LeituraRapidaMixin, generics.ListCreateAPIView):
     serializer_class = EnderecoSerializer
+    leitor = leitura_rapida.leitor_enderecos
     
     def get_queryset(self):
         cliente_pk = self.kwargs['cliente_pk']
         get_object_or_404(Cliente, pk=cliente_pk)
-        return Endereco.objects.filter(cliente_id=cliente_pk).order_by('-principal', 'logradouro')
+        queryset = Endereco.objects.filter(cliente_id=cliente_pk).order_by('-principal', 'logradouro')
+        return filtrar_enderecos(queryset, self.request.query_params)
+
+    @swagger_auto_schema(manual_parameters=PARAMETROS_ENDERECOS)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         cliente_pk = self.kwargs['cliente_pk']
         cliente = get_object_or_404(Cliente, pk=cliente_pk)
         serializer.save(cliente=cliente)
 
+class EnderecosPagination(KeysetPagination):
+    ordering = ('-id',)
+
+class EnderecoListView(LeituraRapidaMixin, generics.ListAPIView):
+    # Endereços de todos os clientes, para consultas por região.
+    serializer_class = EnderecoSerializer
+    leitor = leitura_rapida.leitor_enderecos
+    pagination_class = EnderecosPagination
+
+    def get_queryset(self):
+        return filtrar_enderecos(Endereco.objects.order_by('-id'), self.request.query_params)
+
+    @swagger_auto_schema(manual_parameters=PARAMETROS_ENDERECOS)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
 class EnderecoRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = EnderecoSerializer
     
@@ -72,7 +159,8 @@ class EnderecoRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
         cliente_pk = self.kwargs['cliente_pk']
         return Endereco.objects.filter(cliente_id=cliente_pk)
 
-class EntregadorListCreateView(generics.ListCreateAPIView):
+class EntregadorListCreateView(CacheRespostaMixin, generics.ListCreateAPIView):
+    cache_recursos = ['entregadores']
     queryset = Entregador.objects.all().order_by('nome')
     serializer_class = EntregadorSerializer
 
@@ -80,8 +168,42 @@ class EntregadorRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView)
     queryset = Entregador.objects.all()
     serializer_class = EntregadorSerializer
 
-class EntregaListCreateView(generics.ListCreateAPIView):
-    queryset = Entrega.objects.select_related('cliente', 'endereco', 'entregador').all().order_by('-data_hora_entrega')
+PARAMETROS_CAMPOS = [
+    openapi.Parameter(
+        'fields', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+        description='Campos das entregas, separados por vírgula (ex.: id,status,data_hora_entrega).'
+    ),
+    openapi.Parameter(
+        'expand', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+        description=f"Objetos aninhados a incluir junto com `fields`: {', '.join(EntregaSerializer.expansoes)}."
+    ),
+]
+
+class CamposEntregaMixin:
+    # Em leituras, `?fields=`/`?expand=` escolhem os campos serializados e,
+    # com eles, as relações carregadas por select_related.
+    def campos(self):
+        if self.request.method != 'GET':
+            return None
+        return EntregaSerializer.campos_da_requisicao(self.request.query_params)
+
+    def get_queryset(self):
+        relacionados = ['cliente', 'endereco', 'entregador']
+        if self.request.method == 'GET':
+            relacionados = EntregaSerializer.select_related_para(self.campos())
+        queryset = super().get_queryset()
+        # select_related() sem argumentos seguiria todas as chaves estrangeiras.
+        return queryset.select_related(*relacionados) if relacionados else queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.get_serializer_class() is EntregaSerializer:
+            kwargs.setdefault('campos', self.campos())
+        return super().get_serializer(*args, **kwargs)
+
+class EntregaListCreateView(CamposEntregaMixin, LeituraRapidaMixin, generics.ListCreateAPIView):
+    queryset = Entrega.objects.all().order_by('-data_hora_entrega')
+    pagination_class = KeysetPagination
+    leitor = leitura_rapida.leitor_entregas
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -94,44 +216,14 @@ class EntregaListCreateView(generics.ListCreateAPIView):
         return context
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        cliente_id_param = self.request.query_params.get('cliente', None)
-        entregador_id_param = self.request.query_params.get('entregador', None)
-        data_inicio = self.request.query_params.get('data_inicio', None)
-        data_fim = self.request.query_params.get('data_fim', None)
-        search = self.request.query_params.get('search', None)
-        status_param = self.request.query_params.get('status', None)
-
-        if cliente_id_param:
-            queryset = queryset.filter(cliente_id=cliente_id_param)
-        if entregador_id_param:
-            queryset = queryset.filter(entregador_id=entregador_id_param)
-        if data_inicio:
-            data_inicio_parsed = parse_date(data_inicio)
-            if data_inicio_parsed:
-                queryset = queryset.filter(data_hora_entrega__date__gte=data_inicio_parsed)
-        if data_fim:
-            data_fim_parsed = parse_date(data_fim)
-            if data_fim_parsed:
-                queryset = queryset.filter(data_hora_entrega__date__lte=data_fim_parsed)
-        if status_param:
-            queryset = queryset.filter(status=status_param)
-        
-        if search:
-            queryset = queryset.filter(
-                Q(cliente__nome__icontains=search) |
-                Q(entregador__nome__icontains=search) |
-                Q(status__icontains=search) | 
-                Q(numero_nfce__icontains=search) |
-                Q(nome_embalador__icontains=search) |
-                Q(endereco__logradouro__icontains=search) |
-                Q(endereco__bairro__icontains=search) |
-                Q(endereco__cep__icontains=search)
-            )
-        return queryset
+        return filtrar_entregas(super().get_queryset(), self.request.query_params)
+
+    @swagger_auto_schema(manual_parameters=PARAMETROS_CAMPOS + PARAMETROS_REGIAO)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
-class EntregaRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
-    queryset = Entrega.objects.select_related('cliente', 'endereco', 'entregador').all()
+class EntregaRetrieveUpdateDestroyView(CamposEntregaMixin, generics.RetrieveUpdateDestroyAPIView):
+    queryset = Entrega.objects.all()
     
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
@@ -143,120 +235,311 @@ class EntregaRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
         context['request'] = self.request
         return context
 
+    @swagger_auto_schema(manual_parameters=PARAMETROS_CAMPOS)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+@swagger_auto_schema(
+    method='post',
+    tags=['Clientes'],
+    operation_summary="Importar clientes (e endereços) de um arquivo CSV.",
+    manual_parameters=[openapi.Parameter(
+        'arquivo', openapi.IN_FORM, type=openapi.TYPE_FILE, required=True,
+        description=f"CSV com as colunas {','.join(importacao.COLUNAS)}; as de endereço são opcionais."
+    )]
+)
+@api_view(['POST'])
+def importar_clientes(request):
+    arquivo = request.FILES.get('arquivo')
+    if arquivo is None:
+        return Response({'erro': 'Envie o CSV no campo "arquivo".'}, status=status.HTTP_400_BAD_REQUEST)
+    leitor = csv.DictReader(io.TextIOWrapper(arquivo.file, encoding='utf-8-sig', newline=''))
+    try:
+        faltando = [coluna for coluna in importacao.CAMPOS_CLIENTE if coluna not in (leitor.fieldnames or [])]
+    except UnicodeDecodeError:
+        return Response({'erro': 'O arquivo deve estar em UTF-8.'}, status=status.HTTP_400_BAD_REQUEST)
+    if faltando:
+        return Response(
+            {'erro': f'Colunas obrigatórias ausentes: {", ".join(faltando)}.'}, status=status.HTTP_400_BAD_REQUEST
+        )
+
+    importador = importacao.Importacao(tamanho_lote=getattr(settings, 'IMPORTACAO_LOTE', 5000))
+    try:
+        resumo = importador.processar(leitor)
+    except UnicodeDecodeError:
+        # Os lotes anteriores ao trecho inválido já foram gravados.
+        return Response(
+            {'erro': 'O arquivo deve estar em UTF-8.', **importador.resumo()}, status=status.HTTP_400_BAD_REQUEST
+        )
+    maximo = getattr(settings, 'IMPORTACAO_ERROS_RESPOSTA', 1000)
+    erros = [{'linha': linha, 'cpf': cpf, 'erro': erro} for linha, cpf, erro in importador.erros[:maximo]]
+    return Response(
+        {**resumo, 'erros': erros},
+        status=status.HTTP_201_CREATED if resumo['clientes_criados'] else status.HTTP_200_OK
+    )
+
+@swagger_auto_schema(
+    method='post',
+    tags=['Entregas'],
+    operation_summary="Criar várias entregas de uma vez.",
+    request_body=EntregaLoteItemSerializer(many=True)
+)
+@api_view(['POST'])
+def entregas_em_lote(request):
+    itens = request.data
+    limite = getattr(settings, 'ENTREGAS_LOTE_LIMITE', 5000)
+    if not isinstance(itens, list) or not itens:
+        return Response({'erro': 'Envie uma lista de entregas.'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(itens) > limite:
+        return Response(
+            {'erro': f'O lote pode ter no máximo {limite} entregas.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    entregas, erros = lote.criar_entregas(itens)
+    if any(erros):
+        return Response({'erros': erros}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(
+        {'criadas': len(entregas), 'ids': [entrega.id for entrega in entregas]},
+        status=status.HTTP_201_CREATED
+    )
+
+@swagger_auto_schema(
+    method='post',
+    tags=['Entregas'],
+    operation_summary="Alterar o status de várias entregas de uma vez.",
+    request_body=EntregaStatusLoteSerializer
+)
+@api_view(['POST'])
+def alterar_status_em_lote(request):
+    serializer = EntregaStatusLoteSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    dados = serializer.validated_data
+
+    alterados = lote.alterar_status(
+        dados['status'],
+        ids=dados.get('ids'),
+        entregador_id=dados.get('entregador'),
+        dia=dados.get('data')
+    )
+    resposta = {'atualizadas': len(alterados)}
+    if 'ids' in dados:
+        resposta['ignoradas'] = sorted(set(dados['ids']) - set(alterados))
+    return Response(resposta)
+
+@swagger_auto_schema(
+    method='post',
+    tags=['Entregas'],
+    operation_summary="Dividir as entregas pendentes do dia entre os entregadores e ordenar as rotas.",
+    request_body=PlanejarRotasSerializer
+)
+@api_view(['POST'])
+def planejar_rotas(request):
+    serializer = PlanejarRotasSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    dados = serializer.validated_data
+
+    entregadores = dados.get('entregadores')
+    if entregadores is not None:
+        inexistentes = set(entregadores) - set(Entregador.objects.filter(id__in=entregadores).values_list('id', flat=True))
+        if inexistentes:
+            return Response(
+                {'entregadores': [f'Entregadores inexistentes: {sorted(inexistentes)}.']},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    elif not Entregador.objects.exists():
+        return Response({'erro': 'Nenhum entregador cadastrado.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    resultado = rotas.planejar_rotas(dados['data'], entregador_ids=entregadores, aplicar=dados['aplicar'])
+    return Response({'data': dados['data'], 'aplicado': dados['aplicar'], **resultado})
+
+@require_GET
+def exportar_entregas(request):
+    formato = request.GET.get('formato', 'ndjson')
+    if formato not in FORMATOS_EXPORTACAO:
+        return JsonResponse(
+            {'erro': f"Formato inválido. Use um de: {', '.join(FORMATOS_EXPORTACAO)}."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    gerar, content_type = FORMATOS_EXPORTACAO[formato]
+    queryset = filtrar_entregas(Entrega.objects.all(), request.GET)
+    response = StreamingHttpResponse(gerar(queryset), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="entregas.{formato}"'
+    return response
+
+class EntregasClientePagination(KeysetPagination):
+    opcional = False
+
+@swagger_auto_schema(
+    method='get',
+    tags=['Clientes'],
+    operation_summary="Entregas de um cliente, paginadas por cursor.",
+    manual_parameters=[
+        openapi.Parameter('data_inicio', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+        openapi.Parameter('data_fim', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE),
+        openapi.Parameter('status', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=[valor for valor, _ in Entrega.STATUS_CHOICES]),
+        openapi.Parameter('cursor', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+        openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        *PARAMETROS_CAMPOS,
+    ]
+)
 @api_view(['GET'])
+@cache_resposta(lambda request, cliente_id: [f'cliente:{cliente_id}', 'entregadores'])
 def cliente_entregas(request, cliente_id):
-    cliente = get_object_or_404(Cliente.objects.prefetch_related('enderecos', 'entregas__endereco', 'entregas__entregador'), pk=cliente_id)
+    cliente = get_object_or_404(Cliente.objects.com_enderecos(), pk=cliente_id)
     cliente_data = ClienteSerializer(cliente, context={'request': request}).data
-    entregas_data = EntregaSerializer(cliente.entregas.all(), many=True, context={'request': request}).data
+
+    # O cliente já está fixado pela URL; os demais filtros são os de /api/entregas/.
+    params = request.query_params.copy()
+    params.pop('cliente', None)
+    campos = EntregaSerializer.campos_da_requisicao(request.query_params)
+    entregas = Entrega.objects.filter(cliente_id=cliente.id)
+    relacionados = EntregaSerializer.select_related_para(campos)
+    if relacionados:
+        entregas = entregas.select_related(*relacionados)
+    entregas = filtrar_entregas(entregas, params)
+    paginador = EntregasClientePagination()
+    pagina = paginador.paginate_queryset(entregas, request)
+    entregas_data = EntregaSerializer(pagina, many=True, campos=campos, context={'request': request}).data
     return Response({
         'cliente': cliente_data,
-        'entregas_do_cliente': entregas_data
+        'entregas_do_cliente': entregas_data,
+        'next': paginador.get_next_link(),
+        'next_cursor': paginador.proximo_cursor,
     })
 
-@swagger_auto_schema(method='get', tags=['Utilitários'], operation_summary="Obter estatísticas gerais do sistema.")
+@swagger_auto_schema(
+    method='get',
+    tags=['Utilitários'],
+    operation_summary="Obter estatísticas gerais do sistema.",
+    manual_parameters=[
+        openapi.Parameter('dias', openapi.IN_QUERY, description="Janela, em dias, de entregas_por_mes.", type=openapi.TYPE_INTEGER),
+    ]
+)
 @api_view(['GET'])
+@coalescer
 def estatisticas(request):
-    total_clientes = Cliente.objects.count()
-    total_entregas = Entrega.objects.count()
-    total_enderecos = Endereco.objects.count()
-    total_entregadores = Entregador.objects.count()
-
-    seis_meses_atras = timezone.now() - timedelta(days=180) 
-    entregas_por_mes_query = (
-        Entrega.objects
-        .filter(data_hora_entrega__gte=seis_meses_atras)
-        .extra({'mes': "strftime('%%Y-%%m', data_hora_entrega)"})
-        .values('mes')
-        .annotate(total=Count('id'))
-        .order_by('mes')
-    )
-    entregas_por_mes_list = list(entregas_por_mes_query)
-
+    # Tudo que depende do volume de entregas vem das tabelas de agregados
+    # (ver agregados.py), mantidas pelos sinais de Entrega.
+    try:
+        janela_dias = _janela_estatisticas(request.query_params)
+    except ValueError as exc:
+        return Response({'erro': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-    top_clientes_entregas_query = (
-        Cliente.objects
-        .annotate(num_entregas=Count('entregas'))
-        .filter(num_entregas__gt=0)
-        .order_by('-num_entregas')[:5]
-    )
-    top_clientes_list = [
-        {'id': cliente.id, 'nome': cliente.nome, 'total_entregas': cliente.num_entregas}
-        for cliente in top_clientes_entregas_query
-    ]
+    consultas = agregados.consultas_estatisticas(janela_dias)
+    return Response({chave: consulta() for chave, consulta in consultas.items()})
 
-    hoje = timezone.now().date()
-    entregador_do_dia_obj = Entregador.objects.filter(
-        entregas_realizadas__data_hora_entrega__date=hoje
-    ).annotate(
-        num_entregas_hoje=Count('entregas_realizadas', filter=Q(entregas_realizadas__data_hora_entrega__date=hoje))
-    ).order_by('-num_entregas_hoje').first()
-
-    entregador_do_dia_info = {
-        'id': None,
-        'nome': "Nenhum entregador com entregas hoje",
-        'total_entregas_hoje': 0
-    }
-    if entregador_do_dia_obj and entregador_do_dia_obj.num_entregas_hoje > 0:
-        entregador_do_dia_info = {
-            'id': entregador_do_dia_obj.id,
-            'nome': entregador_do_dia_obj.nome,
-            'total_entregas_hoje': entregador_do_dia_obj.num_entregas_hoje
-        }
-
-    distribuicao_status_query = (
-        Entrega.objects
-        .values('status')
-        .annotate(total=Count('id'))
-        .order_by('status')
-    )
-    distribuicao_status_list = list(distribuicao_status_query)
+def _janela_estatisticas(params):
+    dias_param = params.get('dias', None)
+    if not dias_param:
+        return getattr(settings, 'ESTATISTICAS_JANELA_DIAS', 180)
+    try:
+        janela_dias = int(dias_param)
+    except ValueError:
+        janela_dias = 0
+    if not 1 <= janela_dias <= 3660:
+        raise ValueError('O parâmetro dias deve ser um inteiro entre 1 e 3660.')
+    return janela_dias
 
+@require_GET
+async def estatisticas_async(request):
+    # Mesma resposta de /api/estatisticas/, com as consultas em paralelo e
+    # sem ocupar o event loop enquanto o banco responde.
+    try:
+        janela_dias = _janela_estatisticas(request.GET)
+    except ValueError as exc:
+        return JsonResponse({'erro': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-    return Response({
-        'total_clientes': total_clientes,
-        'total_entregas': total_entregas,
-        'total_enderecos': total_enderecos,
-        'total_entregadores': total_entregadores,
-        'entregas_por_mes': entregas_por_mes_list,
-        'top_clientes_com_mais_entregas': top_clientes_list,
-        'entregador_do_dia': entregador_do_dia_info,
-        'distribuicao_status_entregas': distribuicao_status_list 
-    })
+    dados = await executar_em_paralelo(agregados.consultas_estatisticas(janela_dias))
+    return JsonResponse(dados)
 
 @api_view(['POST'])
 def buscar_cep(request):
-    import requests
-    cep_raw = request.data.get('cep', '')
-    cep = cep_raw.replace('-', '').replace('.', '')
-    if not cep or len(cep) != 8 or not cep.isdigit():
+    cep = cep_service.normalizar_cep(request.data.get('cep', ''))
+    if not cep:
         return Response(
             {'erro': 'CEP deve ter 8 dígitos numéricos.'},
             status=status.HTTP_400_BAD_REQUEST
         )
     try:
-        response = requests.get(f'https://viacep.com.br/ws/{cep}/json/')
-        response.raise_for_status()
-        data = response.json()
-        if data.get('erro'):
-            return Response(
-                {'erro': 'CEP não encontrado.'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        return Response({
-            'cep': data.get('cep', ''),
-            'logradouro': data.get('logradouro', ''),
-            'complemento': data.get('complemento', ''),
-            'bairro': data.get('bairro', ''),
-            'cidade': data.get('localidade', ''),
-            'estado': data.get('uf', '')
-        })
-    except requests.Timeout:
+        return Response(cep_service.resolver(cep))
+    except cep_service.CepNaoEncontrado:
         return Response(
-            {'erro': 'Timeout ao consultar o serviço de CEP.'},
-            status=status.HTTP_504_GATEWAY_TIMEOUT
+            {'erro': 'CEP não encontrado.'},
+            status=status.HTTP_404_NOT_FOUND
         )
-    except requests.RequestException:
+    except cep_service.ServicoCepIndisponivel as exc:
         return Response(
-            {'erro': 'Erro ao consultar o serviço de CEP.'},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            {'erro': str(exc)},
+            status=status.HTTP_504_GATEWAY_TIMEOUT if exc.timeout else status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+def _lista_de_ids(texto):
+    return {int(parte) for parte in (texto or '').split(',') if parte.strip().isdigit()}
+
+@require_GET
+async def eventos_entregas(request):
+    # Server-Sent Events com as alterações de entregas (ver eventos.py).
+    # Filtros opcionais: ?entregador=1,2 e ?status=pendente,em_transito.
+    if not isinstance(request, ASGIRequest):
+        # Sob WSGI (runserver incluído) o Django consome o fluxo inteiro antes
+        # de responder: a requisição nunca terminaria.
+        return JsonResponse(
+            {'erro': 'O fluxo de eventos exige um servidor ASGI (ex.: uvicorn supermercado_perim.asgi:application).'},
+            status=status.HTTP_501_NOT_IMPLEMENTED
+        )
+    entregadores = _lista_de_ids(request.GET.get('entregador'))
+    status_validos = {valor for valor, _ in Entrega.STATUS_CHOICES}
+    status_filtro = {parte for parte in request.GET.get('status', '').split(',') if parte in status_validos}
+    assinatura = eventos.hub.assinar(entregadores, status_filtro)
+    intervalo = getattr(settings, 'EVENTOS_HEARTBEAT', 15)
+
+    async def fluxo():
+        try:
+            yield f'retry: {getattr(settings, "EVENTOS_RETRY_MS", 3000)}\n\n'.encode('ascii')
+            while True:
+                try:
+                    mensagem = await asyncio.wait_for(assinatura.fila.get(), intervalo)
+                except asyncio.TimeoutError:
+                    # Comentário SSE: mantém a conexão viva em proxies com timeout de ociosidade.
+                    yield b': ping\n\n'
+                    continue
+                if mensagem is eventos.REINICIAR:
+                    yield b'event: reset\ndata: {}\n\n'
+                    return
+                yield mensagem
+        finally:
+            eventos.hub.cancelar(assinatura)
+
+    response = StreamingHttpResponse(fluxo(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@csrf_exempt
+@require_POST
+async def buscar_cep_async(request):
+    try:
+        dados = json.loads(request.body or b'{}')
+    except ValueError:
+        dados = request.POST
+    if not isinstance(dados, dict):
+        dados = {}
+    cep = cep_service.normalizar_cep(dados.get('cep', ''))
+    if not cep:
+        return JsonResponse(
+            {'erro': 'CEP deve ter 8 dígitos numéricos.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        return JsonResponse(await cep_service.resolver_async(cep))
+    except cep_service.CepNaoEncontrado:
+        return JsonResponse(
+            {'erro': 'CEP não encontrado.'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    except cep_service.ServicoCepIndisponivel as exc:
+        return JsonResponse(
+            {'erro': str(exc)},
+            status=status.HTTP_504_GATEWAY_TIMEOUT if exc.timeout else status.HTTP_500_INTERNAL_SERVER_ERROR
         )
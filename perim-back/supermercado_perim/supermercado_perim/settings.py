@@ -46,6 +46,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'entregas.middleware.CompressaoMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -56,10 +57,15 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'supermercado_perim.urls'
 
+# Build do frontend (`npm run build` em perim-front). O index.html dele é o
+# template de views.index; `manage.py precomprimir_frontend` grava as versões
+# .gz/.br ao lado dos arquivos.
+FRONTEND_BUILD_DIR = BASE_DIR.parent.parent / 'perim-front' / 'dist'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
+        'DIRS': [FRONTEND_BUILD_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
@@ -81,9 +87,62 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Conexões persistentes (em segundos), também nas threads de
+        # entregas/assincrono.py; com 0 cada requisição abre e fecha as suas.
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Threads (cada uma com sua conexão) das consultas em paralelo de
+# /api/async/estatisticas/ (ver entregas/assincrono.py).
+CONSULTAS_PARALELAS = 4
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# 'respostas' guarda as respostas das views de leitura (ver entregas/cache_respostas.py).
+# As gerações que invalidam as respostas (e os ETags) precisam ser vistas por
+# todos os processos: o LocMemCache só serve com DEBUG, e `check --deploy`
+# falha se ele estiver configurado sem DEBUG (ver entregas/checks.py). Fora do
+# DEBUG o padrão é o cache em banco (crie as tabelas com `manage.py
+# createcachetable`); Redis também serve:
+#   {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379'}
+
+if DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'respostas': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'respostas',
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'perim_cache',
+        },
+        'respostas': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'perim_cache_respostas',
+        },
+    }
+
+RESPOSTAS_CACHE_ALIAS = 'respostas'
+RESPOSTAS_CACHE_TIMEOUT = 300
+
+# Coalescência de requisições simultâneas (ver entregas/coalescencia.py).
+# Entre processos, o líder e o resultado passam pelo cache indicado, que
+# precisa ser Redis ou Memcached (add atômico e compartilhado); com os outros
+# backends o check entregas.E002 falha. Desligado, a coalescência fica
+# restrita a cada processo.
+COALESCENCIA_TIMEOUT = 10
+COALESCENCIA_ENTRE_PROCESSOS = False
+COALESCENCIA_CACHE_ALIAS = 'default'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -131,11 +190,32 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    # orjson, com a mesma saída do JSONRenderer (ver entregas/renderers.py)
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'entregas.renderers.OrjsonRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'entregas.renderers.OrjsonParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
 }
 
+# Listas de entregas, clientes e endereços montadas sem os campos do DRF
+# (ver entregas/leitura_rapida.py). Opcional: False usa os serializers.
+LEITURA_RAPIDA = False
+
+# Compressão gzip/brotli das respostas (ver entregas/middleware.py).
+# Respostas menores que o mínimo (em bytes) e tipos fora da lista saem sem
+# compressão; as em streaming são sempre comprimidas.
+COMPRESSAO_TAMANHO_MINIMO = 1024
+COMPRESSAO_TIPOS = (
+    'application/json', 'application/x-ndjson', 'text/csv', 'text/html', 'text/plain',
+    'text/css', 'text/javascript', 'application/javascript', 'image/svg+xml',
+)
+COMPRESSAO_GZIP_NIVEL = 6
+COMPRESSAO_BROTLI_QUALIDADE = 5
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -144,4 +224,46 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:8000",
 ]
 
-CORS_ALLOW_ALL_ORIGINS = DEBUG
\ No newline at end of file
+CORS_ALLOW_ALL_ORIGINS = DEBUG
+# Máximo de itens aceitos por POST em /api/entregas/lote/
+ENTREGAS_LOTE_LIMITE = 5000
+
+# Importação de clientes em /api/clientes/importar/ e `manage.py importar_clientes`
+# (ver entregas/importacao.py): linhas por lote e máximo de erros devolvidos na resposta.
+IMPORTACAO_LOTE = 5000
+IMPORTACAO_ERROS_RESPOSTA = 1000
+
+# Planejamento de rotas em /api/rotas/planejar/ (ver entregas/rotas.py).
+# ROTAS_DEPOSITO = (latitude, longitude) da loja; None usa o centro das entregas.
+ROTAS_DEPOSITO = None
+ROTAS_PESO_FRIOS = 2
+ROTAS_ITERACOES_2OPT = 1000
+ROTAS_VIZINHOS_2OPT = 10
+
+# Coordenadas dos endereços (ver entregas/geo.py). Mudar GEO_CELULA_GRAUS
+# exige `manage.py geocodificar_enderecos --todos`.
+GEO_CELULA_GRAUS = 0.01
+GEO_MAXIMO_FAIXAS = 64
+GEO_CACHE_TAMANHO = 10000
+GEO_CACHE_TTL = 60 * 60
+
+# Stream SSE de entregas em /api/eventos/entregas/ (ver entregas/eventos.py).
+# Backends: 'local' (um processo só), 'socket' (vários processos na mesma
+# máquina) ou 'postgres' (LISTEN/NOTIFY, processos em máquinas diferentes).
+EVENTOS_BACKEND = 'local'
+EVENTOS_SOCKET_DIRETORIO = None
+EVENTOS_CANAL = 'entregas_eventos'
+EVENTOS_FILA_MAXIMA = 100
+EVENTOS_HEARTBEAT = 15
+EVENTOS_RETRY_MS = 3000
+
+# Estatísticas: janela padrão (em dias) de entregas_por_mes em /api/estatisticas/
+ESTATISTICAS_JANELA_DIAS = 180
+
+# Consulta de CEP (ver entregas/cep.py)
+CEP_SERVICO_URL = 'https://viacep.com.br/ws'
+CEP_TIMEOUT = (3.05, 5)  # (conexão, leitura), em segundos
+CEP_POOL_CONEXOES = 10
+CEP_CACHE_MEMORIA_TAMANHO = 10000
+CEP_CACHE_TTL = 60 * 60 * 24 * 30
+CEP_CACHE_NEGATIVO_TTL = 60 * 60